@@ -0,0 +1,106 @@
+import asyncio
+import json
+
+from fastapi import WebSocket
+
+
+class Broadcaster:
+    """
+    Envío de resultados a todos los WebSockets sin que un cliente lento
+    frene a los demás ni a /vote.
+
+    - ``publish`` solo guarda el último estado (gana el que tiene más
+      votos en total, así un voto que termina tarde no retrocede los
+      conteos).
+    - Cada ``tick`` segundos, si hubo cambios, el mensaje se codifica una
+      vez y se encola para cada cliente: a lo sumo un envío por tick.
+    - Cada cliente tiene una cola acotada y su propia tarea de escritura.
+      Si la cola se llena o un envío tarda más de ``send_timeout``, el
+      cliente se desconecta (puede reconectar y recibir el estado actual).
+    """
+
+    def __init__(self, tick=0.1, queue_size=8, send_timeout=5.0):
+        self.tick = tick
+        self.queue_size = queue_size
+        self.send_timeout = send_timeout
+        self._clients = {}
+        self._latest = None
+        self._dirty = False
+        self._task = None
+
+        self.pushes = 0
+        self.dropped = 0
+
+    async def connect(self, websocket: WebSocket, snapshot):
+        await websocket.accept()
+        queue = asyncio.Queue(self.queue_size)
+        queue.put_nowait(encode(snapshot))
+        self._clients[websocket] = (queue, asyncio.create_task(self._writer(websocket, queue)))
+
+    def disconnect(self, websocket: WebSocket):
+        client = self._clients.pop(websocket, None)
+        if client is not None:
+            client[1].cancel()
+
+    def publish(self, results):
+        if self._latest is None or sum(results.values()) >= sum(self._latest.values()):
+            self._latest = results
+            self._dirty = True
+
+    async def _writer(self, websocket, queue):
+        try:
+            while True:
+                message = await queue.get()
+                await asyncio.wait_for(websocket.send_text(message), self.send_timeout)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self._drop(websocket)
+
+    def _drop(self, websocket):
+        if websocket not in self._clients:
+            return
+        self.disconnect(websocket)
+        self.dropped += 1
+        # 1013: "Try Again Later"; el cierre también puede tardar
+        asyncio.create_task(self._close(websocket))
+
+    async def _close(self, websocket):
+        try:
+            await asyncio.wait_for(websocket.close(code=1013), self.send_timeout)
+        except Exception:
+            pass
+
+    def flush(self):
+        """Encola el último estado para todos los clientes, si cambió."""
+        if not self._dirty:
+            return
+        self._dirty = False
+        message = encode(self._latest)
+        for websocket, (queue, _) in list(self._clients.items()):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                self._drop(websocket)
+        self.pushes += 1
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.tick)
+            self.flush()
+
+    def start(self):
+        self._task = asyncio.create_task(self.run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+        for websocket in list(self._clients):
+            self.disconnect(websocket)
+
+    def stats(self):
+        return {"clients": len(self._clients), "pushes": self.pushes, "dropped": self.dropped}
+
+
+def encode(results):
+    return json.dumps({"type": "results_update", "data": results})
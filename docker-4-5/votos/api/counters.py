@@ -0,0 +1,134 @@
+import asyncio
+import random
+import time
+
+# Voto atómico en una sola ida a Redis: valida la opción (debe existir en
+# el hash, que se carga desde poll_options), incrementa, la marca para el
+# flush y, si ARGV[2] es "1", devuelve todos los resultados del hash
+VOTE_SCRIPT = """
+if redis.call('HEXISTS', KEYS[1], ARGV[1]) == 0 then
+    return false
+end
+redis.call('HINCRBY', KEYS[1], ARGV[1], 1)
+redis.call('SADD', KEYS[2], ARGV[1])
+if ARGV[2] == '1' then
+    return redis.call('HGETALL', KEYS[1])
+end
+return 1
+"""
+
+
+def _as_results(flat):
+    return {flat[i]: int(flat[i + 1]) for i in range(0, len(flat), 2)}
+
+
+class VoteCounters:
+    """
+    Conteos de votos en Redis, en un hash o repartidos en ``shards``.
+
+    Con ``shards=1`` se usa un solo hash (``results_key``) y su set de
+    opciones pendientes de guardar (``dirty_key``), como siempre.
+
+    Con ``shards > 1`` cada voto incrementa uno de K hashes elegido al
+    azar, así ninguna clave concentra todas las escrituras. Cada shard
+    tiene su set de pendientes, y ambas claves comparten hash tag
+    (``{poll_results:3}`` y ``{poll_results:3}:dirty``): en Redis Cluster
+    el script del voto toca un solo slot y los shards se reparten entre
+    nodos. El total de una opción es la suma de los shards; esa lectura
+    se cachea ``cache_ttl`` segundos para que no cueste K lecturas por
+    voto.
+    """
+
+    def __init__(self, redis_client, results_key, dirty_key, shards=1, cache_ttl=0.1):
+        self.redis = redis_client
+        self.shards = shards
+        self.cache_ttl = cache_ttl
+        if shards > 1:
+            self.keys = [(f"{{{results_key}:{i}}}", f"{{{results_key}:{i}}}:dirty") for i in range(shards)]
+        else:
+            self.keys = [(results_key, dirty_key)]
+        self._script = redis_client.register_script(VOTE_SCRIPT)
+        self._cached = None
+        self._cached_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def vote(self, option):
+        """Suma un voto; devuelve los resultados o None si la opción no existe."""
+        results_key, dirty_key = random.choice(self.keys)
+        single = self.shards == 1
+        reply = await self._script(keys=[results_key, dirty_key], args=[option, int(single)])
+        if reply is None:
+            return None
+        if single:
+            return _as_results(reply)
+        return await self.results()
+
+    async def _read_shards(self):
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for results_key, _ in self.keys:
+                pipe.hgetall(results_key)
+            return [
+                {option: int(count) for option, count in shard.items()}
+                for shard in await pipe.execute()
+            ]
+
+    async def results(self):
+        """Totales por opción (con shards, cacheados ``cache_ttl`` segundos)."""
+        if self.shards == 1:
+            return (await self._read_shards())[0]
+        async with self._lock:
+            if self._cached is None or time.monotonic() - self._cached_at >= self.cache_ttl:
+                totals = {}
+                for shard in await self._read_shards():
+                    for option, count in shard.items():
+                        totals[option] = totals.get(option, 0) + count
+                self._cached = totals
+                self._cached_at = time.monotonic()
+            return self._cached
+
+    async def exists(self):
+        """Indica si Redis tiene todos los hashes (no los perdió en un reinicio)."""
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for results_key, _ in self.keys:
+                pipe.exists(results_key)
+            return all(await pipe.execute())
+
+    async def load(self, rows):
+        """
+        Carga los conteos de PostgreSQL en los hashes que falten.
+
+        HSETNX: si Redis ya tiene conteos (reinicio de la API) son los más
+        nuevos. Si solo falta algún shard, recibe lo que PostgreSQL tiene
+        por encima de la suma de los shards presentes.
+        """
+        shards = await self._read_shards()
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for option, count in rows:
+                missing = [i for i, shard in enumerate(shards) if option not in shard]
+                present = sum(shard.get(option, 0) for shard in shards)
+                for n, i in enumerate(missing):
+                    pipe.hsetnx(self.keys[i][0], option, max(count - present, 0) if n == 0 else 0)
+            await pipe.execute()
+        self._cached = None
+
+    async def pop_dirty(self, limit=10000):
+        """Saca (SPOP) las opciones pendientes de cada shard: [(shard, opciones)]."""
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for _, dirty_key in self.keys:
+                pipe.spop(dirty_key, limit)
+            return [(i, options) for i, options in enumerate(await pipe.execute()) if options]
+
+    async def restore_dirty(self, popped):
+        """Devuelve a sus shards las opciones de ``pop_dirty`` (flush fallido)."""
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for i, options in popped:
+                pipe.sadd(self.keys[i][1], *options)
+            await pipe.execute()
+
+    async def totals(self, options):
+        """Totales actuales (sin caché) de ``options``, sumando los shards."""
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for results_key, _ in self.keys:
+                pipe.hmget(results_key, options)
+            shards = await pipe.execute()
+        return [sum(int(shard[i] or 0) for shard in shards) for i in range(len(options))]
@@ -0,0 +1,92 @@
+import asyncio
+import json
+
+
+class RedisFanout:
+    """
+    Reparto de resultados entre procesos (workers de uvicorn o réplicas
+    de la API) con pub/sub de Redis.
+
+    - ``publish`` reemplaza a ``Broadcaster.publish`` en /vote: guarda el
+      último estado y, a lo sumo una vez cada ``tick``, lo publica en
+      ``channel``. Así el tráfico a Redis no crece con los votos.
+    - Cada proceso se suscribe una sola vez y entrega lo recibido a su
+      ``Broadcaster`` local, que lo reparte a sus WebSockets.
+    - Al suscribirse (y al reconectar tras un error) se toma un snapshot
+      con ``snapshot()``: cubre lo publicado mientras no había
+      suscripción. Los WebSockets nuevos ya reciben el estado actual al
+      conectarse.
+    """
+
+    def __init__(self, redis_client, channel, broadcaster, snapshot, tick=0.1, retry=1.0):
+        self.redis = redis_client
+        self.channel = channel
+        self.broadcaster = broadcaster
+        self.snapshot = snapshot
+        self.tick = tick
+        self.retry = retry
+        self._latest = None
+        self._dirty = False
+        self._tasks = []
+
+        self.published = 0
+        self.received = 0
+        self.reconnects = 0
+
+    def publish(self, results):
+        if self._latest is None or sum(results.values()) >= sum(self._latest.values()):
+            self._latest = results
+            self._dirty = True
+
+    async def flush(self):
+        if not self._dirty:
+            return
+        self._dirty = False
+        try:
+            await self.redis.publish(self.channel, json.dumps(self._latest))
+            self.published += 1
+        except Exception:
+            self._dirty = True
+            raise
+
+    async def run_publisher(self):
+        while True:
+            await asyncio.sleep(self.tick)
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"❌ Error al publicar resultados en Redis: {e}")
+
+    async def run_subscriber(self):
+        while True:
+            try:
+                async with self.redis.pubsub(ignore_subscribe_messages=True) as pubsub:
+                    await pubsub.subscribe(self.channel)
+                    self.broadcaster.publish(await self.snapshot())
+                    async for message in pubsub.listen():
+                        self.received += 1
+                        self.broadcaster.publish(json.loads(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.reconnects += 1
+                print(f"❌ Suscripción a {self.channel} interrumpida, se reintenta: {e}")
+                await asyncio.sleep(self.retry)
+
+    def start(self):
+        self._tasks = [
+            asyncio.create_task(self.run_subscriber()),
+            asyncio.create_task(self.run_publisher()),
+        ]
+
+    async def stop(self):
+        """Detiene las tareas; lo pendiente se publica para los demás procesos."""
+        for task in self._tasks:
+            task.cancel()
+        try:
+            await self.flush()
+        except Exception as e:
+            print(f"❌ Error en la última publicación de resultados: {e}")
+
+    def stats(self):
+        return {"published": self.published, "received": self.received, "reconnects": self.reconnects}
@@ -1,13 +1,16 @@
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-import psycopg2
-import redis
-import json
+from psycopg2.pool import ThreadedConnectionPool
+import redis.asyncio as redis
 import os
-from typing import List
 import asyncio
 
+from counters import VoteCounters
+from sync import VoteSync
+from broadcast import Broadcaster
+from fanout import RedisFanout
+
 app = FastAPI(title="Encuesta en Tiempo Real")
 
 # Permitir CORS para frontend
@@ -23,108 +26,138 @@ app.add_middleware(
 DATABASE_URL = os.getenv("DATABASE_URL", "postgresql://polls_user:polls_pass@db:5432/polls_db")
 REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/0")
 
-# Conexión a Redis
-redis_client = redis.from_url(REDIS_URL, decode_responses=True)
-
-class VoteRequest(BaseModel):
-    option: str
+# Cliente async de Redis con pool: si se agotan las conexiones se espera
+# hasta REDIS_POOL_TIMEOUT segundos en vez de fallar
+redis_pool = redis.BlockingConnectionPool.from_url(
+    REDIS_URL,
+    decode_responses=True,
+    max_connections=int(os.getenv("REDIS_MAX_CONNECTIONS", 50)),
+    timeout=float(os.getenv("REDIS_POOL_TIMEOUT", 5)),
+)
+redis_client = redis.Redis(connection_pool=redis_pool)
 
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
+RESULTS_KEY = "poll_results"
+DIRTY_KEY = "poll_results:dirty"  # opciones con votos aún no guardados en PostgreSQL
+RESULTS_CHANNEL = "poll_results:updates"  # reparto entre workers (BROADCAST_MODE=redis)
 
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.append(websocket)
+# Pool de conexiones a PostgreSQL (se usa desde hilos, nunca en el event loop)
+db_pool = ThreadedConnectionPool(0, int(os.getenv("DB_POOL_SIZE", 4)), DATABASE_URL)
 
-    def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
+# COUNTER_SHARDS > 1 reparte los incrementos de cada opción en K hashes
+# (ver counters.py); la lectura agregada se cachea COUNTER_CACHE_TTL segundos
+counters = VoteCounters(
+    redis_client, RESULTS_KEY, DIRTY_KEY,
+    shards=int(os.getenv("COUNTER_SHARDS", 1)),
+    cache_ttl=float(os.getenv("COUNTER_CACHE_TTL", 0.1)),
+)
 
-    async def broadcast(self, message: str):
-        for connection in self.active_connections:
-            try:
-                await connection.send_text(message)
-            except:
-                self.active_connections.remove(connection)
+vote_sync = VoteSync(
+    counters, db_pool,
+    min_interval=float(os.getenv("SYNC_MIN_INTERVAL", 0.5)),
+    max_interval=float(os.getenv("SYNC_MAX_INTERVAL", 10)),
+    max_pending=int(os.getenv("SYNC_MAX_PENDING", 500)),
+)
 
-manager = ConnectionManager()
+class VoteRequest(BaseModel):
+    option: str
 
-def get_db_connection():
-    return psycopg2.connect(DATABASE_URL)
+# Envío coalescido a los WebSockets: a lo sumo un mensaje cada BROADCAST_TICK
+broadcaster = Broadcaster(
+    tick=float(os.getenv("BROADCAST_TICK", 0.1)),
+    queue_size=int(os.getenv("BROADCAST_QUEUE", 8)),
+    send_timeout=float(os.getenv("BROADCAST_SEND_TIMEOUT", 5)),
+)
 
 # Cargar resultados desde PostgreSQL a Redis al iniciar
-def load_results_into_cache():
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute("SELECT option_name, vote_count FROM poll_options")
-    for option, count in cur.fetchall():
-        redis_client.hset("poll_results", option, count)
-    cur.close()
-    conn.close()
-
-# Sincronizar resultados Redis → PostgreSQL cada cierto tiempo
-async def sync_cache_to_db():
-    while True:
-        await asyncio.sleep(10)  # Cada 10 segundos
-        conn = get_db_connection()
-        cur = conn.cursor()
-        results = redis_client.hgetall("poll_results")
-        for option, count in results.items():
-            cur.execute(
-                "UPDATE poll_options SET vote_count = %s WHERE option_name = %s",
-                (count, option)
-            )
-        conn.commit()
-        cur.close()
-        conn.close()
-        print("🔄 Resultados sincronizados desde Redis a PostgreSQL")
+def read_results_from_db():
+    conn = db_pool.getconn()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT option_name, vote_count FROM poll_options")
+            return cur.fetchall()
+    finally:
+        db_pool.putconn(conn)
+
+async def load_results_into_cache():
+    rows = await asyncio.to_thread(read_results_from_db)
+    await counters.load(rows)
 
 @app.on_event("startup")
 async def startup_event():
-    load_results_into_cache()
-    asyncio.create_task(sync_cache_to_db())
+    await load_results_into_cache()
+    vote_sync.start()
+    broadcaster.start()
+    if fanout is not None:
+        fanout.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    if fanout is not None:
+        await fanout.stop()
+    broadcaster.stop()
+    # Último flush: los votos que solo estaban en Redis llegan a PostgreSQL
+    await vote_sync.stop()
+    db_pool.closeall()
+    await redis_client.aclose()
 
 # Obtener resultados directamente desde Redis
-def get_results_from_cache():
-    results = redis_client.hgetall("poll_results")
-    return {option: int(count) for option, count in results.items()}
+async def get_results_from_cache():
+    return await counters.results()
+
+# BROADCAST_MODE=redis: con varios workers o réplicas de la API, cada voto
+# se publica en Redis y cada proceso lo reparte a sus propios WebSockets.
+# Con "local" (un solo proceso) no se pasa por Redis
+fanout = None
+if os.getenv("BROADCAST_MODE", "local") == "redis":
+    fanout = RedisFanout(
+        redis_client, RESULTS_CHANNEL, broadcaster, get_results_from_cache,
+        tick=float(os.getenv("BROADCAST_TICK", 0.1)),
+    )
+publish_results = fanout.publish if fanout is not None else broadcaster.publish
 
 @app.post("/vote")
 async def vote(vote_request: VoteRequest):
     option = vote_request.option
-    valid_options = ["Computer Vision", "Data", "ML", "Web"]
 
-    if option not in valid_options:
+    # 🔥 Valida, incrementa y lee los resultados en un solo viaje a Redis
+    # (con shards, los resultados salen de la lectura agregada cacheada)
+    results = await counters.vote(option)
+    if results is None and not await counters.exists():
+        # Redis perdió los datos (reinicio sin persistencia): se recargan
+        await load_results_into_cache()
+        results = await counters.vote(option)
+    if results is None:
         raise HTTPException(status_code=400, detail="Opción inválida")
+    vote_sync.record_vote()
 
-    # 🔥 Incrementa el voto directamente en Redis (sin tocar PostgreSQL)
-    redis_client.hincrby("poll_results", option, 1)
-
-    # 🔥 Obtiene resultados actualizados desde Redis
-    results = get_results_from_cache()
-
-    await broadcast_results(results)
+    publish_results(results)
     return {"message": "Voto registrado", "results": results}
 
 @app.get("/results")
 async def get_results():
-    return {"results": get_results_from_cache()}
-
-async def broadcast_results(results):
-    message = json.dumps({"type": "results_update", "data": results})
-    await manager.broadcast(message)
+    return {"results": await get_results_from_cache()}
+
+# Contadores de este proceso (con varios workers, cada uno responde los suyos)
+@app.get("/stats")
+async def get_stats():
+    return {
+        "pid": os.getpid(),
+        "broadcast": broadcaster.stats(),
+        "sync": vote_sync.stats(),
+        "fanout": fanout.stats() if fanout is not None else None,
+    }
 
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
-    await manager.connect(websocket)
-    results = get_results_from_cache()
-    await websocket.send_text(json.dumps({"type": "results_update", "data": results}))
+    await broadcaster.connect(websocket, await get_results_from_cache())
 
     try:
         while True:
             await websocket.receive_text()
     except WebSocketDisconnect:
-        manager.disconnect(websocket)
+        pass
+    finally:
+        broadcaster.disconnect(websocket)
 
 @app.get("/")
 async def root():
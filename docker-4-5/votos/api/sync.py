@@ -0,0 +1,132 @@
+import asyncio
+import time
+
+UPSERT_SQL = """
+    INSERT INTO poll_options (option_name, vote_count)
+    SELECT * FROM UNNEST(%s::text[], %s::int[])
+    ON CONFLICT (option_name)
+    DO UPDATE SET vote_count = GREATEST(poll_options.vote_count, EXCLUDED.vote_count)
+"""
+
+
+class VoteSync:
+    """
+    Sincroniza Redis → PostgreSQL solo con las opciones que cambiaron.
+
+    Cada voto agrega la opción al set de pendientes de su shard junto con
+    el HINCRBY (ver ``VoteCounters``). El flush toma esas opciones con
+    SPOP (atómico, así varios workers no se pisan), lee sus totales
+    sumando los shards y los escribe en PostgreSQL con un solo upsert. Se
+    escriben totales y no incrementos, así que repetir un flush no
+    duplica votos, y el upsert se queda con el mayor: un flush lento de
+    otro worker con un total más viejo no hace retroceder el conteo. Si
+    PostgreSQL falla, las opciones vuelven a sus sets para el siguiente
+    intento.
+
+    El intervalo se ajusta a la tasa de votos: se busca que nunca haya
+    más de ``max_pending`` votos sin persistir, entre ``min_interval`` y
+    ``max_interval`` segundos. Si se llega a ``max_pending`` antes de
+    tiempo, el flush se adelanta.
+    """
+
+    def __init__(self, counters, pool, min_interval=0.5, max_interval=10.0, max_pending=500):
+        self.counters = counters
+        self.pool = pool
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.max_pending = max_pending
+
+        self.votes_since_flush = 0
+        self.flushes = 0
+        self.flushed_options = 0
+        self._task = None
+        self._stopping = False
+        self._wake = asyncio.Event()
+
+    def record_vote(self):
+        self.votes_since_flush += 1
+        if self.votes_since_flush >= self.max_pending:
+            self._wake.set()
+
+    def next_interval(self, elapsed):
+        rate = self.votes_since_flush / elapsed if elapsed > 0 else 0
+        if rate <= 0:
+            return self.max_interval
+        return min(self.max_interval, max(self.min_interval, self.max_pending / rate))
+
+    def _write(self, options, counts):
+        conn = self.pool.getconn()
+        try:
+            with conn.cursor() as cur:
+                cur.execute(UPSERT_SQL, (options, counts))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self.pool.putconn(conn)
+
+    async def flush(self):
+        popped = await self.counters.pop_dirty()
+        try:
+            return await self._flush(popped)
+        except BaseException:
+            # También si se cancela: las opciones no se pierden
+            await asyncio.shield(self.counters.restore_dirty(popped))
+            raise
+
+    async def _flush(self, popped):
+        options = sorted({option for _, shard_options in popped for option in shard_options})
+        if not options:
+            return 0
+        counts = await self.counters.totals(options)
+        # psycopg2 es bloqueante: la escritura corre en un hilo
+        await asyncio.to_thread(self._write, options, counts)
+        self.flushes += 1
+        self.flushed_options += len(options)
+        return len(options)
+
+    async def run(self):
+        last = time.monotonic()
+        interval = self.max_interval
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wake.wait(), interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            now = time.monotonic()
+            interval = self.next_interval(now - last)
+            last = now
+            self.votes_since_flush = 0
+            try:
+                flushed = await self.flush()
+                if flushed:
+                    print(f"🔄 {flushed} opciones sincronizadas desde Redis a PostgreSQL")
+            except Exception as e:
+                print(f"❌ Error al sincronizar con PostgreSQL: {e}")
+
+    def start(self):
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        """
+        Detiene el ciclo (esperando el flush en curso, sin cancelarlo) y
+        hace un último flush para no perder votos. El pool de PostgreSQL
+        se puede cerrar recién cuando esto termina.
+        """
+        self._stopping = True
+        self._wake.set()
+        if self._task is not None:
+            await self._task
+        try:
+            await self.flush()
+        except Exception as e:
+            print(f"❌ Error en la sincronización final: {e}")
+
+    def stats(self):
+        return {
+            "flushes": self.flushes,
+            "flushed_options": self.flushed_options,
+            "pending_votes": self.votes_since_flush,
+        }
@@ -0,0 +1,80 @@
+"""
+Comprueba que los votos llegan a los WebSockets de todos los procesos.
+
+Abre --sockets conexiones a /ws repartidas entre las URLs dadas, envía
+--votes votos por POST /vote (en rotación entre las mismas URLs) y
+espera a que cada socket reciba los totales finales.
+
+Con varios workers en un mismo puerto (BROADCAST_MODE=redis):
+
+    uvicorn main:app --port 8000 --workers 4
+    python benchmarks/fanout.py --url http://localhost:8000
+
+o con varias réplicas de la API, una URL por réplica:
+
+    python benchmarks/fanout.py --url http://localhost:8000 --url http://localhost:8001
+
+Con BROADCAST_MODE=local y más de un proceso, los sockets conectados a
+otros procesos no reciben los votos y el script termina con error.
+
+Requiere httpx y websockets (pip install httpx websockets).
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import sys
+
+import httpx
+import websockets
+
+
+async def watch(url, totals, index, ready):
+    """Guarda en ``totals[index]`` el total de votos del último mensaje recibido."""
+    async with websockets.connect(url.replace("http", "ws", 1) + "/ws") as ws:
+        ready.release()
+        async for message in ws:
+            totals[index] = sum(json.loads(message)["data"].values())
+
+
+async def main(args):
+    urls = args.url or ["http://localhost:8000"]
+    socket_urls = [url for url, _ in zip(itertools.cycle(urls), range(args.sockets))]
+    totals = [0] * args.sockets
+    ready = asyncio.Semaphore(0)
+    watchers = [asyncio.create_task(watch(url, totals, i, ready)) for i, url in enumerate(socket_urls)]
+    for _ in watchers:
+        await ready.acquire()
+
+    async with httpx.AsyncClient(timeout=30) as client:
+        options = list((await client.get(urls[0] + "/results")).json()["results"])
+        for url, _ in zip(itertools.cycle(urls), range(args.votes)):
+            response = await client.post(url + "/vote", json={"option": random.choice(options)})
+            response.raise_for_status()
+            # Votos de otros clientes pueden sumar más: se espera al menos este total
+            expected = sum(response.json()["results"].values())
+
+    deadline = asyncio.get_running_loop().time() + args.timeout
+    while min(totals) < expected and asyncio.get_running_loop().time() < deadline:
+        await asyncio.sleep(0.1)
+    for watcher in watchers:
+        watcher.cancel()
+
+    received = sum(total >= expected for total in totals)
+    print(f"{received}/{args.sockets} sockets recibieron los totales finales")
+    for url in urls:
+        missing = sum(t < expected for t, u in zip(totals, socket_urls) if u == url)
+        if missing:
+            print(f"  {url}: {missing} sockets sin los totales finales")
+    if received < args.sockets:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", action="append", help="URL de la API; se puede repetir")
+    parser.add_argument("--sockets", type=int, default=50)
+    parser.add_argument("--votes", type=int, default=200)
+    parser.add_argument("--timeout", type=float, default=10)
+    asyncio.run(main(parser.parse_args()))
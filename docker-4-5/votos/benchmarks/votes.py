@@ -0,0 +1,115 @@
+"""
+Votos por segundo: acceso a Redis anterior contra el actual.
+
+  antes    cliente síncrono dentro de corutinas: HINCRBY y luego HGETALL,
+           dos idas a Redis que bloquean el event loop
+  despues  cliente async con pool y el script Lua de /vote: una ida
+
+    python benchmarks/votes.py --redis redis://localhost:6379/0 --votes 20000 --concurrency 100
+
+Con --url se mide la API completa (POST /vote), por ejemplo antes y
+después de actualizar el contenedor:
+
+    python benchmarks/votes.py --url http://localhost:8000 --votes 5000
+
+Usa las claves bench:* y las borra al terminar.
+Requiere redis y httpx (pip install redis httpx).
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+
+import redis
+import redis.asyncio as aioredis
+
+
+OPTIONS = ["Computer Vision", "Data", "ML", "Web"]
+RESULTS_KEY = "bench:poll_results"
+DIRTY_KEY = "bench:poll_results:dirty"
+
+
+def vote_script_source():
+    """El mismo script que usa la API."""
+    with open(os.path.join(os.path.dirname(__file__), "..", "api", "counters.py")) as f:
+        source = f.read()
+    start = source.index('VOTE_SCRIPT = """') + len('VOTE_SCRIPT = """')
+    return source[start:source.index('"""', start)]
+
+
+async def run_concurrent(votes, concurrency, vote):
+    remaining = votes
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            await vote(random.choice(OPTIONS))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return votes / (time.perf_counter() - started)
+
+
+async def bench_before(url, votes, concurrency):
+    client = redis.from_url(url, decode_responses=True)
+
+    async def vote(option):
+        client.hincrby(RESULTS_KEY, option, 1)
+        client.hgetall(RESULTS_KEY)
+
+    return await run_concurrent(votes, concurrency, vote)
+
+
+async def bench_after(url, votes, concurrency):
+    pool = aioredis.BlockingConnectionPool.from_url(url, decode_responses=True, max_connections=concurrency)
+    client = aioredis.Redis(connection_pool=pool)
+    script = client.register_script(vote_script_source())
+
+    async def vote(option):
+        await script(keys=[RESULTS_KEY, DIRTY_KEY], args=[option, 1])
+
+    try:
+        return await run_concurrent(votes, concurrency, vote)
+    finally:
+        await client.aclose()
+
+
+async def bench_http(url, votes, concurrency):
+    import httpx
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30) as client:
+        async def vote(option):
+            response = await client.post("/vote", json={"option": option})
+            response.raise_for_status()
+
+        return await run_concurrent(votes, concurrency, vote)
+
+
+def main(args):
+    if args.url:
+        rate = asyncio.run(bench_http(args.url, args.votes, args.concurrency))
+        print(f"API {args.url}: {rate:,.0f} votos/s")
+        return
+
+    setup = redis.from_url(args.redis, decode_responses=True)
+    setup.delete(RESULTS_KEY, DIRTY_KEY)
+    setup.hset(RESULTS_KEY, mapping={option: 0 for option in OPTIONS})
+    try:
+        before = asyncio.run(bench_before(args.redis, args.votes, args.concurrency))
+        after = asyncio.run(bench_after(args.redis, args.votes, args.concurrency))
+    finally:
+        setup.delete(RESULTS_KEY, DIRTY_KEY)
+    print(f"antes   (síncrono, 2 idas):   {before:>10,.0f} votos/s")
+    print(f"después (async + Lua, 1 ida): {after:>10,.0f} votos/s  ({after / before:.1f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--redis", default=os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+    parser.add_argument("--url", help="medir POST /vote de la API en esta URL")
+    parser.add_argument("--votes", type=int, default=20000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    main(parser.parse_args())
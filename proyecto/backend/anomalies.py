@@ -0,0 +1,183 @@
+# anomalies.py
+import time
+import warnings
+from collections import OrderedDict
+
+import numpy as np
+
+# Orden de las columnas en las ventanas y en las matrices de lecturas
+METRICS = (
+    "frecuencia_cardiaca",
+    "presion_sistolica",
+    "presion_diastolica",
+    "temperatura",
+    "saturacion_oxigeno",
+)
+LABELS = {
+    "frecuencia_cardiaca": "Frecuencia cardíaca",
+    "presion_sistolica": "Presión sistólica",
+    "presion_diastolica": "Presión diastólica",
+    "temperatura": "Temperatura",
+    "saturacion_oxigeno": "Saturación de oxígeno",
+}
+
+# Umbrales fijos por métrica (mínimo, máximo)
+LOW = np.array([40, 90, -np.inf, 35.0, 90], dtype=np.float64)
+HIGH = np.array([130, 180, 110, 38.5, np.inf], dtype=np.float64)
+
+# Tendencias: cambio entre el inicio y el final de la ventana que dispara
+# alerta (positivo = subida, negativo = caída, 0 = sin regla)
+TREND = np.array([25, -30, 0, 1.5, -5], dtype=np.float64)
+TREND_SPAN = 3
+
+# Posición de cada métrica en las filas de ingest.VITALS_COLUMNS
+_ROW_COLUMNS = [4, 2, 3, 5, 6]
+
+
+def _range_text(j):
+    if np.isinf(LOW[j]):
+        return f"máx. {HIGH[j]:g}"
+    if np.isinf(HIGH[j]):
+        return f"mín. {LOW[j]:g}"
+    return f"{LOW[j]:g}-{HIGH[j]:g}"
+
+
+def rows_to_matrix(rows):
+    """Convierte filas de ``VITALS_COLUMNS`` en una matriz (N, 5) con NaN."""
+    matrix = np.array(
+        [[np.nan if row[c] is None else float(row[c]) for c in _ROW_COLUMNS] for row in rows],
+        dtype=np.float64,
+    )
+    return matrix.reshape(len(rows), len(METRICS))
+
+
+class _Window:
+    """Buffer circular de las últimas lecturas de un paciente."""
+
+    __slots__ = ("values", "count", "pos")
+
+    def __init__(self, size):
+        self.values = np.full((size, len(METRICS)), np.nan)
+        self.count = 0
+        self.pos = 0
+
+    def push(self, matrix):
+        size = len(self.values)
+        for reading in matrix[-size:]:
+            self.values[self.pos] = reading
+            self.pos = (self.pos + 1) % size
+            self.count = min(self.count + 1, size)
+
+    def ordered(self):
+        if self.count < len(self.values):
+            return self.values[:self.count]
+        return np.roll(self.values, -self.pos, axis=0)
+
+
+class VitalsMonitor:
+    """
+    Evalúa cada lectura al momento de ingresar, sin volver a consultar
+    ``signos_vitales``: mantiene una ventana circular por paciente y aplica
+    reglas de umbral y de tendencia sobre arreglos NumPy.
+
+    Cada regla tiene un período de enfriamiento por paciente para no
+    repetir la misma alerta con cada lectura.
+    """
+
+    def __init__(self, window=30, cooldown=600, max_patients=10000):
+        self.window = window
+        self.cooldown = cooldown
+        self.max_patients = max_patients
+        self._windows = OrderedDict()
+        self._last_alert = {}
+
+        self.evaluated = 0
+        self.alerts = 0
+
+    def _window_for(self, paciente_id):
+        window = self._windows.get(paciente_id)
+        if window is None:
+            window = self._windows[paciente_id] = _Window(self.window)
+            if len(self._windows) > self.max_patients:
+                evicted, _ = self._windows.popitem(last=False)
+                self._last_alert = {
+                    k: v for k, v in self._last_alert.items() if k[0] != evicted
+                }
+        else:
+            self._windows.move_to_end(paciente_id)
+        return window
+
+    def observe(self, rows):
+        """
+        Registra lecturas (filas de ``VITALS_COLUMNS``) y devuelve la lista
+        de alertas nuevas como diccionarios.
+        """
+        if not rows:
+            return []
+        matrix = rows_to_matrix(rows)
+        patient_ids = np.array([row[0] for row in rows])
+        self.evaluated += len(rows)
+
+        # Umbrales: todas las lecturas y métricas en una sola comparación
+        with np.errstate(invalid="ignore"):
+            below = matrix < LOW
+            above = matrix > HIGH
+
+        now = time.monotonic()
+        alerts = []
+        for paciente_id in np.unique(patient_ids):
+            paciente_id = int(paciente_id)
+            mask = patient_ids == paciente_id
+            window = self._window_for(paciente_id)
+            readings = matrix[mask]
+            window.push(readings)
+
+            # Se reporta la violación más reciente de cada métrica
+            out_of_range = below[mask] | above[mask]
+            for j in np.flatnonzero(out_of_range.any(axis=0)):
+                metric = METRICS[j]
+                value = readings[out_of_range[:, j], j][-1]
+                alerts += self._alert(now, paciente_id, f"umbral:{metric}", (
+                    f"{LABELS[metric]} fuera de rango: {value:g} ({_range_text(j)})"
+                ))
+
+            alerts += self._trends(now, paciente_id, window.ordered())
+        self.alerts += len(alerts)
+        return alerts
+
+    def _trends(self, now, paciente_id, values):
+        if len(values) < 2 * TREND_SPAN:
+            return []
+        # nanmean avisa cuando una métrica no tiene lecturas en el tramo
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            start = np.nanmean(values[:TREND_SPAN], axis=0)
+            end = np.nanmean(values[-TREND_SPAN:], axis=0)
+        delta = end - start
+        rising = (TREND > 0) & (delta >= TREND)
+        falling = (TREND < 0) & (delta <= TREND)
+
+        alerts = []
+        for j in np.flatnonzero(rising | falling):
+            metric = METRICS[j]
+            direction = "en aumento" if rising[j] else "en descenso"
+            alerts += self._alert(now, paciente_id, f"tendencia:{metric}", (
+                f"{LABELS[metric]} {direction}: {start[j]:g} → {end[j]:g} "
+                f"en las últimas {len(values)} lecturas"
+            ))
+        return alerts
+
+    def _alert(self, now, paciente_id, rule, message):
+        key = (paciente_id, rule)
+        last = self._last_alert.get(key)
+        if last is not None and now - last < self.cooldown:
+            return []
+        self._last_alert[key] = now
+        return [{"paciente_id": paciente_id, "regla": rule, "mensaje": message}]
+
+    def stats(self):
+        return {
+            "patients": len(self._windows),
+            "evaluated": self.evaluated,
+            "alerts": self.alerts,
+        }
@@ -0,0 +1,221 @@
+# archive.py
+import asyncio
+import datetime
+import re
+
+# Tablas particionadas por mes: columna de fecha, tabla de archivo y si la
+# columna es TIMESTAMP (particionada por UNIX_TIMESTAMP) o DATETIME
+ARCHIVED_TABLES = {
+    "signos_vitales": ("fecha_registro", "signos_vitales_archivo", False),
+    "notificaciones": ("fecha_envio", "notificaciones_archivo", True),
+    "auditoria": ("fecha_accion", "auditoria_archivo", True),
+}
+
+MAXVALUE_PARTITION = "p_futuro"
+
+
+def history_source(table, archived_until):
+    """
+    Origen para el ``FROM`` de una consulta sobre ``table``: la tabla viva
+    o, con ``archived_until``, la unión con su tabla de archivo (MySQL
+    empuja los filtros del ``WHERE`` a ambas ramas).
+
+    Del archivo solo se toman las filas anteriores a ``archived_until``:
+    una partición copiada pero todavía no eliminada tiene sus filas en
+    ambas tablas y sin el filtro aparecerían dos veces.
+    """
+    if archived_until is None:
+        return table
+    column, archive, _ = ARCHIVED_TABLES[table]
+    return (
+        f"(SELECT * FROM {table} UNION ALL "
+        f"SELECT * FROM {archive} WHERE {column} < '{archived_until:%Y-%m-%d %H:%M:%S}') AS {table}"
+    )
+
+
+def _archived_until(partitions):
+    """
+    Límite de lo ya archivado: el inicio del mes de la primera partición
+    viva (``pAAAAMM``); las anteriores se eliminaron tras copiarse. Con
+    ``p_antiguo`` todavía presente no hay nada archivado.
+    """
+    if not partitions or not re.fullmatch(r"p\d{6}", partitions[0][0]):
+        return None
+    name = partitions[0][0]
+    return datetime.datetime(int(name[1:5]), int(name[5:7]), 1)
+
+
+def _month_start(value, months=0):
+    month = value.month - 1 + months
+    return datetime.datetime(value.year + month // 12, month % 12 + 1, 1)
+
+
+def _bound_sql(bound, timestamp):
+    literal = f"'{bound:%Y-%m-%d %H:%M:%S}'"
+    return f"UNIX_TIMESTAMP({literal})" if timestamp else literal
+
+
+class DataLifecycle:
+    """
+    Mantenimiento de las tablas históricas particionadas por mes
+    (migración 004):
+
+    - crea las particiones de los próximos ``months_ahead`` meses
+      dividiendo ``p_futuro``;
+    - copia a la tabla de archivo (comprimida) las particiones que quedaron
+      completas por detrás de ``retention`` días, en lotes de ``batch_size``
+      filas con un commit por lote, y después hace ``DROP PARTITION``.
+
+    ``GET_LOCK`` evita que dos procesos de la API lo corran a la vez, y el
+    ``INSERT IGNORE`` permite retomar una copia interrumpida.
+    """
+
+    def __init__(self, db, retention, batch_size=5000, interval=3600, months_ahead=3):
+        self.db = db
+        self.retention = retention
+        self.batch_size = batch_size
+        self.interval = interval
+        self.months_ahead = months_ahead
+
+        self.archived_until = {}
+        self.archived_rows = 0
+        self.dropped_partitions = 0
+        self.last_run = None
+        self.last_error = None
+        self._warned = set()
+
+    def covers_archive(self, table, desde):
+        """Indica si una consulta desde ``desde`` necesita leer el archivo."""
+        archived_until = self.archived_until.get(table)
+        return archived_until is not None and desde is not None and desde < archived_until
+
+    def history_source(self, table, include_archive):
+        """``history_source`` con el límite archivado conocido de ``table``."""
+        return history_source(table, self.archived_until.get(table) if include_archive else None)
+
+    async def load(self):
+        # Se deduce de las particiones (information_schema) en vez de
+        # recorrer las tablas de archivo, que solo crecen
+        async with self.db.session(instrument=False) as session:
+            for table in ARCHIVED_TABLES:
+                self.archived_until[table] = _archived_until(await self._partitions(session, table))
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.run_once()
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"❌ Error en el archivado de datos históricos: {e}")
+
+    async def run_once(self):
+        async with self.db.session(instrument=False) as session:
+            # La hora de la base, no la del proceso: los límites de las
+            # particiones están en la zona horaria de la sesión
+            row = await session.fetchone("SELECT GET_LOCK('siacom_archivado', 0) AS lock_ok, NOW() AS ahora")
+            if not row or not row["lock_ok"]:
+                return
+            now = row["ahora"]
+            try:
+                for table, days in self.retention.items():
+                    partitions = await self._partitions(session, table)
+                    if not partitions:
+                        if table not in self._warned:
+                            self._warned.add(table)
+                            print(f"❌ {table} no está particionada; aplique la migración 004")
+                        continue
+                    await self._ensure_partitions(session, table, partitions, now)
+                    cutoff = now - datetime.timedelta(days=days)
+                    for name, bound in partitions:
+                        if bound is not None and bound <= cutoff:
+                            if await self._archive_partition(session, table, name):
+                                # Sin esperar a load(): lo eliminado ya se lee del archivo
+                                self.archived_until[table] = bound
+            finally:
+                await session.fetchone("SELECT RELEASE_LOCK('siacom_archivado') AS released")
+        self.last_run = datetime.datetime.now()
+        self.last_error = None
+        await self.load()
+
+    async def _partitions(self, session, table):
+        # El límite se convierte en MySQL: FROM_UNIXTIME usa la zona horaria
+        # de la sesión, la misma con la que UNIX_TIMESTAMP() definió la
+        # partición y con la que se leen y comparan las columnas TIMESTAMP
+        rows = await session.fetchall("""
+            SELECT PARTITION_NAME AS nombre,
+                   CASE
+                       WHEN PARTITION_DESCRIPTION = 'MAXVALUE' THEN NULL
+                       WHEN LEFT(PARTITION_DESCRIPTION, 1) = CHAR(39)
+                           THEN CAST(TRIM(BOTH CHAR(39) FROM PARTITION_DESCRIPTION) AS DATETIME)
+                       ELSE FROM_UNIXTIME(CAST(PARTITION_DESCRIPTION AS UNSIGNED))
+                   END AS limite
+            FROM information_schema.PARTITIONS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL
+            ORDER BY PARTITION_ORDINAL_POSITION
+        """, (table,))
+        return [(row["nombre"], row["limite"]) for row in rows]
+
+    async def _ensure_partitions(self, session, table, partitions, now):
+        timestamp = ARCHIVED_TABLES[table][2]
+        bounds = [bound for _, bound in partitions if bound is not None]
+        if partitions[-1][1] is not None or not bounds:
+            return
+        last = bounds[-1]
+        target = _month_start(now, self.months_ahead + 1)
+        while last < target:
+            upper = _month_start(last, 1)
+            await session.execute(f"""
+                ALTER TABLE {table} REORGANIZE PARTITION {MAXVALUE_PARTITION} INTO (
+                    PARTITION p{last:%Y%m} VALUES LESS THAN ({_bound_sql(upper, timestamp)}),
+                    PARTITION {MAXVALUE_PARTITION} VALUES LESS THAN (MAXVALUE)
+                )
+            """)
+            last = upper
+
+    async def _archive_partition(self, session, table, partition):
+        column, archive, _ = ARCHIVED_TABLES[table]
+        last_id = 0
+        while True:
+            row = await session.fetchone(f"""
+                SELECT MAX(id) AS hasta, COUNT(*) AS filas FROM (
+                    SELECT id FROM {table} PARTITION ({partition})
+                    WHERE id > %s ORDER BY id LIMIT %s
+                ) AS lote
+            """, (last_id, self.batch_size))
+            if not row["filas"]:
+                break
+            await session.execute(f"""
+                INSERT IGNORE INTO {archive}
+                SELECT * FROM {table} PARTITION ({partition})
+                WHERE id > %s AND id <= %s
+            """, (last_id, row["hasta"]))
+            await session.commit()
+            self.archived_rows += row["filas"]
+            last_id = row["hasta"]
+
+        # Solo se elimina la partición si todas sus filas están en el archivo
+        missing = await session.fetchone(f"""
+            SELECT COUNT(*) AS faltantes
+            FROM {table} PARTITION ({partition}) AS viva
+            LEFT JOIN {archive} AS archivo ON archivo.id = viva.id AND archivo.{column} = viva.{column}
+            WHERE archivo.id IS NULL
+        """)
+        await session.commit()
+        if missing["faltantes"]:
+            print(f"❌ {table}.{partition}: {missing['faltantes']} filas sin archivar, se reintentará")
+            return False
+        await session.execute(f"ALTER TABLE {table} DROP PARTITION {partition}")
+        self.dropped_partitions += 1
+        print(f"📦 {table}.{partition} archivada en {archive}")
+        return True
+
+    def stats(self):
+        return {
+            "retention_days": self.retention,
+            "archived_until": self.archived_until,
+            "archived_rows": self.archived_rows,
+            "dropped_partitions": self.dropped_partitions,
+            "last_run": self.last_run,
+            "last_error": self.last_error,
+        }
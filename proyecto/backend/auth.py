@@ -0,0 +1,117 @@
+# auth.py
+import asyncio
+import datetime
+import hmac
+import os
+import secrets
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+import jwt
+from fastapi import Depends, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+
+SECRET_KEY = os.getenv("SECRET_KEY")
+if not SECRET_KEY:
+    # Una clave fija y pública permitiría falsificar tokens del personal.
+    # La aleatoria invalida los tokens en cada reinicio y no sirve con
+    # varios workers o réplicas: en esos casos hay que definir SECRET_KEY
+    SECRET_KEY = secrets.token_urlsafe(32)
+    print("❌ SECRET_KEY no está definida: se usa una clave aleatoria por arranque")
+ALGORITHM = "HS256"
+ACCESS_TOKEN_MINUTES = int(os.getenv("ACCESS_TOKEN_MINUTES", 60))
+FAMILY_TOKEN_MINUTES = int(os.getenv("FAMILY_TOKEN_MINUTES", 720))
+
+
+class PasswordHasher:
+    """
+    bcrypt fuera del event loop: cada hash cuesta decenas de milisegundos
+    de CPU, así que corre en un pool de hilos acotado (bcrypt libera el
+    GIL). El semáforo limita los logins en vuelo para que una ráfaga no
+    acumule trabajo sin fin detrás del pool.
+    """
+
+    def __init__(self, workers=4, max_pending=64, rounds=12):
+        self.rounds = rounds
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._slots = asyncio.Semaphore(max_pending)
+        # Se verifica contra este hash cuando el usuario no existe, para que
+        # la respuesta tarde lo mismo que con una contraseña incorrecta
+        self._dummy = bcrypt.hashpw(b"dummy", bcrypt.gensalt(rounds))
+
+    async def _run(self, fn, *args):
+        async with self._slots:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, fn, *args)
+
+    async def hash(self, password):
+        hashed = await self._run(bcrypt.hashpw, password.encode(), bcrypt.gensalt(self.rounds))
+        return hashed.decode()
+
+    async def verify(self, password, hashed):
+        """
+        Compara contra un hash bcrypt. Las contraseñas heredadas en texto
+        plano se comparan en tiempo constante; el llamador debe volver a
+        guardarlas con ``hash`` (ver ``needs_rehash``).
+        """
+        if hashed is None:
+            await self._run(bcrypt.checkpw, password.encode(), self._dummy)
+            return False
+        if self.needs_rehash(hashed):
+            return hmac.compare_digest(password.encode(), hashed.encode())
+        return await self._run(bcrypt.checkpw, password.encode(), hashed.encode())
+
+    @staticmethod
+    def needs_rehash(hashed):
+        return not hashed.startswith(("$2a$", "$2b$", "$2y$"))
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+
+def create_access_token(claims, minutes=ACCESS_TOKEN_MINUTES):
+    now = datetime.datetime.now(datetime.timezone.utc)
+    payload = {**claims, "iat": now, "exp": now + datetime.timedelta(minutes=minutes)}
+    return jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
+
+
+def decode_access_token(token):
+    try:
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except jwt.ExpiredSignatureError:
+        raise HTTPException(status_code=401, detail="Token expirado",
+                            headers={"WWW-Authenticate": "Bearer"})
+    except jwt.InvalidTokenError:
+        raise HTTPException(status_code=401, detail="Token inválido",
+                            headers={"WWW-Authenticate": "Bearer"})
+
+
+bearer_scheme = HTTPBearer(auto_error=False)
+
+
+def _claims(credentials):
+    if credentials is None:
+        raise HTTPException(status_code=401, detail="No autenticado",
+                            headers={"WWW-Authenticate": "Bearer"})
+    return decode_access_token(credentials.credentials)
+
+
+async def current_user(credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme)):
+    """Dependencia para endpoints del personal: valida el token sin ir a la base."""
+    claims = _claims(credentials)
+    if claims.get("type") != "usuario":
+        raise HTTPException(status_code=403, detail="Token no autorizado para este recurso")
+    return claims
+
+
+async def current_family(credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme)):
+    """Dependencia para endpoints de familiares."""
+    claims = _claims(credentials)
+    if claims.get("type") != "familiar":
+        raise HTTPException(status_code=403, detail="Token no autorizado para este recurso")
+    return claims
+
+
+def check_family_patient(claims, patient_id):
+    if claims.get("patient_id") != patient_id:
+        raise HTTPException(status_code=403, detail="No tiene acceso a este paciente")
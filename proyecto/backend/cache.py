@@ -0,0 +1,93 @@
+# cache.py
+import asyncio
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    Caché en memoria con expiración por entrada y tamaño acotado (LRU).
+
+    ``get_or_load`` agrupa las cargas concurrentes de una misma clave: si
+    varios requests piden el mismo valor a la vez, solo uno va a la base
+    de datos y el resto espera ese resultado.
+    """
+
+    def __init__(self, ttl=30.0, max_entries=10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._loading = {}
+        self._generation = {}
+        self._epoch = 0
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if time.monotonic() >= expires_at:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def __contains__(self, key):
+        """Si la clave tiene un valor vigente (sin alterar el orden LRU)."""
+        entry = self._entries.get(key)
+        return entry is not None and time.monotonic() < entry[0]
+
+    def set(self, key, value, ttl=None):
+        self._entries[key] = (time.monotonic() + (ttl or self.ttl), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        """Descarta la entrada; una carga en curso ya no se guardará."""
+        self._entries.pop(key, None)
+        self._loading.pop(key, None)
+        self._generation[key] = self._generation.get(key, 0) + 1
+
+    def clear(self):
+        self._entries.clear()
+        self._epoch += 1
+
+    def _version(self, key):
+        return (self._epoch, self._generation.get(key, 0))
+
+    async def get_or_load(self, key, loader, ttl=None):
+        """``ttl`` puede ser una función que recibe el valor cargado."""
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        pending = self._loading.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        version = self._version(key)
+        future = asyncio.ensure_future(loader())
+        self._loading[key] = future
+        try:
+            value = await asyncio.shield(future)
+        finally:
+            if self._loading.get(key) is future:
+                del self._loading[key]
+
+        # Si hubo una escritura mientras se cargaba, el valor ya es viejo
+        if value is not None and self._version(key) == version:
+            self.set(key, value, ttl(value) if callable(ttl) else ttl)
+        return value
+
+    def stats(self):
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
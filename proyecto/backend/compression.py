@@ -0,0 +1,143 @@
+# compression.py
+import zlib
+
+try:
+    import brotli
+except ImportError:  # sin brotli solo se ofrece gzip
+    brotli = None
+
+
+def choose_encoding(accept_encoding):
+    """Elige ``br`` o ``gzip`` según ``Accept-Encoding`` (respetando ``q=0``)."""
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+    if brotli is not None and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+class _Compressor:
+    def __init__(self, encoding, gzip_level, brotli_quality):
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=brotli_quality)
+            self._zlib = None
+        else:
+            self._brotli = None
+            self._zlib = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+
+    def chunk(self, data):
+        """Comprime un bloque y lo vacía para que el cliente lo reciba ya."""
+        if self._brotli is not None:
+            return self._brotli.process(data) + self._brotli.flush()
+        return self._zlib.compress(data) + self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data=b""):
+        if self._brotli is not None:
+            return self._brotli.process(data) + self._brotli.finish()
+        return self._zlib.compress(data) + self._zlib.flush()
+
+
+def _with_vary(headers):
+    """Agrega ``Accept-Encoding`` al ``Vary`` de la respuesta (sin duplicarlo)."""
+    headers = list(headers)
+    for i, (name, value) in enumerate(headers):
+        if name.lower() == b"vary":
+            tokens = [token.strip().lower() for token in value.split(b",")]
+            if b"accept-encoding" not in tokens and b"*" not in tokens:
+                headers[i] = (name, value + b", Accept-Encoding")
+            return headers
+    headers.append((b"vary", b"Accept-Encoding"))
+    return headers
+
+
+def _negotiable(headers):
+    """Las respuestas ya codificadas y los event-stream no se comprimen nunca."""
+    headers = dict(headers)
+    return not (b"content-encoding" in headers
+                or headers.get(b"content-type", b"").startswith(b"text/event-stream"))
+
+
+class CompressionMiddleware:
+    """
+    Middleware ASGI que comprime con brotli o gzip las respuestas de al
+    menos ``minimum_size`` bytes. Las respuestas en streaming (exportes
+    NDJSON) se comprimen bloque a bloque sin acumularlas en memoria.
+
+    Toda respuesta que podría haberse comprimido lleva ``Vary:
+    Accept-Encoding``, también las que salen sin comprimir (cliente sin
+    gzip/br o cuerpo chico): si no, un caché intermedio podría entregar la
+    versión comprimida a un cliente que no la acepta, o al revés.
+    """
+
+    def __init__(self, app, minimum_size=1024, gzip_level=6, brotli_quality=4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        headers = dict(scope["headers"])
+        encoding = choose_encoding(headers.get(b"accept-encoding", b"").decode("latin-1"))
+        if encoding is None:
+            async def send_identity(message):
+                if message["type"] == "http.response.start" and _negotiable(message.get("headers", [])):
+                    message = {**message, "headers": _with_vary(message.get("headers", []))}
+                await send(message)
+
+            return await self.app(scope, receive, send_identity)
+
+        start = None
+        compressor = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start, compressor, passthrough
+            if passthrough:
+                return await send(message)
+
+            if message["type"] == "http.response.start":
+                if not _negotiable(message.get("headers", [])):
+                    passthrough = True
+                    return await send(message)
+                start = {**message, "headers": _with_vary(message.get("headers", []))}
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if compressor is None:
+                if not more_body and len(body) < self.minimum_size:
+                    passthrough = True
+                    await send(start)
+                    return await send(message)
+
+                compressor = _Compressor(encoding, self.gzip_level, self.brotli_quality)
+                response_headers = [
+                    (k, v) for k, v in start.get("headers", []) if k != b"content-length"
+                ]
+                response_headers.append((b"content-encoding", encoding.encode()))
+                if not more_body:
+                    body = compressor.finish(body)
+                    response_headers.append((b"content-length", str(len(body)).encode()))
+                    await send({**start, "headers": response_headers})
+                    return await send({"type": "http.response.body", "body": body})
+                await send({**start, "headers": response_headers})
+
+            if more_body:
+                await send({"type": "http.response.body", "body": compressor.chunk(body), "more_body": True})
+            else:
+                await send({"type": "http.response.body", "body": compressor.finish(body)})
+
+        await self.app(scope, receive, send_compressed)
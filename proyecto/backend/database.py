@@ -1,28 +1,556 @@
 # database.py
+import asyncio
 import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
 import mysql.connector
+from fastapi import Request
 from mysql.connector import Error
 
-class DatabaseManager:
-    def __init__(self):
-        # Lee la configuración desde las variables de entorno
-        self.db_config = {
-            "host": os.getenv("DB_HOST", "db4free.net"),
-            "user": os.getenv("DB_USER", "siacom_user"),
-            "password": os.getenv("DB_PASSWORD", "admin123"),
-            "database": os.getenv("DB_NAME", "siacom_db"),
-            "port": int(os.getenv("DB_PORT", 3306))
+from instrumentation import QueryMetrics
+from routing import ReplicaRouter, request_keys
+
+try:
+    import aiomysql
+except ImportError:  # solo es necesario con DB_MODE=async
+    aiomysql = None
+
+
+class PoolTimeoutError(Exception):
+    """Se agotó el tiempo de espera por una conexión libre del pool."""
+
+
+class ConnectionPool:
+    """
+    Pool de conexiones MySQL compartido por todos los endpoints.
+
+    Las conexiones se crean bajo demanda hasta ``size``; al devolverlas se
+    guardan ociosas para el siguiente request, evitando el handshake
+    TCP + autenticación en cada llamada.
+    """
+
+    def __init__(self, db_config, size=10, timeout=5.0, recycle=1800, pre_ping=True):
+        self.db_config = db_config
+        self.size = size
+        self.timeout = timeout
+        self.recycle = recycle
+        self.pre_ping = pre_ping
+
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._created_at = {}
+
+        # Estadísticas
+        self._in_use = 0
+        self._created = 0
+        self._recycled = 0
+        self._waits = 0
+        self._wait_time = 0.0
+        self._timeouts = 0
+
+    def _connect(self):
+        conn = mysql.connector.connect(**self.db_config)
+        with self._lock:
+            self._created += 1
+            self._created_at[id(conn)] = time.monotonic()
+        return conn
+
+    def _discard(self, conn):
+        with self._lock:
+            self._created_at.pop(id(conn), None)
+        try:
+            conn.close()
+        except Error:
+            pass
+
+    def _is_usable(self, conn):
+        """Valida la conexión y la descarta si superó su tiempo de vida."""
+        created_at = self._created_at.get(id(conn), 0)
+        if self.recycle and time.monotonic() - created_at > self.recycle:
+            with self._lock:
+                self._recycled += 1
+            return False
+        if not self.pre_ping:
+            return True
+        try:
+            conn.ping(reconnect=False)
+            return True
+        except Error:
+            return False
+
+    def acquire(self):
+        """Toma una conexión del pool, esperando como máximo ``timeout`` segundos."""
+        start = time.monotonic()
+        if not self._slots.acquire(blocking=False):
+            acquired = self._slots.acquire(timeout=self.timeout)
+            self.record_wait(time.monotonic() - start, timed_out=not acquired)
+            if not acquired:
+                raise PoolTimeoutError(
+                    f"No hay conexiones libres tras esperar {self.timeout}s"
+                )
+
+        try:
+            conn = None
+            while conn is None:
+                try:
+                    candidate = self._idle.get_nowait()
+                except queue.Empty:
+                    conn = self._connect()
+                    break
+                if self._is_usable(candidate):
+                    conn = candidate
+                else:
+                    self._discard(candidate)
+        except Exception:
+            self._slots.release()
+            raise
+
+        with self._lock:
+            self._in_use += 1
+        return conn
+
+    def record_wait(self, seconds, timed_out=False):
+        with self._lock:
+            self._waits += 1
+            self._wait_time += seconds
+            if timed_out:
+                self._timeouts += 1
+
+    def release(self, conn):
+        """Devuelve la conexión al pool, descartando transacciones pendientes."""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.put(conn)
+        except Error:
+            self._discard(conn)
+        finally:
+            with self._lock:
+                self._in_use -= 1
+            self._slots.release()
+
+    def close(self):
+        while True:
+            try:
+                self._discard(self._idle.get_nowait())
+            except queue.Empty:
+                break
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": self.size,
+                "in_use": self._in_use,
+                "idle": self._idle.qsize(),
+                "created": self._created,
+                "recycled": self._recycled,
+                "waits": self._waits,
+                "wait_time_ms": round(self._wait_time * 1000, 2),
+                "timeouts": self._timeouts,
+            }
+
+
+class AsyncConnectionPool:
+    """
+    Equivalente asíncrono de ``ConnectionPool`` sobre ``aiomysql``.
+
+    Expone las mismas estadísticas para poder comparar ambos modos.
+    """
+
+    def __init__(self, db_config, size=10, timeout=5.0, recycle=1800, pre_ping=True):
+        if aiomysql is None:
+            raise RuntimeError("DB_MODE=async requiere instalar aiomysql")
+        self.db_config = dict(db_config)
+        self.db_config["db"] = self.db_config.pop("database")
+        self.size = size
+        self.timeout = timeout
+        self.recycle = recycle
+        self.pre_ping = pre_ping
+        self._pool = None
+
+        self._in_use = 0
+        self._waits = 0
+        self._wait_time = 0.0
+        self._timeouts = 0
+
+    async def open(self):
+        self._pool = await aiomysql.create_pool(
+            minsize=0,
+            maxsize=self.size,
+            pool_recycle=self.recycle,
+            autocommit=False,
+            **self.db_config,
+        )
+
+    async def acquire(self):
+        start = time.monotonic()
+        if self._pool.freesize == 0 and self._pool.size >= self.size:
+            self._waits += 1
+        try:
+            conn = await asyncio.wait_for(self._pool.acquire(), self.timeout)
+        except asyncio.TimeoutError:
+            self._timeouts += 1
+            raise PoolTimeoutError(
+                f"No hay conexiones libres tras esperar {self.timeout}s"
+            )
+        finally:
+            self._wait_time += time.monotonic() - start
+
+        if self.pre_ping:
+            try:
+                await conn.ping(reconnect=True)
+            except Exception:
+                self._pool.release(conn)
+                raise
+        self._in_use += 1
+        return conn
+
+    async def release(self, conn):
+        try:
+            if conn.get_transaction_status():
+                await conn.rollback()
+        finally:
+            self._in_use -= 1
+            self._pool.release(conn)
+
+    async def close(self):
+        if self._pool is not None:
+            self._pool.close()
+            await self._pool.wait_closed()
+
+    def stats(self):
+        return {
+            "size": self.size,
+            "in_use": self._in_use,
+            "idle": self._pool.freesize if self._pool else 0,
+            "created": self._pool.size if self._pool else 0,
+            "waits": self._waits,
+            "wait_time_ms": round(self._wait_time * 1000, 2),
+            "timeouts": self._timeouts,
         }
 
-    def get_connection(self):
-        """Crea una nueva conexión para cada solicitud"""
+
+class Session:
+    """
+    Acceso a datos prestado a un request. Todas las operaciones son
+    ``async`` sin importar el driver, así los endpoints no cambian
+    entre ``DB_MODE=sync`` y ``DB_MODE=async``.
+    """
+
+    lastrowid = None
+
+    async def fetchone(self, sql, params=()):
+        raise NotImplementedError
+
+    async def fetchall(self, sql, params=()):
+        raise NotImplementedError
+
+    async def fetchall_tuples(self, sql, params=()):
+        """
+        Devuelve ``(columnas, filas)`` con cada fila como tupla, sin armar
+        un diccionario por fila. Útil para resultados grandes que se
+        procesan por posición.
+        """
+        raise NotImplementedError
+
+    async def execute(self, sql, params=()):
+        raise NotImplementedError
+
+    async def executemany(self, sql, seq_params):
+        raise NotImplementedError
+
+    async def stream(self, sql, params=(), chunk_size=1000):
+        """Recorre el resultado en bloques con un cursor del lado del servidor."""
+        raise NotImplementedError
+
+    async def commit(self):
+        raise NotImplementedError
+
+    async def rollback(self):
+        raise NotImplementedError
+
+
+class SyncSession(Session):
+    """Ejecuta ``mysql.connector`` bloqueante en un pool de hilos dedicado."""
+
+    def __init__(self, conn, executor):
+        self.conn = conn
+        self._executor = executor
+
+    async def _run(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, fn, *args)
+
+    def _query(self, sql, params, many):
+        cursor = self.conn.cursor(dictionary=True)
+        try:
+            cursor.execute(sql, params)
+            return cursor.fetchall() if many else cursor.fetchone()
+        finally:
+            cursor.close()
+
+    def _query_tuples(self, sql, params):
+        cursor = self.conn.cursor()
         try:
-            conn = mysql.connector.connect(**self.db_config)
-            if conn.is_connected():
-                return conn
-        except Error as e:
-            print(f"❌ Error al conectar con la base de datos: {e}")
-            return None
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+            return tuple(cursor.column_names), rows
+        finally:
+            cursor.close()
+
+    def _execute(self, sql, params, many):
+        cursor = self.conn.cursor()
+        try:
+            if many:
+                cursor.executemany(sql, params)
+            else:
+                cursor.execute(sql, params)
+            self.lastrowid = cursor.lastrowid
+            return cursor.rowcount
+        finally:
+            cursor.close()
+
+    def _open_stream(self, sql, params):
+        cursor = self.conn.cursor(dictionary=True, buffered=False)
+        cursor.execute(sql, params)
+        return cursor
+
+    @staticmethod
+    def _close_stream(cursor):
+        # Un cursor sin buffer debe consumirse antes de cerrarse
+        try:
+            cursor.fetchall()
+        except Error:
+            pass
+        cursor.close()
+
+    async def stream(self, sql, params=(), chunk_size=1000):
+        cursor = await self._run(self._open_stream, sql, params)
+        try:
+            while True:
+                rows = await self._run(cursor.fetchmany, chunk_size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            await self._run(self._close_stream, cursor)
+
+    async def fetchone(self, sql, params=()):
+        return await self._run(self._query, sql, params, False)
+
+    async def fetchall(self, sql, params=()):
+        return await self._run(self._query, sql, params, True)
+
+    async def fetchall_tuples(self, sql, params=()):
+        return await self._run(self._query_tuples, sql, params)
+
+    async def execute(self, sql, params=()):
+        return await self._run(self._execute, sql, params, False)
+
+    async def executemany(self, sql, seq_params):
+        return await self._run(self._execute, sql, seq_params, True)
+
+    async def commit(self):
+        await self._run(self.conn.commit)
+
+    async def rollback(self):
+        await self._run(self.conn.rollback)
+
+
+class AsyncSession(Session):
+    """Sesión sobre una conexión ``aiomysql``; nunca bloquea el event loop."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    async def _query(self, sql, params, many):
+        async with self.conn.cursor(aiomysql.DictCursor) as cursor:
+            await cursor.execute(sql, params)
+            return await (cursor.fetchall() if many else cursor.fetchone())
+
+    async def _execute(self, sql, params, many):
+        async with self.conn.cursor() as cursor:
+            if many:
+                await cursor.executemany(sql, params)
+            else:
+                await cursor.execute(sql, params)
+            self.lastrowid = cursor.lastrowid
+            return cursor.rowcount
+
+    async def stream(self, sql, params=(), chunk_size=1000):
+        async with self.conn.cursor(aiomysql.SSDictCursor) as cursor:
+            await cursor.execute(sql, params)
+            while True:
+                rows = await cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield rows
+
+    async def fetchone(self, sql, params=()):
+        return await self._query(sql, params, False)
+
+    async def fetchall(self, sql, params=()):
+        return await self._query(sql, params, True)
+
+    async def fetchall_tuples(self, sql, params=()):
+        async with self.conn.cursor() as cursor:
+            await cursor.execute(sql, params)
+            rows = await cursor.fetchall()
+            return tuple(d[0] for d in cursor.description or ()), rows
+
+    async def execute(self, sql, params=()):
+        return await self._execute(sql, params, False)
+
+    async def executemany(self, sql, seq_params):
+        return await self._execute(sql, seq_params, True)
+
+    async def commit(self):
+        await self.conn.commit()
+
+    async def rollback(self):
+        await self.conn.rollback()
+
+
+class Database:
+    """
+    Punto único de acceso a MySQL. ``mode`` elige el driver:
+
+    - ``sync``: ``mysql.connector`` + ``ConnectionPool`` en hilos dedicados.
+    - ``async``: ``aiomysql`` + ``AsyncConnectionPool`` en el event loop.
+
+    Con ``metrics`` cada sesión se envuelve para medir sus sentencias y la
+    espera por la conexión.
+    """
+
+    def __init__(self, mode, db_config, metrics=None, **pool_options):
+        self.mode = mode
+        self.metrics = metrics
+        if metrics is not None and metrics.db is None:
+            metrics.db = self
+        if mode == "async":
+            self.pool = AsyncConnectionPool(db_config, **pool_options)
+            self._executor = None
+        else:
+            self.pool = ConnectionPool(db_config, **pool_options)
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.pool.size, thread_name_prefix="db"
+            )
+            # La espera por un cupo se hace en el event loop: si se esperara
+            # dentro de un hilo del executor, los requests en cola podrían
+            # ocupar todos los hilos y bloquear a quienes ya tienen conexión.
+            self._slots = asyncio.Semaphore(self.pool.size)
+
+    async def startup(self):
+        if self.mode == "async":
+            await self.pool.open()
+
+    async def shutdown(self):
+        if self.mode == "async":
+            await self.pool.close()
+        else:
+            self.pool.close()
+            self._executor.shutdown(wait=False)
+
+    def _wrap(self, session, instrument, started):
+        if self.metrics is None or not instrument:
+            return session
+        self.metrics.observe_pool_wait(time.perf_counter() - started)
+        return self.metrics.wrap(session)
+
+    @asynccontextmanager
+    async def session(self, instrument=True):
+        """Presta una conexión del pool y la devuelve al terminar."""
+        started = time.perf_counter()
+        if self.mode == "async":
+            conn = await self.pool.acquire()
+            try:
+                yield self._wrap(AsyncSession(conn), instrument, started)
+            finally:
+                await self.pool.release(conn)
+        else:
+            await self._acquire_slot()
+            try:
+                loop = asyncio.get_running_loop()
+                conn = await loop.run_in_executor(self._executor, self.pool.acquire)
+                try:
+                    yield self._wrap(SyncSession(conn, self._executor), instrument, started)
+                finally:
+                    await loop.run_in_executor(self._executor, self.pool.release, conn)
+            finally:
+                self._slots.release()
+
+    async def _acquire_slot(self):
+        if not self._slots.locked():
+            await self._slots.acquire()
+            return
+        start = time.monotonic()
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.pool.timeout)
+        except asyncio.TimeoutError:
+            self.pool.record_wait(time.monotonic() - start, timed_out=True)
+            raise PoolTimeoutError(
+                f"No hay conexiones libres tras esperar {self.pool.timeout}s"
+            )
+        self.pool.record_wait(time.monotonic() - start)
+
+    def stats(self):
+        return {"mode": self.mode, **self.pool.stats()}
+
+
+# Lee la configuración desde las variables de entorno
+db_config = {
+    "host": os.getenv("DB_HOST", "db4free.net"),
+    "user": os.getenv("DB_USER", "siacom_user"),
+    "password": os.getenv("DB_PASSWORD", "admin123"),
+    "database": os.getenv("DB_NAME", "siacom_db"),
+    "port": int(os.getenv("DB_PORT", 3306))
+}
+
+# Métricas por sentencia; SLOW_QUERY_MS=0 desactiva el registro de consultas lentas
+query_metrics = QueryMetrics(slow_ms=float(os.getenv("SLOW_QUERY_MS", 0)))
+
+# Inicializa el acceso a datos (DB_MODE=sync | async)
+DB_MODE = os.getenv("DB_MODE", "sync").lower()
+pool_options = {
+    "size": int(os.getenv("DB_POOL_SIZE", 10)),
+    "timeout": float(os.getenv("DB_POOL_TIMEOUT", 5)),
+    "recycle": int(os.getenv("DB_POOL_RECYCLE", 1800)),
+    "pre_ping": os.getenv("DB_POOL_PRE_PING", "true").lower() == "true",
+}
+primary = Database(DB_MODE, db_config, metrics=query_metrics, **pool_options)
+
+# Réplicas de lectura: DB_REPLICA_HOSTS=host[:puerto],host[:puerto],...
+replicas = []
+for address in filter(None, (h.strip() for h in os.getenv("DB_REPLICA_HOSTS", "").split(","))):
+    host, _, port = address.partition(":")
+    replica_config = {**db_config, "host": host, "port": int(port or 3306)}
+    replicas.append((address, Database(DB_MODE, replica_config, metrics=query_metrics, **{
+        **pool_options, "size": int(os.getenv("DB_REPLICA_POOL_SIZE", pool_options["size"])),
+    })))
+
+db = ReplicaRouter(
+    primary,
+    replicas,
+    max_lag=float(os.getenv("DB_REPLICA_MAX_LAG", 5)),
+    check_interval=float(os.getenv("DB_REPLICA_CHECK_INTERVAL", 2)),
+)
+
+
+async def get_db(request: Request):
+    """
+    Dependencia de FastAPI: presta una sesión del primario durante el
+    request y marca al cliente para que lea sus propias escrituras.
+    """
+    async with db.session(keys=request_keys(request)) as session:
+        yield session
+
 
-# Inicializa el gestor de base de datos
-db_manager = DatabaseManager()
+async def get_read_db(request: Request):
+    """Dependencia de FastAPI para endpoints de solo lectura: réplica si es posible."""
+    async with db.session(read=True, keys=request_keys(request)) as session:
+        yield session
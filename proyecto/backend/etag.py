@@ -0,0 +1,96 @@
+# etag.py
+import hashlib
+import re
+import time
+import uuid
+
+
+class ResourceVersions:
+    """
+    Contadores de versión por recurso, por ejemplo ``("cirugias", 12)``.
+    Los endpoints de escritura los incrementan; el ETag de una lectura se
+    deriva de ellos sin volver a ejecutar la consulta.
+    """
+
+    def __init__(self):
+        # Cambia en cada arranque: los contadores empiezan de nuevo en 0
+        self.boot = uuid.uuid4().hex[:8]
+        self._versions = {}
+
+    def bump(self, *key):
+        self._versions[key] = self._versions.get(key, 0) + 1
+
+    def get(self, *key):
+        return self._versions.get(key, 0)
+
+
+class ConditionalGetMiddleware:
+    """
+    Middleware ASGI que responde ``304 Not Modified`` a los GET cuyo
+    ``If-None-Match`` coincide con el ETag actual, antes de llegar al
+    endpoint.
+
+    ``routes`` es una lista de ``(regex, función)``; la función recibe el
+    match de la ruta y devuelve los valores de los que depende la respuesta
+    (contadores de versión, versión de los datos de referencia...). El ETag
+    incluye además una ventana de ``window`` segundos, para que los cambios
+    hechos fuera de la API (Metabase, phpMyAdmin) se vean a más tardar al
+    cerrar la ventana.
+    """
+
+    def __init__(self, app, versions, routes, window=60, cache_control="private, no-cache"):
+        self.app = app
+        self.versions = versions
+        self.routes = [(re.compile(pattern), fn) for pattern, fn in routes]
+        self.window = window
+        self.cache_control = cache_control.encode()
+
+    def _etag(self, scope, values):
+        raw = "|".join([
+            self.versions.boot,
+            scope["path"],
+            scope.get("query_string", b"").decode("latin-1"),
+            str(int(time.time() // self.window)),
+            *map(str, values),
+        ])
+        return f'W/"{hashlib.blake2b(raw.encode(), digest_size=12).hexdigest()}"'.encode()
+
+    def _match(self, scope):
+        for pattern, fn in self.routes:
+            match = pattern.match(scope["path"])
+            if match:
+                return fn(match)
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            return await self.app(scope, receive, send)
+        values = self._match(scope)
+        if values is None:
+            return await self.app(scope, receive, send)
+
+        etag = self._etag(scope, values)
+        headers = dict(scope["headers"])
+        if_none_match = headers.get(b"if-none-match")
+        if if_none_match and (
+            if_none_match.strip() == b"*"
+            or etag in (tag.strip() for tag in if_none_match.split(b","))
+        ):
+            await send({
+                "type": "http.response.start",
+                "status": 304,
+                "headers": [(b"etag", etag), (b"cache-control", self.cache_control)],
+            })
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        async def send_with_etag(message):
+            if message["type"] == "http.response.start" and message["status"] == 200:
+                message = {**message, "headers": [
+                    *message.get("headers", []),
+                    (b"etag", etag),
+                    (b"cache-control", self.cache_control),
+                ]}
+            await send(message)
+
+        await self.app(scope, receive, send_with_etag)
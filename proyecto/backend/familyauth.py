@@ -0,0 +1,153 @@
+# familyauth.py
+import datetime
+import hashlib
+import hmac
+import time
+from collections import OrderedDict, deque
+
+from cache import TTLCache
+
+
+class LoginRateLimiter:
+    """
+    Cuenta los intentos fallidos por IP en una ventana deslizante. Una IP
+    que supera ``max_failures`` queda bloqueada hasta que sus fallos más
+    antiguos salen de la ventana.
+    """
+
+    def __init__(self, max_failures=10, window=300.0, max_clients=50000):
+        self.max_failures = max_failures
+        self.window = window
+        self.max_clients = max_clients
+        self._failures = OrderedDict()
+
+        self.blocked = 0
+
+    def _recent(self, client, now):
+        attempts = self._failures.get(client)
+        if attempts is None:
+            return None
+        while attempts and now - attempts[0] >= self.window:
+            attempts.popleft()
+        if not attempts:
+            del self._failures[client]
+            return None
+        return attempts
+
+    def retry_after(self, client):
+        """Segundos que debe esperar ``client``, o 0 si puede intentar."""
+        now = time.monotonic()
+        attempts = self._recent(client, now)
+        if attempts is None or len(attempts) < self.max_failures:
+            return 0
+        self.blocked += 1
+        return max(1, int(self.window - (now - attempts[0])) + 1)
+
+    def record_failure(self, client):
+        now = time.monotonic()
+        attempts = self._recent(client, now)
+        if attempts is None:
+            attempts = self._failures[client] = deque(maxlen=self.max_failures)
+        self._failures.move_to_end(client)
+        attempts.append(now)
+        while len(self._failures) > self.max_clients:
+            self._failures.popitem(last=False)
+
+    def stats(self):
+        return {"tracked_clients": len(self._failures), "blocked": self.blocked}
+
+
+class FamilyAuthCache:
+    """
+    Caché de autenticación familiar por par (codigo_paciente, codigo_familiar).
+
+    Las claves son un HMAC del par, así el tiempo de búsqueda no depende de
+    cuántos caracteres coinciden con un código válido y los códigos no
+    quedan en claro en memoria. Los aciertos viven hasta ``ttl`` segundos o
+    hasta ``fecha_expiracion``, lo que ocurra primero; los pares inválidos
+    se recuerdan ``negative_ttl`` segundos en una caché acotada aparte.
+    """
+
+    def __init__(self, secret, ttl=300.0, negative_ttl=60.0,
+                 max_entries=10000, max_negative=50000):
+        self._secret = (secret or "").encode()
+        self._valid = TTLCache(ttl=ttl, max_entries=max_entries)
+        self._invalid = TTLCache(ttl=negative_ttl, max_entries=max_negative)
+        self._by_patient = {}
+        self._patient_of = {}
+
+        self.negative_hits = 0
+        self.db_lookups = 0
+
+    def key(self, codigo_paciente, codigo_familiar):
+        # MySQL compara los códigos sin distinguir mayúsculas
+        raw = f"{codigo_paciente.upper()}\x00{codigo_familiar.upper()}".encode()
+        return hmac.new(self._secret, raw, hashlib.sha256).digest()
+
+    async def authenticate(self, key, loader):
+        """
+        Devuelve los datos del familiar o ``None`` si los códigos no son
+        válidos; ``loader`` solo se llama cuando el par no está en caché.
+        """
+        if self._invalid.get(key) is not None:
+            self.negative_hits += 1
+            return None
+        family = await self._valid.get_or_load(
+            key, lambda: self._load(key, loader), ttl=self._ttl_for
+        )
+        if family is None:
+            self._invalid.set(key, True)
+        return family
+
+    async def _load(self, key, loader):
+        self.db_lookups += 1
+        row = await loader()
+        if not row:
+            return None
+        if len(self._patient_of) >= 2 * self._valid.max_entries:
+            self._prune()
+        self._by_patient.setdefault(row["paciente_id"], set()).add(key)
+        self._patient_of[key] = row["paciente_id"]
+        return row
+
+    def _prune(self):
+        """Olvida las claves que ya salieron de la caché (expiradas o desalojadas)."""
+        for key, paciente_id in list(self._patient_of.items()):
+            if key in self._valid:
+                continue
+            del self._patient_of[key]
+            keys = self._by_patient.get(paciente_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_patient[paciente_id]
+
+    def _ttl_for(self, row):
+        # Un código no debe seguir siendo válido en caché después de expirar
+        expiracion = row.get("fecha_expiracion")
+        if not isinstance(expiracion, datetime.datetime):
+            return self._valid.ttl
+        remaining = (expiracion - datetime.datetime.now()).total_seconds()
+        return max(min(remaining, self._valid.ttl), 0.001)
+
+    def invalidate_patient(self, paciente_id):
+        """Descarta las sesiones cacheadas de un paciente (códigos revocados)."""
+        for key in self._by_patient.pop(paciente_id, ()):
+            self._valid.invalidate(key)
+            self._patient_of.pop(key, None)
+        # Un código recién creado pudo estar en la caché negativa
+        self._invalid.clear()
+
+    def clear(self):
+        self._valid.clear()
+        self._invalid.clear()
+        self._by_patient.clear()
+        self._patient_of.clear()
+
+    def stats(self):
+        return {
+            "valid": self._valid.stats(),
+            "invalid": self._invalid.stats(),
+            "negative_hits": self.negative_hits,
+            "db_lookups": self.db_lookups,
+        }
@@ -0,0 +1,154 @@
+# ingest.py
+import datetime
+from typing import Optional
+
+from pydantic import BaseModel, Field, ValidationError
+
+from series import update_rollups
+
+VITALS_COLUMNS = (
+    "paciente_id", "fecha_registro", "presion_sistolica", "presion_diastolica",
+    "frecuencia_cardiaca", "temperatura", "saturacion_oxigeno", "dolor_escala",
+)
+
+# Rangos que MySQL acepta para cada métrica (CHECK y tipo de columna)
+VITALS_RANGES = {
+    "presion_sistolica": (0, 2147483647),
+    "presion_diastolica": (0, 2147483647),
+    "frecuencia_cardiaca": (0, 2147483647),
+    "temperatura": (0, 99.99),
+    "saturacion_oxigeno": (0, 2147483647),
+    "dolor_escala": (0, 10),
+}
+
+
+def check_vitals_row(row):
+    """
+    Valida los rangos de una fila ``VITALS_COLUMNS``; ``ValueError`` si
+    alguna métrica no cabe. Las métricas en ``None`` no se midieron y se
+    guardan como NULL (migración 006).
+    """
+    for i, column in enumerate(VITALS_COLUMNS[2:], start=2):
+        low, high = VITALS_RANGES[column]
+        if row[i] is not None and not low <= row[i] <= high:
+            raise ValueError(f"{column} fuera de rango ({low}-{high}): {row[i]}")
+    return tuple(row)
+
+
+class LecturaSignosVitales(BaseModel):
+    """Lectura de un monitor de cabecera dentro de una carga masiva."""
+    paciente_id: int
+    fecha_registro: Optional[datetime.datetime] = None
+    presion_sistolica: Optional[int] = Field(None, ge=0, le=2147483647)
+    presion_diastolica: Optional[int] = Field(None, ge=0, le=2147483647)
+    frecuencia_cardiaca: Optional[int] = Field(None, ge=0, le=2147483647)
+    temperatura: Optional[float] = Field(None, ge=0, le=99.99)
+    saturacion_oxigeno: Optional[int] = Field(None, ge=0, le=2147483647)
+    dolor_escala: Optional[int] = Field(None, ge=0, le=10)
+
+    def as_row(self):
+        return check_vitals_row((
+            self.paciente_id,
+            self.fecha_registro or datetime.datetime.now(),
+            self.presion_sistolica,
+            self.presion_diastolica,
+            self.frecuencia_cardiaca,
+            self.temperatura,
+            self.saturacion_oxigeno,
+            self.dolor_escala,
+        ))
+
+
+def multirow_insert_sql(table, columns, rows, ignore=False):
+    """``INSERT`` con un bloque ``VALUES`` por fila, en un solo statement."""
+    placeholders = "(" + ", ".join(["%s"] * len(columns)) + ")"
+    return (
+        f"INSERT {'IGNORE ' if ignore else ''}INTO {table} ({', '.join(columns)}) VALUES "
+        + ", ".join([placeholders] * rows)
+    )
+
+
+class VitalsBulkIngestor:
+    """
+    Valida lecturas a medida que llegan y las escribe en bloques de
+    ``chunk_size`` filas, cada bloque en su propia transacción.
+
+    Los errores se reportan por índice de lectura: una lectura inválida o
+    de un paciente inexistente no hace fallar al resto del lote.
+    """
+
+    def __init__(self, session, chunk_size=500, on_insert=None):
+        self.session = session
+        self.chunk_size = chunk_size
+        self.on_insert = on_insert
+        self.received = 0
+        self.inserted = 0
+        self.errors = []
+        self.latest = {}
+        self._buffer = []
+
+    async def add(self, index, raw):
+        self.received += 1
+        try:
+            reading = LecturaSignosVitales.model_validate(raw)
+        except ValidationError as e:
+            self.errors.append({"index": index, "error": e.errors(include_url=False, include_context=False)})
+            return
+        self._buffer.append((index, reading))
+        if len(self._buffer) >= self.chunk_size:
+            await self.flush()
+
+    async def flush(self):
+        chunk, self._buffer = self._buffer, []
+        if not chunk:
+            return
+
+        patient_ids = sorted({reading.paciente_id for _, reading in chunk})
+        rows = await self.session.fetchall(
+            f"SELECT id FROM pacientes WHERE id IN ({', '.join(['%s'] * len(patient_ids))})",
+            tuple(patient_ids),
+        )
+        existing = {row["id"] for row in rows}
+
+        valid = []
+        for index, reading in chunk:
+            if reading.paciente_id in existing:
+                valid.append((index, reading))
+            else:
+                self.errors.append({"index": index, "error": "Paciente no encontrado"})
+        if not valid:
+            return
+
+        try:
+            await self._insert([reading for _, reading in valid])
+        except Exception:
+            # Si el bloque falla se reintenta fila por fila para aislar el error
+            await self.session.rollback()
+            for index, reading in valid:
+                try:
+                    await self._insert([reading])
+                except Exception as e:
+                    await self.session.rollback()
+                    self.errors.append({"index": index, "error": str(e)})
+
+    async def _insert(self, readings):
+        rows = [reading.as_row() for reading in readings]
+        params = [value for row in rows for value in row]
+        await self.session.execute(
+            multirow_insert_sql("signos_vitales", VITALS_COLUMNS, len(rows)), params
+        )
+        await update_rollups(self.session, rows)
+        await self.session.commit()
+        self.inserted += len(readings)
+        for reading in readings:
+            self.latest[reading.paciente_id] = reading
+        if self.on_insert:
+            self.on_insert(rows)
+
+    async def finish(self):
+        await self.flush()
+        return {
+            "received": self.received,
+            "inserted": self.inserted,
+            "errors": self.errors,
+        }
@@ -0,0 +1,291 @@
+# instrumentation.py
+import asyncio
+import contextvars
+import datetime
+import hashlib
+import re
+import time
+from collections import deque
+
+# Límites (en segundos) de los histogramas de latencia
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# Campos de ``Database.stats()`` que se exportan junto a las métricas
+POOL_GAUGES = (
+    ("size", "gauge"), ("in_use", "gauge"), ("idle", "gauge"),
+    ("created", "counter"), ("waits", "counter"), ("timeouts", "counter"),
+)
+
+_request_scope = contextvars.ContextVar("request_scope", default=None)
+
+_WHITESPACE = re.compile(r"\s+")
+# IN (%s, %s, ...) y VALUES (...), (...) varían con el tamaño del lote
+_IN_LIST = re.compile(r"IN \((?:%s, )*%s\)", re.IGNORECASE)
+_VALUES_LIST = re.compile(r"VALUES (\([^()]*\))(?:, \([^()]*\))+", re.IGNORECASE)
+
+
+def fingerprint(sql):
+    """SQL normalizado e identificador corto estable para usar como etiqueta."""
+    text = _WHITESPACE.sub(" ", sql).strip()
+    text = _IN_LIST.sub("IN (...)", text)
+    text = _VALUES_LIST.sub(r"VALUES \1, ...", text)
+    return hashlib.blake2b(text.encode(), digest_size=6).hexdigest(), text
+
+
+def current_endpoint():
+    scope = _request_scope.get()
+    if scope is None:
+        return "background"
+    endpoint = scope.get("endpoint")
+    return getattr(endpoint, "__name__", "other")
+
+
+class RequestContextMiddleware:
+    """
+    Guarda el scope ASGI del request en curso para etiquetar las consultas
+    con el endpoint. El router de Starlette completa ``scope["endpoint"]``
+    al resolver la ruta, así que se lee al momento de medir.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            return await self.app(scope, receive, send)
+        token = _request_scope.set(scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request_scope.reset(token)
+
+
+class _Histogram:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.total += value
+        self.count += 1
+
+    def lines(self, name, labels):
+        cumulative = 0
+        for bound, n in zip(BUCKETS, self.counts):
+            cumulative += n
+            yield f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}'
+        yield f'{name}_bucket{{{labels},le="+Inf"}} {self.count}'
+        yield f"{name}_sum{{{labels}}} {self.total:.6f}"
+        yield f"{name}_count{{{labels}}} {self.count}"
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+class QueryMetrics:
+    """
+    Latencia, filas y errores por sentencia SQL y endpoint, más la espera
+    por conexiones del pool. Se exporta en formato de texto de Prometheus.
+
+    Con ``slow_ms`` > 0, las consultas que superan el umbral quedan en un
+    registro acotado junto con su ``EXPLAIN``, que se obtiene en segundo
+    plano en otra conexión (a lo sumo una vez por minuto por sentencia).
+    """
+
+    def __init__(self, slow_ms=0, slow_log_size=100, explain_interval=60):
+        self.slow_ms = slow_ms
+        self.explain_interval = explain_interval
+        self.db = None
+
+        self._durations = {}
+        self._rows = {}
+        self._errors = {}
+        self._pool_wait = {}
+        self._statements = {}
+        self._last_explain = {}
+        self._explain_tasks = set()
+        self.slow_queries = deque(maxlen=slow_log_size)
+
+    def wrap(self, session):
+        return InstrumentedSession(session, self)
+
+    def observe_pool_wait(self, seconds):
+        endpoint = current_endpoint()
+        histogram = self._pool_wait.get(endpoint)
+        if histogram is None:
+            histogram = self._pool_wait[endpoint] = _Histogram()
+        histogram.observe(seconds)
+
+    def observe(self, op, sql, params, seconds, rows=None, error=None):
+        query_id, text = fingerprint(sql)
+        self._statements.setdefault(query_id, text)
+        key = (current_endpoint(), query_id, op)
+
+        histogram = self._durations.get(key)
+        if histogram is None:
+            histogram = self._durations[key] = _Histogram()
+        histogram.observe(seconds)
+        if rows is not None:
+            self._rows[key] = self._rows.get(key, 0) + rows
+        if error is not None:
+            self._errors[key] = self._errors.get(key, 0) + 1
+            print(f"❌ Error SQL en {key[0]} [{query_id}]: {error}")
+
+        if self.slow_ms and seconds * 1000 >= self.slow_ms:
+            self._record_slow(key[0], query_id, text, sql, params, seconds)
+
+    def _record_slow(self, endpoint, query_id, text, sql, params, seconds):
+        entry = {
+            "timestamp": datetime.datetime.now(),
+            "endpoint": endpoint,
+            "query": query_id,
+            "sql": text,
+            "duration_ms": round(seconds * 1000, 2),
+            "explain": None,
+        }
+        self.slow_queries.append(entry)
+        print(f"🐢 Consulta lenta en {endpoint} ({entry['duration_ms']} ms): {text[:200]}")
+
+        now = time.monotonic()
+        last = self._last_explain.get(query_id)
+        if (self.db is None or not text.upper().startswith("SELECT")
+                or (last is not None and now - last < self.explain_interval)):
+            return
+        self._last_explain[query_id] = now
+        task = asyncio.create_task(self._explain(entry, sql, params))
+        self._explain_tasks.add(task)
+        task.add_done_callback(self._explain_tasks.discard)
+
+    async def _explain(self, entry, sql, params):
+        try:
+            async with self.db.session(instrument=False) as session:
+                entry["explain"] = await session.fetchall(f"EXPLAIN {sql}", params)
+                await session.rollback()
+        except Exception as e:
+            entry["explain"] = f"No se pudo obtener el EXPLAIN: {e}"
+
+    def render(self, pool_stats=None):
+        """Todas las métricas en formato de texto de Prometheus."""
+        lines = [
+            "# HELP siacom_db_query_duration_seconds Latencia de cada sentencia SQL.",
+            "# TYPE siacom_db_query_duration_seconds histogram",
+        ]
+        for (endpoint, query_id, op), histogram in sorted(self._durations.items()):
+            labels = f'endpoint="{endpoint}",query="{query_id}",op="{op}"'
+            lines.extend(histogram.lines("siacom_db_query_duration_seconds", labels))
+
+        lines += [
+            "# HELP siacom_db_query_rows_total Filas devueltas o afectadas.",
+            "# TYPE siacom_db_query_rows_total counter",
+        ]
+        for (endpoint, query_id, op), rows in sorted(self._rows.items()):
+            lines.append(
+                f'siacom_db_query_rows_total{{endpoint="{endpoint}",query="{query_id}",op="{op}"}} {rows}'
+            )
+
+        lines += [
+            "# HELP siacom_db_query_errors_total Sentencias que terminaron en error.",
+            "# TYPE siacom_db_query_errors_total counter",
+        ]
+        for (endpoint, query_id, op), errors in sorted(self._errors.items()):
+            lines.append(
+                f'siacom_db_query_errors_total{{endpoint="{endpoint}",query="{query_id}",op="{op}"}} {errors}'
+            )
+
+        lines += [
+            "# HELP siacom_db_query_info Texto normalizado de cada sentencia.",
+            "# TYPE siacom_db_query_info gauge",
+        ]
+        for query_id, text in sorted(self._statements.items()):
+            lines.append(f'siacom_db_query_info{{query="{query_id}",sql="{_escape(text[:300])}"}} 1')
+
+        lines += [
+            "# HELP siacom_db_pool_wait_seconds Espera por una conexión libre del pool.",
+            "# TYPE siacom_db_pool_wait_seconds histogram",
+        ]
+        for endpoint, histogram in sorted(self._pool_wait.items()):
+            lines.extend(histogram.lines("siacom_db_pool_wait_seconds", f'endpoint="{endpoint}"'))
+
+        if pool_stats:
+            for name, kind in POOL_GAUGES:
+                if isinstance(pool_stats.get(name), (int, float)):
+                    lines += [
+                        f"# TYPE siacom_db_pool_{name} {kind}",
+                        f"siacom_db_pool_{name} {pool_stats[name]}",
+                    ]
+        return "\n".join(lines) + "\n"
+
+
+class InstrumentedSession:
+    """Envuelve una ``Session`` de database.py y mide cada sentencia que ejecuta."""
+
+    def __init__(self, session, metrics):
+        self._session = session
+        self._metrics = metrics
+
+    @property
+    def lastrowid(self):
+        return self._session.lastrowid
+
+    async def _timed(self, op, sql, params, call, count):
+        start = time.perf_counter()
+        try:
+            result = await call
+        except Exception as e:
+            self._metrics.observe(op, sql, params, time.perf_counter() - start, error=e)
+            raise
+        self._metrics.observe(op, sql, params, time.perf_counter() - start, rows=count(result))
+        return result
+
+    async def fetchone(self, sql, params=()):
+        return await self._timed(
+            "fetchone", sql, params, self._session.fetchone(sql, params),
+            lambda row: 0 if row is None else 1,
+        )
+
+    async def fetchall(self, sql, params=()):
+        return await self._timed(
+            "fetchall", sql, params, self._session.fetchall(sql, params), len,
+        )
+
+    async def fetchall_tuples(self, sql, params=()):
+        return await self._timed(
+            "fetchall", sql, params, self._session.fetchall_tuples(sql, params),
+            lambda result: len(result[1]),
+        )
+
+    async def execute(self, sql, params=()):
+        return await self._timed(
+            "execute", sql, params, self._session.execute(sql, params), lambda n: max(n, 0),
+        )
+
+    async def executemany(self, sql, seq_params):
+        return await self._timed(
+            "executemany", sql, (), self._session.executemany(sql, seq_params), lambda n: max(n, 0),
+        )
+
+    async def stream(self, sql, params=(), chunk_size=1000):
+        start = time.perf_counter()
+        rows = 0
+        try:
+            async for chunk in self._session.stream(sql, params, chunk_size):
+                rows += len(chunk)
+                yield chunk
+        except Exception as e:
+            self._metrics.observe("stream", sql, params, time.perf_counter() - start, error=e)
+            raise
+        self._metrics.observe("stream", sql, params, time.perf_counter() - start, rows=rows)
+
+    async def commit(self):
+        await self._session.commit()
+
+    async def rollback(self):
+        await self._session.rollback()
@@ -1,14 +1,78 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, HTTPException, status, WebSocket, WebSocketDisconnect, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional
-import mysql.connector
+from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse
+import asyncio
 import os
-from database import db_manager
-from fastapi import HTTPException
+import time
+from database import db, get_db, get_read_db, Session, PoolTimeoutError, query_metrics
+from instrumentation import RequestContextMiddleware
+from cache import TTLCache
+from realtime import PubSubHub
+from stats import DashboardStats, run_stats_maintenance
+from ingest import VitalsBulkIngestor, LecturaSignosVitales
+from writebehind import VitalsWriteBehind, WriteBehindFull
+from pagination import keyset_page, stream_rows
+from anomalies import VitalsMonitor
+from notifications import NotificationDispatcher, enqueue_notification, find_notification
+from reference import ReferenceData
+from archive import DataLifecycle
+from etag import ResourceVersions, ConditionalGetMiddleware
+from serialization import FastJSONResponse, dumps
+from compression import CompressionMiddleware
+from familyauth import FamilyAuthCache, LoginRateLimiter
+from auth import (
+    PasswordHasher, create_access_token, decode_access_token,
+    current_user, current_family, check_family_patient, FAMILY_TOKEN_MINUTES,
+)
+from series import METRICS, ROLLUPS, update_rollups, fetch_series, downsample_buckets, lttb, fetch_rollup
+import datetime
+import json
+
+app = FastAPI(title="SIACOM API", version="1.0.0", default_response_class=FastJSONResponse)
+
+# Compresión brotli/gzip negociada con Accept-Encoding
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=int(os.getenv("COMPRESSION_MIN_SIZE", 1024)),
+)
+
+# Versiones por recurso para los ETag de las lecturas
+resource_versions = ResourceVersions()
 
-app = FastAPI(title="SIACOM API", version="1.0.0")
+# Los contadores viven en la memoria del proceso: con varios workers o
+# réplicas una escritura atendida por uno no cambia el ETag de los demás,
+# que seguirían respondiendo 304 con datos viejos hasta ETAG_WINDOW. Por
+# eso el GET condicional se activa solo con un proceso (WEB_CONCURRENCY es
+# la variable que usa uvicorn para --workers); con varias réplicas de la
+# API hay que definir ETAG_ENABLED=false.
+etag_enabled = os.getenv(
+    "ETAG_ENABLED", "true" if int(os.getenv("WEB_CONCURRENCY", 1)) <= 1 else "false"
+).lower() == "true"
 
+# GET condicional: se registra antes que CORS para que los 304 también
+# lleven los encabezados CORS. Pacientes y contactos no tienen escrituras
+# en la API (se cargan desde afuera): su ETag cambia al cerrar la ventana
+if etag_enabled:
+    app.add_middleware(
+        ConditionalGetMiddleware,
+        versions=resource_versions,
+        window=int(os.getenv("ETAG_WINDOW", 60)),
+        routes=[
+            (r"^/pacientes$", lambda m: (resource_versions.get("pacientes"),)),
+            (r"^/contactos$", lambda m: (resource_versions.get("contactos"),)),
+            (r"^/cirugias/(\d+)$", lambda m: (
+                resource_versions.get("cirugias", int(m[1])), reference_data.version,
+            )),
+            (r"^/evoluciones/(\d+)$", lambda m: (
+                resource_versions.get("evoluciones", int(m[1])), reference_data.version,
+            )),
+            (r"^/signos-vitales/(\d+)(/serie|/rollup)?$", lambda m: (
+                resource_versions.get("signos_vitales", int(m[1])),
+            )),
+        ],
+    )
 
 # CORS configuration
 app.add_middleware(
@@ -17,16 +81,150 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
+)
+
+# Etiqueta las métricas de cada consulta SQL con el endpoint que la originó
+app.add_middleware(RequestContextMiddleware)
+
+# Pool de conexiones agotado
+@app.exception_handler(PoolTimeoutError)
+def pool_timeout_handler(request, exc):
+    return JSONResponse(status_code=503, content={"detail": f"Base de datos saturada: {exc}"})
+
+@app.on_event("startup")
+async def startup_event():
+    await db.startup()
+    try:
+        async with db.session() as session:
+            await dashboard_stats.reconcile(session)
+    except Exception as e:
+        print(f"❌ No se pudieron cargar las estadísticas del dashboard: {e}")
+    try:
+        await reference_data.load()
+    except Exception as e:
+        print(f"❌ No se pudieron cargar los datos de referencia: {e}")
+    try:
+        await data_lifecycle.load()
+    except Exception as e:
+        print(f"❌ No se pudo leer el estado del archivo histórico: {e}")
+    if vitals_buffer is not None:
+        await vitals_buffer.start()
+    background_tasks.append(asyncio.create_task(notification_dispatcher.run()))
+    background_tasks.append(asyncio.create_task(reference_data.run()))
+    background_tasks.append(asyncio.create_task(db.run()))
+    background_tasks.append(asyncio.create_task(data_lifecycle.run()))
+    background_tasks.append(asyncio.create_task(run_stats_maintenance(
+        db, dashboard_stats,
+        roll_interval=int(os.getenv("STATS_ROLL_INTERVAL", 60)),
+        reconcile_interval=int(os.getenv("STATS_RECONCILE_INTERVAL", 300)),
+    )))
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    for task in background_tasks:
+        task.cancel()
+    if vitals_buffer is not None:
+        await vitals_buffer.stop()
+    password_hasher.shutdown()
+    await db.shutdown()
+
+# Tareas de fondo lanzadas al iniciar
+background_tasks = []
+
+# Contadores del dashboard mantenidos en memoria
+dashboard_stats = DashboardStats()
+
+# Médicos, especialidades y tipos de cirugía en memoria
+reference_data = ReferenceData(
+    db, refresh_interval=int(os.getenv("REFERENCE_REFRESH_INTERVAL", 300)),
+)
+
+
+# Particiones mensuales y paso de los meses antiguos a las tablas de archivo
+data_lifecycle = DataLifecycle(
+    db,
+    retention={
+        "signos_vitales": int(os.getenv("ARCHIVE_SIGNOS_VITALES_DAYS", 180)),
+        "notificaciones": int(os.getenv("ARCHIVE_NOTIFICACIONES_DAYS", 180)),
+        "auditoria": int(os.getenv("ARCHIVE_AUDITORIA_DAYS", 365)),
+    },
+    batch_size=int(os.getenv("ARCHIVE_BATCH", 5000)),
+    interval=int(os.getenv("ARCHIVE_INTERVAL", 3600)),
 )
 
-# Database connection
-def get_db_connection():
-    return mysql.connector.connect(
-        host=os.getenv("DB_HOST", "db4free.net"),
-        user=os.getenv("DB_USER", "siacom_user"),
-        password=os.getenv("DB_PASSWORD", "admin123"),
-        database=os.getenv("DB_NAME", "siacom_db"),
-        port=int(os.getenv("DB_PORT", 3306))
+
+# Detección de anomalías en signos vitales al momento de ingresar
+vitals_monitor = VitalsMonitor(
+    window=int(os.getenv("ANOMALY_WINDOW", 30)),
+    cooldown=int(os.getenv("ANOMALY_COOLDOWN", 600)),
+)
+alert_tasks = set()
+
+
+def observe_vitals(rows):
+    """Evalúa lecturas nuevas y notifica las alertas sin demorar la respuesta."""
+    alerts = vitals_monitor.observe(rows)
+    if alerts:
+        task = asyncio.create_task(raise_alerts(alerts))
+        alert_tasks.add(task)
+        task.add_done_callback(alert_tasks.discard)
+
+
+async def raise_alerts(alerts):
+    try:
+        async with db.session() as session:
+            for alert in alerts:
+                await enqueue_notification(
+                    session, alert["paciente_id"], "complicacion",
+                    "Alerta en signos vitales", alert["mensaje"],
+                )
+            await session.commit()
+        notification_dispatcher.notify()
+    except Exception as e:
+        print(f"❌ Error al registrar alertas de signos vitales: {e}")
+
+
+def _on_notifications_dispatched(events):
+    timestamp = datetime.datetime.now()
+    for event in events:
+        db.record_write(("paciente", event["paciente_id"]))
+        family_cache.invalidate(event["paciente_id"])
+        family_hub.publish(event["paciente_id"], {
+            "type": "notification",
+            "data": {"message": event["titulo"], "detail": event["mensaje"], "timestamp": timestamp},
+        })
+
+
+# Despachador del outbox de notificaciones
+notification_dispatcher = NotificationDispatcher(
+    db,
+    batch_size=int(os.getenv("NOTIFICATIONS_BATCH", 100)),
+    interval=float(os.getenv("NOTIFICATIONS_INTERVAL", 1)),
+    max_attempts=int(os.getenv("NOTIFICATIONS_MAX_ATTEMPTS", 5)),
+    on_dispatched=_on_notifications_dispatched,
+)
+
+
+def _on_vitals_flushed(rows):
+    for paciente_id in {row[0] for row in rows}:
+        db.record_write(("paciente", paciente_id))
+        family_cache.invalidate(paciente_id)
+        resource_versions.bump("signos_vitales", paciente_id)
+
+
+# Escritura diferida de signos vitales (VITALS_WRITE_MODE=buffered)
+vitals_buffer = None
+if os.getenv("VITALS_WRITE_MODE", "direct").lower() == "buffered":
+    vitals_buffer = VitalsWriteBehind(
+        db,
+        spill_dir=os.getenv("VITALS_SPILL_DIR", "spill"),
+        max_queue=int(os.getenv("VITALS_BUFFER_SIZE", 10000)),
+        max_rows=int(os.getenv("VITALS_FLUSH_ROWS", 500)),
+        flush_ms=int(os.getenv("VITALS_FLUSH_MS", 200)),
+        put_timeout=float(os.getenv("VITALS_BUFFER_TIMEOUT", 1)),
+        fsync=os.getenv("VITALS_SPILL_FSYNC", "false").lower() == "true",
+        on_flush=_on_vitals_flushed,
     )
 
 
@@ -76,13 +274,15 @@ class CirugiaBase(BaseModel):
     quirofano: Optional[str] = None
     notas_preoperatorias: Optional[str] = None
 
+# Mismos rangos que LecturaSignosVitales (ingest.VITALS_RANGES): una
+# lectura fuera de rango se rechaza con 422 en vez de fallar en MySQL
 class SignosVitalesBase(BaseModel):
-    presion_sistolica: Optional[int] = None
-    presion_diastolica: Optional[int] = None
-    frecuencia_cardiaca: Optional[int] = None
-    temperatura: Optional[float] = None
-    saturacion_oxigeno: Optional[int] = None
-    dolor_escala: Optional[int] = None
+    presion_sistolica: Optional[int] = Field(None, ge=0, le=2147483647)
+    presion_diastolica: Optional[int] = Field(None, ge=0, le=2147483647)
+    frecuencia_cardiaca: Optional[int] = Field(None, ge=0, le=2147483647)
+    temperatura: Optional[float] = Field(None, ge=0, le=99.99)
+    saturacion_oxigeno: Optional[int] = Field(None, ge=0, le=2147483647)
+    dolor_escala: Optional[int] = Field(None, ge=0, le=10)
 
 class EvolucionClinicaBase(BaseModel):
     estado_general: str
@@ -93,37 +293,80 @@ class EvolucionClinicaBase(BaseModel):
 
 
 # API Endpoints
-@app.post("/login")
-def login(user_login: UserLogin):
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
+# bcrypt en un pool acotado para no bloquear el event loop
+password_hasher = PasswordHasher(
+    workers=int(os.getenv("BCRYPT_WORKERS", 4)),
+    max_pending=int(os.getenv("BCRYPT_MAX_PENDING", 64)),
+    rounds=int(os.getenv("BCRYPT_ROUNDS", 12)),
+)
 
-    try:
-        cursor.execute("SELECT * FROM usuarios WHERE username = %s AND activo = TRUE", (user_login.username,))
-        user = cursor.fetchone()
 
-        if not user or user_login.password != user['password_hash']:
-            raise HTTPException(status_code=401, detail="Usuario o contraseña incorrectos")
+@app.post("/login", response_model=Token)
+async def login(user_login: UserLogin):
+    user = await _query_one(
+        "SELECT id, username, password_hash, tipo_usuario FROM usuarios WHERE username = %s AND activo = TRUE",
+        (user_login.username,),
+    )
 
-        return {
-            "message": "Inicio de sesión exitoso",
-            "user_id": user["id"],
-            "username": user["username"],
-            "tipo_usuario": user["tipo_usuario"]
-        }
-    finally:
-        cursor.close()
-        conn.close()
+    # La conexión ya se devolvió al pool mientras corre bcrypt
+    if not await password_hasher.verify(user_login.password, user["password_hash"] if user else None):
+        raise HTTPException(status_code=401, detail="Usuario o contraseña incorrectos")
 
+    if password_hasher.needs_rehash(user["password_hash"]):
+        # Contraseña heredada en texto plano: se reemplaza por su hash bcrypt
+        try:
+            hashed = await password_hasher.hash(user_login.password)
+            async with db.session() as session:
+                await session.execute(
+                    "UPDATE usuarios SET password_hash = %s WHERE id = %s", (hashed, user["id"])
+                )
+                await session.commit()
+        except Exception as e:
+            print(f"❌ Error al actualizar el hash de contraseña: {e}")
 
-@app.post("/family/login")
-def family_login(family_login: FamilyLogin):
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    try:
-        cursor.execute("""
-            SELECT cf.*, p.id as paciente_id, p.nombre as paciente_nombre, p.apellido as paciente_apellido,
-                   c.id as contacto_id, c.nombre as familiar_nombre, c.apellido as familiar_apellido
+    token = create_access_token({
+        "sub": str(user["id"]),
+        "type": "usuario",
+        "user_id": user["id"],
+        "username": user["username"],
+        "tipo_usuario": user["tipo_usuario"],
+    })
+    return {
+        "access_token": token,
+        "token_type": "bearer",
+        "user_type": user["tipo_usuario"],
+        "user_id": user["id"],
+    }
+
+
+# Autenticación familiar: caché positiva/negativa y límite de intentos por IP
+family_auth = FamilyAuthCache(
+    os.getenv("SECRET_KEY"),
+    ttl=float(os.getenv("FAMILY_AUTH_TTL", 300)),
+    negative_ttl=float(os.getenv("FAMILY_AUTH_NEGATIVE_TTL", 60)),
+)
+family_login_limiter = LoginRateLimiter(
+    max_failures=int(os.getenv("FAMILY_LOGIN_MAX_FAILURES", 10)),
+    window=float(os.getenv("FAMILY_LOGIN_WINDOW", 300)),
+)
+
+
+@app.post("/family/login", response_model=FamilyToken)
+async def family_login(family_login: FamilyLogin, request: Request):
+    client = request.client.host if request.client else "desconocido"
+    retry_after = family_login_limiter.retry_after(client)
+    if retry_after:
+        raise HTTPException(
+            status_code=429,
+            detail="Demasiados intentos fallidos, intente más tarde",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+    # Solo se toma una conexión del pool cuando el par no está en caché
+    async def load():
+        return await _query_one("""
+            SELECT cf.paciente_id, cf.contacto_id, cf.fecha_expiracion,
+                   p.nombre as paciente_nombre, c.nombre as familiar_nombre
             FROM codigos_familiares cf
             JOIN pacientes p ON cf.paciente_id = p.id
             JOIN contactos c ON cf.contacto_id = c.id
@@ -131,331 +374,672 @@ def family_login(family_login: FamilyLogin):
               AND cf.activo = TRUE AND p.activo = TRUE
               AND (cf.fecha_expiracion IS NULL OR cf.fecha_expiracion > NOW())
         """, (family_login.patient_code, family_login.family_code))
-        
-        family_data = cursor.fetchone()
-        if not family_data:
-            raise HTTPException(status_code=401, detail="Códigos familiares inválidos")
-
-        return {
-            "message": "Inicio de sesión familiar exitoso",
-            "paciente_id": family_data["paciente_id"],
-            "contacto_id": family_data["contacto_id"],
-            "paciente_nombre": family_data["paciente_nombre"],
-            "familiar_nombre": family_data["familiar_nombre"]
-        }
-    finally:
-        cursor.close()
-        conn.close()
+
+    key = family_auth.key(family_login.patient_code, family_login.family_code)
+    family_data = await family_auth.authenticate(key, load)
+
+    if not family_data:
+        family_login_limiter.record_failure(client)
+        raise HTTPException(status_code=401, detail="Códigos familiares inválidos")
+
+    token = create_access_token({
+        "sub": str(family_data["contacto_id"]),
+        "type": "familiar",
+        "patient_id": family_data["paciente_id"],
+        "family_id": family_data["contacto_id"],
+    }, minutes=FAMILY_TOKEN_MINUTES)
+    return {
+        "access_token": token,
+        "token_type": "bearer",
+        "user_type": "familiar",
+        "patient_id": family_data["paciente_id"],
+        "family_id": family_data["contacto_id"],
+    }
+
+
+# Revocaciones de acceso familiar por paciente (segundos UNIX, 0 si no hay).
+# Se cachean FAMILY_REVOCATION_TTL segundos: en el proceso que revoca el
+# efecto es inmediato y en los demás a lo sumo tras ese intervalo
+family_revocations = TTLCache(
+    ttl=float(os.getenv("FAMILY_REVOCATION_TTL", 10)),
+    max_entries=int(os.getenv("FAMILY_CACHE_SIZE", 10000)),
+)
+
+
+async def _revoked_at(patient_id):
+    async def load():
+        try:
+            row = await _query_one(
+                "SELECT revocado_en FROM revocaciones_familiares WHERE paciente_id = %s", (patient_id,)
+            )
+        except PoolTimeoutError:
+            raise
+        except Exception as e:
+            print(f"❌ No se pudo leer revocaciones_familiares (¿migración 007?): {e}")
+            return 0
+        return row["revocado_en"] if row else 0
+    return await family_revocations.get_or_load(patient_id, load)
+
+
+async def check_family_access(claims, patient_id):
+    """``check_family_patient`` más la revocación: el token debe ser posterior."""
+    check_family_patient(claims, patient_id)
+    if claims.get("iat", 0) <= await _revoked_at(patient_id):
+        raise HTTPException(status_code=401, detail="Acceso familiar revocado",
+                            headers={"WWW-Authenticate": "Bearer"})
+
+
+# Revocar el acceso familiar (requiere token del personal). Los códigos y
+# pacientes se desactivan en la base; este llamado invalida además los
+# tokens ya emitidos y las sesiones cacheadas del paciente
+@app.post("/family/auth/invalidate/{paciente_id}", dependencies=[Depends(current_user)])
+async def invalidate_family_auth(paciente_id: int):
+    revoked_at = int(time.time())
+    async with db.session() as session:
+        await session.execute("""
+            INSERT INTO revocaciones_familiares (paciente_id, revocado_en) VALUES (%s, %s)
+            ON DUPLICATE KEY UPDATE revocado_en = VALUES(revocado_en)
+        """, (paciente_id, revoked_at))
+        await session.commit()
+    family_revocations.invalidate(paciente_id)
+    family_auth.invalidate_patient(paciente_id)
+    family_cache.invalidate(paciente_id)
+    # Los WebSockets abiertos de este proceso se cierran; los de otros
+    # procesos se rechazan al reconectar
+    family_hub.publish(paciente_id, FAMILY_REVOKED)
+    return {"message": "Accesos familiares revocados"}
 
 
 # Endpoints para familiares
-@app.get("/family/patient/{patient_id}")
-def get_family_patient_data(patient_id: int):
+SURGERY_SNAPSHOT_SQL = """
+    SELECT c.*,
+           CASE 
+               WHEN c.estado = 'Programada' THEN 'preparacion'
+               WHEN c.estado = 'En_proceso' THEN 'en_progreso'
+               WHEN c.estado = 'Finalizada' THEN 'finalizada'
+               WHEN c.estado = 'Cancelada' THEN 'complicacion'
+               ELSE 'preparacion'
+           END AS current_status,
+           CASE 
+               WHEN c.estado = 'Programada' THEN 0
+               WHEN c.estado = 'Pre-operatorio' THEN 25
+               WHEN c.estado = 'En_proceso' THEN 75
+               WHEN c.estado = 'Post-operatorio' THEN 90
+               WHEN c.estado = 'Finalizada' THEN 100
+               ELSE 0
+           END AS progress,
+           CASE 
+               WHEN c.fecha_inicio IS NOT NULL 
+               THEN TIMESTAMPDIFF(MINUTE, c.fecha_inicio, COALESCE(c.fecha_fin, NOW()))
+               ELSE 0
+           END AS elapsed_time
+    FROM cirugias c
+    WHERE c.paciente_id = %s
+    ORDER BY c.fecha_programada DESC
+    LIMIT 1
+"""
+
+# Mismo mapeo que SURGERY_SNAPSHOT_SQL, para publicar cambios sin reconsultar
+SURGERY_STATUS = {
+    "Programada": "preparacion",
+    "En_proceso": "en_progreso",
+    "Finalizada": "finalizada",
+    "Cancelada": "complicacion",
+}
+SURGERY_PROGRESS = {
+    "Programada": 0,
+    "Pre-operatorio": 25,
+    "En_proceso": 75,
+    "Post-operatorio": 90,
+    "Finalizada": 100,
+}
+
+# Canales en vivo por paciente para el portal familiar
+family_hub = PubSubHub(queue_size=int(os.getenv("FAMILY_WS_QUEUE", 32)))
+FAMILY_REVOKED = {"type": "revoked"}
+
+# Caché por paciente del snapshot familiar; se invalida en cada escritura
+family_cache = TTLCache(
+    ttl=float(os.getenv("FAMILY_CACHE_TTL", 30)),
+    max_entries=int(os.getenv("FAMILY_CACHE_SIZE", 10000)),
+)
+
+
+async def _query_one(sql, params, read=False, keys=()):
+    async with db.session(read=read, keys=keys) as session:
+        return await session.fetchone(sql, params)
+
+
+async def _query_all(sql, params, read=False, keys=()):
+    async with db.session(read=read, keys=keys) as session:
+        return await session.fetchall(sql, params)
+
+
+async def build_family_snapshot(patient_id):
     """
-    Devuelve información general del paciente, su cirugía más reciente,
-    signos vitales actuales y notificaciones.
+    Arma el snapshot familiar ejecutando las cuatro consultas en paralelo,
+    cada una con su propia conexión del pool.
     """
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-
-    try:
+    # Lecturas en réplica salvo que el paciente tenga escrituras que aún no llegaron
+    keys = (("paciente", patient_id),)
+    patient, surgery, vital_signs, notifications = await asyncio.gather(
         # Obtener datos del paciente
-        cursor.execute("""
+        _query_one("""
             SELECT id, nombre, apellido, cedula, fecha_nacimiento, sexo, eps, tipo_sangre
             FROM pacientes 
             WHERE id = %s AND activo = TRUE
-        """, (patient_id,))
-        patient = cursor.fetchone()
-
-        if not patient:
-            raise HTTPException(status_code=404, detail="Paciente no encontrado")
-
+        """, (patient_id,), read=True, keys=keys),
         # Obtener la cirugía más reciente
-        cursor.execute("""
-            SELECT c.*, tc.nombre AS tipo_cirugia_nombre,
-                   CONCAT(m.nombre, ' ', m.apellido) AS medico_nombre,
-                   CASE 
-                       WHEN c.estado = 'Programada' THEN 'preparacion'
-                       WHEN c.estado = 'En_proceso' THEN 'en_progreso'
-                       WHEN c.estado = 'Finalizada' THEN 'finalizada'
-                       WHEN c.estado = 'Cancelada' THEN 'complicacion'
-                       ELSE 'preparacion'
-                   END AS current_status,
-                   CASE 
-                       WHEN c.estado = 'Programada' THEN 0
-                       WHEN c.estado = 'Pre-operatorio' THEN 25
-                       WHEN c.estado = 'En_proceso' THEN 75
-                       WHEN c.estado = 'Post-operatorio' THEN 90
-                       WHEN c.estado = 'Finalizada' THEN 100
-                       ELSE 0
-                   END AS progress,
-                   CASE 
-                       WHEN c.fecha_inicio IS NOT NULL 
-                       THEN TIMESTAMPDIFF(MINUTE, c.fecha_inicio, COALESCE(c.fecha_fin, NOW()))
-                       ELSE 0
-                   END AS elapsed_time
-            FROM cirugias c
-            JOIN tipos_cirugia tc ON c.tipo_cirugia_id = tc.id
-            JOIN medicos m ON c.medico_principal_id = m.id
-            WHERE c.paciente_id = %s
-            ORDER BY c.fecha_programada DESC
-            LIMIT 1
-        """, (patient_id,))
-        surgery = cursor.fetchone()
-
+        _query_one(SURGERY_SNAPSHOT_SQL, (patient_id,), read=True, keys=keys),
         # Obtener signos vitales más recientes
-        cursor.execute("""
+        _query_one("""
             SELECT presion_sistolica, presion_diastolica, frecuencia_cardiaca, 
                    temperatura, saturacion_oxigeno
             FROM signos_vitales 
             WHERE paciente_id = %s
             ORDER BY fecha_registro DESC
             LIMIT 1
-        """, (patient_id,))
-        vital_signs = cursor.fetchone()
-
+        """, (patient_id,), read=True, keys=keys),
         # Obtener notificaciones recientes
-        cursor.execute("""
+        _query_all("""
             SELECT n.titulo AS message, n.fecha_envio AS timestamp
             FROM notificaciones n
             JOIN codigos_familiares cf ON n.contacto_id = cf.contacto_id
             WHERE cf.paciente_id = %s AND cf.activo = TRUE
             ORDER BY n.fecha_envio DESC
             LIMIT 5
-        """, (patient_id,))
-        notifications = cursor.fetchall()
-
-        # Respuesta combinada
-        return {
-            "patient": patient,
-            "surgery_status": {
-                "current_status": surgery["current_status"] if surgery else "preparacion",
-                "progress": surgery["progress"] if surgery else 0,
-                "elapsed_time": (
-                    f"{surgery['elapsed_time']//60:02d}:{surgery['elapsed_time']%60:02d}"
-                    if surgery else "00:00"
-                ),
-                "heart_rate": vital_signs["frecuencia_cardiaca"] if vital_signs else 72,
-                "blood_pressure": (
+        """, (patient_id,), read=True, keys=keys),
+    )
+
+    if not patient:
+        return None
+
+    # Respuesta combinada
+    return {
+        "patient": patient,
+        "surgery_status": {
+            "current_status": surgery["current_status"] if surgery else "preparacion",
+            "progress": surgery["progress"] if surgery else 0,
+            "elapsed_time": (
+                f"{surgery['elapsed_time']//60:02d}:{surgery['elapsed_time']%60:02d}"
+                if surgery else "00:00"
+            ),
+            "heart_rate": vital_signs["frecuencia_cardiaca"] if vital_signs else 72,
+            "blood_pressure": (
+                (
                     f"{vital_signs['presion_sistolica']}/{vital_signs['presion_diastolica']}"
-                    if vital_signs else "120/80"
-                ),
-                "temperature": vital_signs["temperatura"] if vital_signs else 36.5,
-                "oxygen_saturation": vital_signs["saturacion_oxigeno"] if vital_signs else 98,
-                "notifications": notifications
-            }
+                    if vital_signs['presion_sistolica'] and vital_signs['presion_diastolica'] else None
+                )
+                if vital_signs else "120/80"
+            ),
+            "temperature": vital_signs["temperatura"] if vital_signs else 36.5,
+            "oxygen_saturation": vital_signs["saturacion_oxigeno"] if vital_signs else 98,
+            "notifications": notifications
         }
+    }
+
 
+@app.get("/family/patient/{patient_id}")
+async def get_family_patient_data(patient_id: int, family: dict = Depends(current_family)):
+    """
+    Devuelve información general del paciente, su cirugía más reciente,
+    signos vitales actuales y notificaciones.
+    """
+    await check_family_access(family, patient_id)
+    try:
+        snapshot = await family_cache.get_or_load(
+            patient_id, lambda: build_family_snapshot(patient_id)
+        )
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error al obtener datos del paciente: {str(e)}")
 
-    finally:
-        cursor.close()
-        conn.close()
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail="Paciente no encontrado")
+    return FastJSONResponse(snapshot)
 
 
-@app.get("/pacientes")
-def get_pacientes():
-    conn = db_manager.get_connection()
-    if not conn:
-        raise HTTPException(status_code=500, detail="❌ No se pudo conectar con la base de datos")
+@app.websocket("/family/patient/{patient_id}/ws")
+async def family_patient_stream(websocket: WebSocket, patient_id: int, token: str = ""):
+    """
+    Envía el snapshot completo al conectar y luego solo los deltas de
+    cirugía y signos vitales cuando cambian. El navegador no puede enviar
+    encabezados en un WebSocket, así que el token viaja en ``?token=``.
+    """
+    try:
+        claims = decode_access_token(token)
+        if claims.get("type") != "familiar":
+            raise HTTPException(status_code=403, detail="Token no autorizado para este recurso")
+        await check_family_access(claims, patient_id)
+    except HTTPException:
+        await websocket.close(code=4401)
+        return
 
+    await websocket.accept()
+    # Suscripción antes del snapshot: un delta publicado mientras se arma
+    # queda en la cola y se envía después (aplicarlo dos veces es inocuo)
+    subscription = family_hub.subscribe(patient_id)
+    writer_task = None
     try:
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("""
-            SELECT 
-                id, nombre, apellido, cedula, fecha_nacimiento, sexo, 
-                telefono, eps, tipo_sangre
-            FROM pacientes
-            WHERE activo = TRUE
-            LIMIT 50
-        """)
-        pacientes = cursor.fetchall()
-        return pacientes
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error en la consulta: {str(e)}")
+        snapshot = await family_cache.get_or_load(
+            patient_id, lambda: build_family_snapshot(patient_id)
+        )
+        if snapshot is None:
+            await websocket.close(code=4404)
+            return
+        await websocket.send_text(dumps({"type": "snapshot", "data": snapshot}).decode())
+
+        async def writer():
+            while True:
+                message = await subscription.get()
+                # Con la cola llena el aviso de revocación pudo perderse:
+                # cada RESYNC vuelve a comprobarla
+                if message is FAMILY_REVOKED or (
+                    message is subscription.RESYNC and claims["iat"] <= await _revoked_at(patient_id)
+                ):
+                    await websocket.close(code=4401)
+                    return
+                if message is subscription.RESYNC:
+                    data = await family_cache.get_or_load(
+                        patient_id, lambda: build_family_snapshot(patient_id)
+                    )
+                    if data is None:
+                        # El paciente ya no existe o fue desactivado
+                        await websocket.close(code=4404)
+                        return
+                    message = {"type": "snapshot", "data": data}
+                await websocket.send_text(dumps(message).decode())
+
+        writer_task = asyncio.create_task(writer())
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
     finally:
-        cursor.close()
-        conn.close()
+        if writer_task is not None:
+            writer_task.cancel()
+        family_hub.unsubscribe(subscription)
 
 
-@app.get("/pacientes")
-def get_pacientes():
-    conn = db_manager.get_connection()
-    if not conn:
-        raise HTTPException(status_code=500, detail="❌ No se pudo conectar con la base de datos")
+PACIENTES_COLUMNS = """
+    id, nombre, apellido, cedula, fecha_nacimiento, sexo, 
+    telefono, eps, tipo_sangre
+"""
+
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", 1000))
+
+
+def _export_response(sql, params, fmt, filename):
+    """Exporta una tabla completa en streaming con memoria constante."""
+    if fmt not in ("ndjson", "json"):
+        raise HTTPException(status_code=400, detail="Formato inválido: use ndjson o json")
+
+    async def chunks():
+        async with db.session(read=True) as session:
+            async for rows in session.stream(sql, params, chunk_size=EXPORT_CHUNK_SIZE):
+                yield rows
+
+    return StreamingResponse(
+        stream_rows(chunks(), fmt),
+        media_type="application/x-ndjson" if fmt == "ndjson" else "application/json",
+        headers={"Content-Disposition": f"attachment; filename={filename}.{fmt}"},
+    )
+
 
-    cursor = None
+# Paginación por cursor: la siguiente página viene en el header X-Next-Cursor
+@app.get("/pacientes")
+async def get_pacientes(limit: int = 50, cursor: Optional[str] = None,
+                        session: Session = Depends(get_read_db)):
     try:
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("""
-            SELECT 
-                id, nombre, apellido, cedula, fecha_nacimiento, sexo, 
-                telefono, eps, tipo_sangre
+        pacientes, next_cursor = await keyset_page(session, f"""
+            SELECT {PACIENTES_COLUMNS}
             FROM pacientes
-            WHERE activo = TRUE
-            LIMIT 50
-        """)
-        pacientes = cursor.fetchall()
-        return pacientes
+            WHERE activo = TRUE AND id > %s
+            ORDER BY id
+            LIMIT %s
+        """, (), cursor, limit)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error en la consulta: {str(e)}")
-    finally:
-        if cursor:
-            cursor.close()
-        conn.close()
+
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+    return FastJSONResponse(pacientes, headers=headers)
+
+
+# Exportación completa de pacientes (requiere token del personal)
+@app.get("/pacientes/export", dependencies=[Depends(current_user)])
+async def export_pacientes(format: str = "ndjson"):
+    return _export_response(f"""
+        SELECT {PACIENTES_COLUMNS}
+        FROM pacientes
+        WHERE activo = TRUE
+        ORDER BY id
+    """, (), format, "pacientes")
 
 @app.get("/cirugias/{paciente_id}")
-def get_cirugias_paciente(paciente_id: int):
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    
-    try:
-        cursor.execute("""
-            SELECT c.*, tc.nombre as tipo_cirugia_nombre,
-                   CONCAT(m.nombre, ' ', m.apellido) as medico_nombre
-            FROM cirugias c
-            JOIN tipos_cirugia tc ON c.tipo_cirugia_id = tc.id
-            JOIN medicos m ON c.medico_principal_id = m.id
-            WHERE c.paciente_id = %s
-            ORDER BY c.fecha_programada DESC
-        """, (paciente_id,))
-        cirugias = cursor.fetchall()
-        return cirugias
-    finally:
-        cursor.close()
-        conn.close()
-
-@app.put("/cirugias/{cirugia_id}/estado")
-def actualizar_estado_cirugia(cirugia_id: int, estado: str):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    try:
-        # Actualizar estado
-        cursor.execute("""
-            UPDATE cirugias 
-            SET estado = %s, 
-                fecha_inicio = CASE WHEN %s = 'En_proceso' THEN NOW() ELSE fecha_inicio END,
-                fecha_fin = CASE WHEN %s = 'Finalizada' THEN NOW() ELSE fecha_fin END
-            WHERE id = %s
-        """, (estado, estado, estado, cirugia_id))
-        
-        # Notificar a contactos
-        cursor.execute("""
-            INSERT INTO notificaciones (contacto_id, paciente_id, cirugia_id, tipo, titulo, mensaje)
-            SELECT c.id, ci.paciente_id, ci.id, 'cambio_estado',
-                   CONCAT('Cambio de estado en cirugía'),
-                   CONCAT('La cirugía ha cambiado a estado: ', %s)
-            FROM contactos c
-            JOIN cirugias ci ON c.paciente_id = ci.paciente_id
-            WHERE ci.id = %s AND c.notificaciones_activas = TRUE
-        """, (estado, cirugia_id))
-        
-        conn.commit()
-        return {"message": "Estado actualizado correctamente"}
-    finally:
-        cursor.close()
-        conn.close()
+async def get_cirugias_paciente(paciente_id: int, session: Session = Depends(get_read_db)):
+    cirugias = await session.fetchall("""
+        SELECT * FROM cirugias
+        WHERE paciente_id = %s
+        ORDER BY fecha_programada DESC
+    """, (paciente_id,))
+    return FastJSONResponse(await reference_data.enrich_cirugias(cirugias))
+
+@app.put("/cirugias/{cirugia_id}/estado", dependencies=[Depends(current_user)])
+async def actualizar_estado_cirugia(cirugia_id: int, estado: str, request: Request,
+                                    session: Session = Depends(get_db)):
+    current = await session.fetchone(
+        "SELECT paciente_id, estado FROM cirugias WHERE id = %s FOR UPDATE", (cirugia_id,)
+    )
+    if not current:
+        raise HTTPException(status_code=404, detail="Cirugía no encontrada")
+
+    # Reintento de un cambio ya aplicado: se responde lo mismo sin volver a
+    # escribir, así fecha_inicio/fecha_fin conservan el instante original.
+    # El FOR UPDATE de arriba serializa los reintentos concurrentes
+    mensaje = f"La cirugía ha cambiado a estado: {estado}"
+    idempotency_key = request.headers.get("Idempotency-Key")
+    if idempotency_key:
+        previous = await find_notification(session, cirugia_id, idempotency_key)
+        if previous:
+            await session.rollback()
+            if previous["mensaje"] != mensaje:
+                raise HTTPException(
+                    status_code=409,
+                    detail="Idempotency-Key ya usada con otro estado para esta cirugía",
+                )
+            return FastJSONResponse(
+                {"message": "Estado actualizado correctamente"},
+                headers={"Idempotent-Replayed": "true"},
+            )
+
+    # Actualizar estado
+    await session.execute("""
+        UPDATE cirugias 
+        SET estado = %s, 
+            fecha_inicio = CASE WHEN %s = 'En_proceso' THEN NOW() ELSE fecha_inicio END,
+            fecha_fin = CASE WHEN %s = 'Finalizada' THEN NOW() ELSE fecha_fin END
+        WHERE id = %s
+    """, (estado, estado, estado, cirugia_id))
+
+    # Notificar a contactos: un solo evento en el outbox; el despachador
+    # lo expande a cada contacto fuera de esta transacción
+    await enqueue_notification(
+        session, current["paciente_id"], "cambio_estado",
+        "Cambio de estado en cirugía", mensaje,
+        cirugia_id=cirugia_id, idempotency_key=idempotency_key,
+    )
+
+    await session.commit()
+    notification_dispatcher.notify()
+
+    dashboard_stats.on_surgery_state_change(current["estado"], estado)
+    db.record_write(("paciente", current["paciente_id"]))
+    family_cache.invalidate(current["paciente_id"])
+    resource_versions.bump("cirugias", current["paciente_id"])
+    family_hub.publish_delta(current["paciente_id"], "surgery_status", {
+        "current_status": SURGERY_STATUS.get(estado, "preparacion"),
+        "progress": SURGERY_PROGRESS.get(estado, 0),
+    })
+    return {"message": "Estado actualizado correctamente"}
 
 @app.get("/contactos")
-def get_contactos(limit: int = 50, offset: int = 0):
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    
-    try:
-        cursor.execute("""
-            SELECT * FROM contactos
-            ORDER BY id ASC
-            LIMIT %s OFFSET %s
-        """, (limit, offset))
-        contactos = cursor.fetchall()
-        return contactos
-    finally:
-        cursor.close()
-        conn.close()
+async def get_contactos(limit: int = 50, cursor: Optional[str] = None,
+                        session: Session = Depends(get_read_db)):
+    contactos, next_cursor = await keyset_page(session, """
+        SELECT * FROM contactos
+        WHERE id > %s
+        ORDER BY id ASC
+        LIMIT %s
+    """, (), cursor, limit)
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+    return FastJSONResponse(contactos, headers=headers)
+
+
+# Exportación completa de contactos (requiere token del personal)
+@app.get("/contactos/export", dependencies=[Depends(current_user)])
+async def export_contactos(format: str = "ndjson"):
+    return _export_response("""
+        SELECT * FROM contactos
+        ORDER BY id ASC
+    """, (), format, "contactos")
 
 
 @app.get("/signos-vitales/{paciente_id}")
-def get_signos_vitales(paciente_id: int):
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    
+async def get_signos_vitales(paciente_id: int, historico: bool = False, limit: int = 20,
+                             session: Session = Depends(get_read_db)):
+    """Últimas lecturas; con ``historico=true`` incluye las ya archivadas."""
+    signos = await session.fetchall(f"""
+        SELECT * FROM {data_lifecycle.history_source("signos_vitales", historico)}
+        WHERE paciente_id = %s
+        ORDER BY fecha_registro DESC
+        LIMIT %s
+    """, (paciente_id, min(max(limit, 1), 500)))
+    return FastJSONResponse(signos)
+
+
+# Historial de notificaciones de un contacto (idx_notificaciones_contacto_fecha)
+@app.get("/contactos/{contacto_id}/notificaciones", dependencies=[Depends(current_user)])
+async def get_notificaciones_contacto(contacto_id: int, historico: bool = False, limit: int = 50,
+                                      session: Session = Depends(get_read_db)):
+    """Últimas notificaciones; con ``historico=true`` incluye las ya archivadas."""
+    notificaciones = await session.fetchall(f"""
+        SELECT * FROM {data_lifecycle.history_source("notificaciones", historico)}
+        WHERE contacto_id = %s
+        ORDER BY fecha_envio DESC
+        LIMIT %s
+    """, (contacto_id, min(max(limit, 1), 500)))
+    return FastJSONResponse(notificaciones)
+
+
+# Historial de auditoría de un registro (idx_auditoria_registro)
+@app.get("/auditoria/{tabla}/{id_registro}", dependencies=[Depends(current_user)])
+async def get_auditoria(tabla: str, id_registro: int, historico: bool = False, limit: int = 50,
+                        session: Session = Depends(get_read_db)):
+    """Cambios de un registro; con ``historico=true`` incluye los ya archivados."""
+    cambios = await session.fetchall(f"""
+        SELECT * FROM {data_lifecycle.history_source("auditoria", historico)}
+        WHERE tabla_afectada = %s AND id_registro = %s
+        ORDER BY fecha_accion DESC
+        LIMIT %s
+    """, (tabla, id_registro, min(max(limit, 1), 500)))
+    return FastJSONResponse(cambios)
+
+def _rango_fechas(desde, hasta, por_defecto):
+    hasta = hasta or datetime.datetime.now()
+    desde = desde or hasta - por_defecto
+    if desde >= hasta:
+        raise HTTPException(status_code=400, detail="El rango de fechas es inválido")
+    return desde, hasta
+
+
+# Serie de tiempo de una métrica, reducida en el servidor
+@app.get("/signos-vitales/{paciente_id}/serie")
+async def get_serie_signos_vitales(
+    paciente_id: int,
+    metrica: str = "frecuencia_cardiaca",
+    desde: Optional[datetime.datetime] = None,
+    hasta: Optional[datetime.datetime] = None,
+    metodo: str = "buckets",
+    bucket: int = 300,
+    puntos: int = 500,
+    session: Session = Depends(get_read_db),
+):
+    """
+    ``metodo=buckets`` devuelve mín./máx./promedio cada ``bucket`` segundos;
+    ``metodo=lttb`` devuelve a lo sumo ``puntos`` puntos para graficar.
+    """
+    if metrica not in METRICS:
+        raise HTTPException(status_code=400, detail=f"Métrica inválida: {metrica}")
+    if metodo not in ("buckets", "lttb"):
+        raise HTTPException(status_code=400, detail="Método inválido: use buckets o lttb")
+    desde, hasta = _rango_fechas(desde, hasta, datetime.timedelta(days=1))
+
+    # Los rangos que llegan a meses ya archivados leen también el archivo
+    source = data_lifecycle.history_source("signos_vitales", data_lifecycle.covers_archive("signos_vitales", desde))
+    timestamps, values = await fetch_series(session, paciente_id, metrica, desde, hasta, source)
+    if metodo == "buckets":
+        data = downsample_buckets(timestamps, values, max(bucket, 1))
+    else:
+        xs, ys = lttb(timestamps, values, puntos)
+        data = [
+            {"fecha": datetime.datetime.fromtimestamp(x), "valor": float(y)}
+            for x, y in zip(xs, ys)
+        ]
+    return FastJSONResponse({
+        "metrica": metrica, "desde": desde, "hasta": hasta, "total": len(timestamps), "puntos": data,
+    })
+
+
+# Agregados precalculados por minuto, hora o día
+@app.get("/signos-vitales/{paciente_id}/rollup")
+async def get_rollup_signos_vitales(
+    paciente_id: int,
+    granularidad: str = "hora",
+    desde: Optional[datetime.datetime] = None,
+    hasta: Optional[datetime.datetime] = None,
+    session: Session = Depends(get_read_db),
+):
+    if granularidad not in ROLLUPS:
+        raise HTTPException(status_code=400, detail="Granularidad inválida: use minuto, hora o dia")
+    desde, hasta = _rango_fechas(desde, hasta, datetime.timedelta(days=7))
+    return FastJSONResponse(await fetch_rollup(session, paciente_id, granularidad, desde, hasta))
+
+
+def vitals_fields(signos):
+    """Campos del snapshot familiar que cambian con una lectura."""
+    return {
+        "heart_rate": signos.frecuencia_cardiaca,
+        "blood_pressure": (
+            f"{signos.presion_sistolica}/{signos.presion_diastolica}"
+            if signos.presion_sistolica and signos.presion_diastolica else None
+        ),
+        "temperature": signos.temperatura,
+        "oxygen_saturation": signos.saturacion_oxigeno,
+    }
+
+
+def on_vitals_recorded(paciente_id, signos):
+    """Invalida el snapshot familiar y publica los nuevos signos vitales."""
+    db.record_write(("paciente", paciente_id))
+    family_cache.invalidate(paciente_id)
+    resource_versions.bump("signos_vitales", paciente_id)
+    family_hub.publish_delta(paciente_id, "surgery_status", vitals_fields(signos))
+
+
+# Carga masiva de signos vitales desde monitores (requiere token del personal)
+# Acepta un arreglo JSON o un stream NDJSON (Content-Type: application/x-ndjson)
+@app.post("/signos-vitales/bulk", dependencies=[Depends(current_user)])
+async def crear_signos_vitales_bulk(request: Request, chunk_size: Optional[int] = None,
+                                    session: Session = Depends(get_db)):
+    # Acotado: 5000 filas x 8 columnas quedan bajo el límite de 65.535
+    # parámetros de MySQL por statement
+    chunk_size = chunk_size or int(os.getenv("VITALS_BULK_CHUNK", 500))
+    ingestor = VitalsBulkIngestor(
+        session,
+        chunk_size=min(max(chunk_size, 1), 5000),
+        on_insert=observe_vitals,
+    )
+
     try:
-        cursor.execute("""
-            SELECT * FROM signos_vitales 
-            WHERE paciente_id = %s
-            ORDER BY fecha_registro DESC
-            LIMIT 20
-        """, (paciente_id,))
-        signos = cursor.fetchall()
-        return signos
-    finally:
-        cursor.close()
-        conn.close()
+        if request.headers.get("content-type", "").startswith("application/x-ndjson"):
+            # Se procesa línea por línea sin cargar todo el cuerpo en memoria
+            index, pending = 0, b""
+            async for data in request.stream():
+                pending += data
+                *lines, pending = pending.split(b"\n")
+                for line in lines:
+                    if line.strip():
+                        await _ingest_ndjson_line(ingestor, index, line)
+                        index += 1
+            if pending.strip():
+                await _ingest_ndjson_line(ingestor, index, pending)
+        else:
+            readings = await request.json()
+            if not isinstance(readings, list):
+                raise HTTPException(status_code=400, detail="Se esperaba un arreglo de lecturas")
+            for index, raw in enumerate(readings):
+                await ingestor.add(index, raw)
 
-# Registrar signos vitales (sin token)
-@app.post("/signos-vitales/{paciente_id}")
-def crear_signos_vitales(paciente_id: int, signos: SignosVitalesBase):
-    conn = get_db_connection()
-    cursor = conn.cursor()
+        result = await ingestor.finish()
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al registrar signos vitales: {str(e)}")
+
+    for paciente_id, lectura in ingestor.latest.items():
+        on_vitals_recorded(paciente_id, lectura)
+    return result
 
+
+async def _ingest_ndjson_line(ingestor, index, line):
     try:
-        cursor.execute("""
-            INSERT INTO signos_vitales 
-            (paciente_id, fecha_registro, presion_sistolica, presion_diastolica, 
-             frecuencia_cardiaca, temperatura, saturacion_oxigeno, dolor_escala)
-            VALUES (%s, NOW(), %s, %s, %s, %s, %s, %s)
-        """, (
-            paciente_id,
-            signos.presion_sistolica,
-            signos.presion_diastolica,
-            signos.frecuencia_cardiaca,
-            signos.temperatura,
-            signos.saturacion_oxigeno,
-            signos.dolor_escala
-        ))
-        conn.commit()
+        raw = json.loads(line)
+    except ValueError as e:
+        ingestor.received += 1
+        ingestor.errors.append({"index": index, "error": f"JSON inválido: {e}"})
+        return
+    await ingestor.add(index, raw)
+
+
+# Registrar signos vitales (requiere token del personal)
+@app.post("/signos-vitales/{paciente_id}", dependencies=[Depends(current_user)])
+async def crear_signos_vitales(paciente_id: int, signos: SignosVitalesBase):
+    if vitals_buffer is not None:
+        # Se confirma al cliente en cuanto la lectura queda en el journal
+        row = LecturaSignosVitales(paciente_id=paciente_id, **signos.model_dump()).as_row()
+        try:
+            await vitals_buffer.submit(row)
+        except WriteBehindFull as e:
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        observe_vitals([row])
+        family_hub.publish_delta(paciente_id, "surgery_status", vitals_fields(signos))
+        return JSONResponse(status_code=202, content={"message": "Signos vitales recibidos"})
+
+    try:
+        row = LecturaSignosVitales(paciente_id=paciente_id, **signos.model_dump()).as_row()
+        async with db.session() as session:
+            await session.execute("""
+                INSERT INTO signos_vitales 
+                (paciente_id, fecha_registro, presion_sistolica, presion_diastolica, 
+                 frecuencia_cardiaca, temperatura, saturacion_oxigeno, dolor_escala)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+            """, row)
+            await update_rollups(session, [row])
+            await session.commit()
+        on_vitals_recorded(paciente_id, signos)
+        observe_vitals([row])
         return {"message": "Signos vitales registrados correctamente"}
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error al registrar signos vitales: {str(e)}")
-    finally:
-        cursor.close()
-        conn.close()
 
 
 # Obtener evoluciones clínicas (sin token)
 @app.get("/evoluciones/{paciente_id}")
-def get_evoluciones(paciente_id: int):
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-
+async def get_evoluciones(paciente_id: int, session: Session = Depends(get_read_db)):
     try:
-        cursor.execute("""
-            SELECT e.*, CONCAT(m.nombre, ' ', m.apellido) AS medico_nombre
-            FROM evoluciones_clinicas e
-            JOIN medicos m ON e.medico_id = m.id
-            WHERE e.paciente_id = %s
-            ORDER BY e.fecha_registro DESC
+        evoluciones = await session.fetchall("""
+            SELECT * FROM evoluciones_clinicas
+            WHERE paciente_id = %s
+            ORDER BY fecha_registro DESC
             LIMIT 10
         """, (paciente_id,))
-        evoluciones = cursor.fetchall()
-        return evoluciones
+        return FastJSONResponse(await reference_data.enrich_evoluciones(evoluciones))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error al obtener evoluciones: {str(e)}")
-    finally:
-        cursor.close()
-        conn.close()
-
 
-# Crear evolución clínica (sin token)
-@app.post("/evoluciones/{paciente_id}")
-def crear_evolucion(paciente_id: int, evolucion: EvolucionClinicaBase):
-    conn = get_db_connection()
-    cursor = conn.cursor()
 
+# Crear evolución clínica (requiere token del personal)
+@app.post("/evoluciones/{paciente_id}", dependencies=[Depends(current_user)])
+async def crear_evolucion(paciente_id: int, evolucion: EvolucionClinicaBase, session: Session = Depends(get_db)):
     try:
-        cursor.execute("""
+        await session.execute("""
             INSERT INTO evoluciones_clinicas 
             (paciente_id, fecha_registro, estado_general, descripcion, plan_tratamiento, observaciones_familiares, medico_id)
             VALUES (%s, NOW(), %s, %s, %s, %s, %s)
@@ -467,73 +1051,71 @@ def crear_evolucion(paciente_id: int, evolucion: EvolucionClinicaBase):
             evolucion.observaciones,
             evolucion.medico_id
         ))
-        conn.commit()
+        await session.commit()
+        family_cache.invalidate(paciente_id)
+        resource_versions.bump("evoluciones", paciente_id)
+        dashboard_stats.on_evolution(paciente_id, evolucion.estado_general)
         return {"message": "Evolución clínica registrada correctamente"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error al registrar evolución clínica: {str(e)}")
-    finally:
-        cursor.close()
-        conn.close()
 
 
 # Dashboard general (sin token)
 @app.get("/dashboard/stats")
-def get_dashboard_stats():
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-
-    try:
-        stats = {}
-
-        # Total pacientes
-        cursor.execute("SELECT COUNT(*) AS total FROM pacientes WHERE activo = TRUE")
-        stats["total_pacientes"] = cursor.fetchone()["total"]
-
-        # Cirugías hoy
-        cursor.execute("""
-            SELECT COUNT(*) AS total FROM cirugias 
-            WHERE DATE(fecha_programada) = CURDATE()
-        """)
-        stats["cirugias_hoy"] = cursor.fetchone()["total"]
-
-        # Cirugías en proceso
-        cursor.execute("""
-            SELECT COUNT(*) AS total FROM cirugias 
-            WHERE estado IN ('Pre-operatorio', 'En_proceso')
-        """)
-        stats["cirugias_activas"] = cursor.fetchone()["total"]
-
-        # Pacientes críticos
-        cursor.execute("""
-            SELECT COUNT(DISTINCT paciente_id) AS total 
-            FROM evoluciones_clinicas 
-            WHERE estado_general = 'Crítico' 
-            AND fecha_registro > DATE_SUB(NOW(), INTERVAL 24 HOUR)
-        """)
-        stats["pacientes_criticos"] = cursor.fetchone()["total"]
-
-        return stats
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error al obtener estadísticas: {str(e)}")
-    finally:
-        cursor.close()
-        conn.close()
+async def get_dashboard_stats():
+    # Los contadores se sirven desde memoria; solo se va a SQL si aún no
+    # se han cargado (por ejemplo, si la base no estaba lista al iniciar)
+    if not dashboard_stats.loaded:
+        try:
+            async with db.session(read=True) as session:
+                await dashboard_stats.reconcile(session)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error al obtener estadísticas: {str(e)}")
+    return dashboard_stats.snapshot()
 
 
 # Probar conexión con base de datos
 @app.get("/test-db")
-def test_db():
+async def test_db(session: Session = Depends(get_db)):
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT NOW() AS fecha")
-        result = cursor.fetchone()
-        return {"conexion_exitosa": True, "resultado": result}
+        result = await session.fetchone("SELECT NOW() AS fecha")
+        return {"conexion_exitosa": True, "resultado": result, "pool": db.stats()}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error de conexión: {str(e)}")
-    finally:
-        cursor.close()
-        conn.close()
+
+
+# Estadísticas del pool de conexiones
+@app.get("/db/pool")
+async def get_pool_stats():
+    return {
+        **db.stats(),
+        "family_cache": family_cache.stats(),
+        "family_ws": family_hub.stats(),
+        "vitals_buffer": vitals_buffer.stats() if vitals_buffer else None,
+        "vitals_monitor": vitals_monitor.stats(),
+        "notifications": notification_dispatcher.stats(),
+        "reference_data": reference_data.stats(),
+        "archive": data_lifecycle.stats(),
+        "family_auth": {**family_auth.stats(), "rate_limit": family_login_limiter.stats()},
+    }
+
+
+# Métricas por consulta en formato Prometheus
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    return PlainTextResponse(
+        query_metrics.render(db.stats()),
+        media_type="text/plain; version=0.0.4",
+    )
+
+
+# Últimas consultas que superaron SLOW_QUERY_MS, con su EXPLAIN
+@app.get("/metrics/slow-queries")
+async def get_slow_queries():
+    return FastJSONResponse({
+        "umbral_ms": query_metrics.slow_ms,
+        "consultas": list(reversed(query_metrics.slow_queries)),
+    })
 
 
 # Punto de entrada
@@ -0,0 +1,164 @@
+# notifications.py
+import asyncio
+import uuid
+
+from ingest import multirow_insert_sql
+
+# fecha_envio se toma del evento: forma parte de la clave única junto con
+# evento_id y contacto_id porque notificaciones está particionada por fecha
+NOTIFICATION_COLUMNS = (
+    "contacto_id", "paciente_id", "cirugia_id", "tipo", "titulo", "mensaje", "evento_id",
+    "fecha_envio",
+)
+
+
+async def enqueue_notification(session, paciente_id, tipo, titulo, mensaje,
+                               cirugia_id=None, idempotency_key=None):
+    """
+    Registra un evento en el outbox dentro de la transacción del llamador.
+    Un evento repetido con la misma ``idempotency_key`` para la misma
+    cirugía se ignora.
+    """
+    await session.execute("""
+        INSERT IGNORE INTO notificaciones_outbox
+        (idempotency_key, paciente_id, cirugia_id, tipo, titulo, mensaje)
+        VALUES (%s, %s, %s, %s, %s, %s)
+    """, (idempotency_key or uuid.uuid4().hex, paciente_id, cirugia_id, tipo, titulo, mensaje))
+
+
+async def find_notification(session, cirugia_id, idempotency_key):
+    """Evento ya registrado con ``idempotency_key`` para la cirugía, o None."""
+    return await session.fetchone("""
+        SELECT id, tipo, titulo, mensaje, fecha_creacion
+        FROM notificaciones_outbox
+        WHERE cirugia_id = %s AND idempotency_key = %s
+    """, (cirugia_id, idempotency_key))
+
+
+class NotificationDispatcher:
+    """
+    Expande los eventos del outbox en una notificación por contacto.
+
+    Toma lotes de eventos pendientes (``FOR UPDATE SKIP LOCKED``, así varias
+    réplicas de la API pueden despachar en paralelo), inserta todas las
+    notificaciones con un solo ``INSERT IGNORE`` y marca los eventos como
+    procesados en la misma transacción. Si algo falla, el lote se reintenta
+    con espera exponencial hasta ``max_attempts``.
+    """
+
+    def __init__(self, db, batch_size=100, interval=1.0, max_attempts=5, on_dispatched=None):
+        self.db = db
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_attempts = max_attempts
+        self.on_dispatched = on_dispatched
+        self._wake = asyncio.Event()
+
+        self.dispatched_events = 0
+        self.inserted_notifications = 0
+        self.failures = 0
+
+    def notify(self):
+        """Despierta al despachador sin esperar el siguiente intervalo."""
+        self._wake.set()
+
+    async def run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                while await self.dispatch_batch() == self.batch_size:
+                    pass
+            except Exception as e:
+                print(f"❌ Error al despachar notificaciones: {e}")
+
+    async def dispatch_batch(self):
+        async with self.db.session() as session:
+            events = await session.fetchall("""
+                SELECT id, paciente_id, cirugia_id, tipo, titulo, mensaje, intentos, fecha_creacion
+                FROM notificaciones_outbox
+                WHERE estado = 'pendiente' AND proximo_intento <= NOW()
+                ORDER BY id
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+            """, (self.batch_size,))
+            if not events:
+                await session.rollback()
+                return 0
+
+            try:
+                inserted = await self._expand(session, events)
+                await session.commit()
+            except Exception as e:
+                await session.rollback()
+                await self._record_failure(session, events, e)
+                raise
+
+        self.dispatched_events += len(events)
+        self.inserted_notifications += inserted
+        if self.on_dispatched:
+            self.on_dispatched(events)
+        return len(events)
+
+    async def _expand(self, session, events):
+        patient_ids = sorted({event["paciente_id"] for event in events})
+        contacts = await session.fetchall(f"""
+            SELECT id, paciente_id FROM contactos
+            WHERE paciente_id IN ({', '.join(['%s'] * len(patient_ids))})
+              AND notificaciones_activas = TRUE
+        """, tuple(patient_ids))
+        by_patient = {}
+        for contact in contacts:
+            by_patient.setdefault(contact["paciente_id"], []).append(contact["id"])
+
+        rows = [
+            (contacto_id, event["paciente_id"], event["cirugia_id"], event["tipo"],
+             event["titulo"], event["mensaje"], event["id"], event["fecha_creacion"])
+            for event in events
+            for contacto_id in by_patient.get(event["paciente_id"], ())
+        ]
+        inserted = 0
+        for i in range(0, len(rows), 500):
+            chunk = rows[i:i + 500]
+            inserted += await session.execute(
+                multirow_insert_sql("notificaciones", NOTIFICATION_COLUMNS, len(chunk), ignore=True),
+                [value for row in chunk for value in row],
+            )
+
+        ids = [event["id"] for event in events]
+        await session.execute(f"""
+            UPDATE notificaciones_outbox
+            SET estado = 'procesado', fecha_proceso = NOW()
+            WHERE id IN ({', '.join(['%s'] * len(ids))})
+        """, ids)
+        return inserted
+
+    async def _record_failure(self, session, events, error):
+        self.failures += 1
+        for event in events:
+            attempts = event["intentos"] + 1
+            await session.execute("""
+                UPDATE notificaciones_outbox
+                SET intentos = %s,
+                    ultimo_error = %s,
+                    estado = %s,
+                    proximo_intento = NOW() + INTERVAL %s SECOND
+                WHERE id = %s
+            """, (
+                attempts,
+                str(error)[:500],
+                "error" if attempts >= self.max_attempts else "pendiente",
+                2 ** attempts,
+                event["id"],
+            ))
+        await session.commit()
+
+    def stats(self):
+        return {
+            "dispatched_events": self.dispatched_events,
+            "inserted_notifications": self.inserted_notifications,
+            "failures": self.failures,
+        }
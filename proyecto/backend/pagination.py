@@ -0,0 +1,55 @@
+# pagination.py
+import base64
+import json
+
+from fastapi import HTTPException
+
+from serialization import dumps
+
+
+def encode_cursor(last_id):
+    """Token opaco para continuar después de ``last_id``."""
+    raw = json.dumps({"id": last_id}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    if not cursor:
+        return 0
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return int(json.loads(base64.urlsafe_b64decode(padded))["id"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor de paginación inválido")
+
+
+async def keyset_page(session, sql, params, cursor, limit, max_limit=500):
+    """
+    Ejecuta una consulta paginada por ``id``. ``sql`` debe filtrar con
+    ``id > %s`` y terminar en ``ORDER BY id LIMIT %s``.
+
+    Devuelve las filas y el cursor de la página siguiente (o ``None``).
+    """
+    limit = max(1, min(limit, max_limit))
+    rows = await session.fetchall(sql, (*params, decode_cursor(cursor), limit + 1))
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]["id"])
+    return rows, next_cursor
+
+
+async def stream_rows(chunks, fmt="ndjson"):
+    """Serializa los bloques de filas como NDJSON o como un arreglo JSON."""
+    if fmt == "json":
+        yield b"["
+    first = True
+    async for rows in chunks:
+        parts = [dumps(row) for row in rows]
+        if fmt == "json":
+            yield (b"" if first else b",") + b",".join(parts)
+        else:
+            yield b"\n".join(parts) + b"\n"
+        first = False
+    if fmt == "json":
+        yield b"]"
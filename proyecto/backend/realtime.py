@@ -0,0 +1,87 @@
+# realtime.py
+import asyncio
+from collections import defaultdict
+
+
+class Subscription:
+    """Suscriptor de un canal con cola de envío acotada."""
+
+    RESYNC = {"type": "resync"}
+
+    def __init__(self, channel, maxsize):
+        self.channel = channel
+        self.queue = asyncio.Queue(maxsize)
+        self.dropped = 0
+
+    def push(self, message):
+        # Si el cliente no da abasto se descartan los deltas pendientes y se
+        # le pide resincronizar con un snapshot completo.
+        if self.queue.full():
+            self.dropped += self.queue.qsize()
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(self.RESYNC)
+            return
+        self.queue.put_nowait(message)
+
+    async def get(self):
+        return await self.queue.get()
+
+
+class PubSubHub:
+    """
+    Pub/sub en proceso con un canal por paciente.
+
+    Guarda el último estado publicado de cada canal para enviar solo los
+    campos que cambiaron; si nada cambió no se envía nada.
+    """
+
+    def __init__(self, queue_size=32):
+        self.queue_size = queue_size
+        self._channels = defaultdict(set)
+        self._state = {}
+        self.published = 0
+
+    def subscribe(self, channel):
+        subscription = Subscription(channel, self.queue_size)
+        self._channels[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        subscribers = self._channels.get(subscription.channel)
+        if subscribers is None:
+            return
+        subscribers.discard(subscription)
+        if not subscribers:
+            del self._channels[subscription.channel]
+            self._state.pop(subscription.channel, None)
+
+    def has_subscribers(self, channel):
+        return channel in self._channels
+
+    def publish(self, channel, message):
+        for subscription in list(self._channels.get(channel, ())):
+            subscription.push(message)
+        self.published += 1
+
+    def publish_delta(self, channel, kind, fields):
+        """Publica ``{"type": kind, "data": ...}`` con los campos modificados."""
+        if not self.has_subscribers(channel):
+            return
+        state = self._state.setdefault(channel, {})
+        delta = {
+            key: value for key, value in fields.items()
+            if value is not None and state.get(key) != value
+        }
+        if not delta:
+            return
+        state.update(delta)
+        self.publish(channel, {"type": kind, "data": delta})
+
+    def stats(self):
+        return {
+            "channels": len(self._channels),
+            "subscribers": sum(len(s) for s in self._channels.values()),
+            "published": self.published,
+            "dropped": sum(sub.dropped for s in self._channels.values() for sub in s),
+        }
@@ -0,0 +1,118 @@
+# reference.py
+import asyncio
+import time
+
+REFERENCE_TABLES = ("especialidades", "medicos", "tipos_cirugia")
+
+
+class ReferenceData:
+    """
+    Copia en memoria de las tablas de referencia (especialidades, médicos y
+    tipos de cirugía) para no repetir sus JOIN en cada request.
+
+    Se carga al iniciar y se revisa cada ``refresh_interval`` segundos con
+    ``CHECKSUM TABLE``: solo se recarga si alguna tabla cambió. Un id
+    desconocido (por ejemplo, un médico recién creado) fuerza una recarga
+    inmediata, a lo sumo una vez cada ``min_reload`` segundos.
+    """
+
+    def __init__(self, db, refresh_interval=300, min_reload=5):
+        self.db = db
+        self.refresh_interval = refresh_interval
+        self.min_reload = min_reload
+
+        self.especialidades = {}
+        self.medicos = {}
+        self.tipos_cirugia = {}
+        self.version = 0
+        self._checksums = None
+        self._loading = None
+        self._last_load = 0.0
+
+        self.reloads = 0
+        self.misses = 0
+
+    async def _fetch_checksums(self, session):
+        rows = await session.fetchall(f"CHECKSUM TABLE {', '.join(REFERENCE_TABLES)}")
+        return tuple(row["Checksum"] for row in rows)
+
+    async def load(self):
+        """Recarga las tres tablas; las cargas concurrentes se agrupan."""
+        if self._loading is None:
+            self._loading = asyncio.ensure_future(self._load())
+            self._loading.add_done_callback(lambda _: setattr(self, "_loading", None))
+        await asyncio.shield(self._loading)
+
+    async def _load(self):
+        async with self.db.session(read=True) as session:
+            checksums = await self._fetch_checksums(session)
+            especialidades = await session.fetchall("SELECT id, nombre FROM especialidades")
+            medicos = await session.fetchall(
+                "SELECT id, nombre, apellido, especialidad_id FROM medicos"
+            )
+            tipos = await session.fetchall("SELECT id, nombre FROM tipos_cirugia")
+
+        self.especialidades = {row["id"]: row["nombre"] for row in especialidades}
+        self.medicos = {
+            row["id"]: (f"{row['nombre']} {row['apellido']}", row["especialidad_id"])
+            for row in medicos
+        }
+        self.tipos_cirugia = {row["id"]: row["nombre"] for row in tipos}
+        self._checksums = checksums
+        self._last_load = time.monotonic()
+        self.version += 1
+        self.reloads += 1
+
+    async def refresh(self):
+        """Recarga solo si alguna tabla de referencia cambió."""
+        async with self.db.session(read=True) as session:
+            checksums = await self._fetch_checksums(session)
+        if checksums != self._checksums:
+            await self.load()
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                print(f"❌ Error al refrescar datos de referencia: {e}")
+
+    async def _ensure(self, missing):
+        if missing:
+            self.misses += 1
+            if time.monotonic() - self._last_load >= self.min_reload:
+                await self.load()
+
+    def medico_nombre(self, medico_id):
+        medico = self.medicos.get(medico_id)
+        return medico[0] if medico else None
+
+    async def enrich_cirugias(self, rows):
+        """Agrega ``tipo_cirugia_nombre`` y ``medico_nombre`` a cada cirugía."""
+        await self._ensure(any(
+            row["tipo_cirugia_id"] not in self.tipos_cirugia
+            or row["medico_principal_id"] not in self.medicos
+            for row in rows
+        ))
+        for row in rows:
+            row["tipo_cirugia_nombre"] = self.tipos_cirugia.get(row["tipo_cirugia_id"])
+            row["medico_nombre"] = self.medico_nombre(row["medico_principal_id"])
+        return rows
+
+    async def enrich_evoluciones(self, rows):
+        """Agrega ``medico_nombre`` a cada evolución."""
+        await self._ensure(any(row["medico_id"] not in self.medicos for row in rows))
+        for row in rows:
+            row["medico_nombre"] = self.medico_nombre(row["medico_id"])
+        return rows
+
+    def stats(self):
+        return {
+            "version": self.version,
+            "especialidades": len(self.especialidades),
+            "medicos": len(self.medicos),
+            "tipos_cirugia": len(self.tipos_cirugia),
+            "reloads": self.reloads,
+            "misses": self.misses,
+        }
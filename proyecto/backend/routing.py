@@ -0,0 +1,222 @@
+# routing.py
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from contextlib import AsyncExitStack, asynccontextmanager
+
+
+def client_key(request):
+    """Identifica al cliente para leer sus propias escrituras: su token o, si no trae, su IP."""
+    authorization = request.headers.get("authorization")
+    if authorization:
+        return hashlib.blake2b(authorization.encode(), digest_size=12).digest()
+    return request.client.host if request.client else None
+
+
+def request_keys(request):
+    """Claves de consistencia de un request: el cliente y, si aplica, el paciente."""
+    keys = [client_key(request)]
+    # Corre antes de que FastAPI valide los parámetros: un id no numérico
+    # se ignora aquí y el endpoint responde 422
+    paciente_id = request.path_params.get("paciente_id")
+    if paciente_id is not None and paciente_id.isdigit():
+        keys.append(("paciente", int(paciente_id)))
+    return keys
+
+
+class _Replica:
+    def __init__(self, name, db):
+        self.name = name
+        self.db = db
+        self.lag = None
+        self.measured_at = None
+        self.error = None
+        self.reads = 0
+
+    def applied_until(self):
+        """Instante (monotónico) hasta el que la réplica tiene aplicados los cambios."""
+        # Seconds_Behind_Source tiene resolución de un segundo
+        return self.measured_at - self.lag - 1
+
+    def stats(self):
+        return {
+            "name": self.name,
+            "lag_seconds": self.lag,
+            "error": self.error,
+            "reads": self.reads,
+            **self.db.stats(),
+        }
+
+
+class ReplicaRouter:
+    """
+    Primario más N réplicas de lectura con la misma interfaz que
+    ``Database``. ``session()`` va al primario; ``session(read=True)``
+    prefiere una réplica (en rotación) siempre que:
+
+    - su retraso medido no supere ``max_lag`` segundos y la medición sea
+      reciente (``run()`` la actualiza cada ``check_interval``);
+    - ya tenga aplicadas las escrituras de las claves del request. Cada
+      sesión de escritura con ``keys`` registra el instante; mientras la
+      réplica no lo haya alcanzado, esas lecturas van al primario.
+
+    Si no hay réplica apta o no entrega una conexión, la lectura cae al
+    primario.
+    """
+
+    def __init__(self, primary, replicas=(), max_lag=5.0, check_interval=2.0, max_keys=10000):
+        self.primary = primary
+        self.replicas = [_Replica(name, db) for name, db in replicas]
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.max_keys = max_keys
+
+        self._writes = OrderedDict()
+        self._next = 0
+        self._primary_reads = 0
+        self._sticky_reads = 0
+        self._lag_fallbacks = 0
+        self._error_fallbacks = 0
+
+    @property
+    def mode(self):
+        return self.primary.mode
+
+    async def startup(self):
+        await self.primary.startup()
+        for replica in self.replicas:
+            try:
+                await replica.db.startup()
+            except Exception as e:
+                replica.error = str(e)
+                print(f"❌ No se pudo abrir la réplica {replica.name}: {e}")
+        await self.check_lag()
+
+    async def shutdown(self):
+        for replica in self.replicas:
+            await replica.db.shutdown()
+        await self.primary.shutdown()
+
+    def record_write(self, *keys):
+        """Registra que las claves acaban de escribir en el primario."""
+        if not self.replicas:
+            return
+        now = time.monotonic()
+        for key in keys:
+            if key is None:
+                continue
+            self._writes[key] = now
+            self._writes.move_to_end(key)
+        while len(self._writes) > self.max_keys:
+            self._writes.popitem(last=False)
+
+    def _last_write(self, keys):
+        # Una réplica apta está a lo sumo max_lag detrás de una medición de
+        # hace menos de 3 * check_interval: lo anterior ya lo tiene aplicado
+        horizon = time.monotonic() - self.max_lag - 3 * self.check_interval - 1
+        while self._writes:
+            key, written = next(iter(self._writes.items()))
+            if written >= horizon:
+                break
+            del self._writes[key]
+        return max((self._writes.get(key, 0) for key in keys if key is not None), default=0)
+
+    def _choose(self, keys):
+        stale_after = time.monotonic() - 3 * self.check_interval
+        candidates = [
+            r for r in self.replicas
+            if r.error is None and r.lag is not None
+            and r.lag <= self.max_lag and r.measured_at >= stale_after
+        ]
+        if not candidates:
+            self._lag_fallbacks += 1
+            return None
+        written = self._last_write(keys)
+        if written:
+            candidates = [r for r in candidates if r.applied_until() > written]
+            if not candidates:
+                self._sticky_reads += 1
+                return None
+        self._next = (self._next + 1) % len(candidates)
+        return candidates[self._next]
+
+    @asynccontextmanager
+    async def session(self, read=False, keys=(), instrument=True):
+        """Presta una conexión del primario o, para lecturas, de una réplica."""
+        if not self.replicas:
+            async with self.primary.session(instrument) as session:
+                yield session
+            return
+
+        if not read:
+            # Se registra antes y después: el cierre de las dependencias de
+            # FastAPI puede correr cuando el cliente ya recibió la respuesta
+            self.record_write(*keys)
+            async with self.primary.session(instrument) as session:
+                yield session
+            self.record_write(*keys)
+            return
+
+        async with AsyncExitStack() as stack:
+            session = None
+            replica = self._choose(keys)
+            if replica is not None:
+                try:
+                    session = await stack.enter_async_context(replica.db.session(instrument))
+                    replica.reads += 1
+                except Exception as e:
+                    self._error_fallbacks += 1
+                    print(f"❌ Réplica {replica.name} no disponible, se lee del primario: {e}")
+            if session is None:
+                self._primary_reads += 1
+                session = await stack.enter_async_context(self.primary.session(instrument))
+            yield session
+
+    async def _measure(self, replica):
+        async with replica.db.session(instrument=False) as session:
+            try:
+                status = await session.fetchone("SHOW REPLICA STATUS")
+            except Exception:
+                # MySQL < 8.0.22
+                status = await session.fetchone("SHOW SLAVE STATUS")
+        if not status:
+            raise RuntimeError("la replicación no está configurada")
+        running = status.get("Replica_SQL_Running", status.get("Slave_SQL_Running"))
+        lag = status.get("Seconds_Behind_Source", status.get("Seconds_Behind_Master"))
+        if running != "Yes" or lag is None:
+            raise RuntimeError(status.get("Last_Error") or "el hilo SQL de replicación está detenido")
+        return float(lag)
+
+    async def check_lag(self):
+        for replica in self.replicas:
+            try:
+                replica.lag = await self._measure(replica)
+                replica.measured_at = time.monotonic()
+                replica.error = None
+            except Exception as e:
+                if replica.error is None:
+                    print(f"❌ Réplica {replica.name} fuera de rotación: {e}")
+                replica.error = str(e)
+
+    async def run(self):
+        """Tarea de fondo: mide el retraso de cada réplica."""
+        if not self.replicas:
+            return
+        while True:
+            await asyncio.sleep(self.check_interval)
+            await self.check_lag()
+
+    def stats(self):
+        stats = self.primary.stats()
+        if self.replicas:
+            stats["replicas"] = [replica.stats() for replica in self.replicas]
+            stats["routing"] = {
+                "max_lag": self.max_lag,
+                "primary_reads": self._primary_reads,
+                "sticky_reads": self._sticky_reads,
+                "lag_fallbacks": self._lag_fallbacks,
+                "error_fallbacks": self._error_fallbacks,
+                "tracked_keys": len(self._writes),
+            }
+        return stats
@@ -0,0 +1,52 @@
+# serialization.py
+import datetime
+import decimal
+import json
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # sin orjson se usa el json de la biblioteca estándar
+    orjson = None
+
+
+def _default(value):
+    """Tipos que orjson no conoce, con la misma salida que ``jsonable_encoder``."""
+    if isinstance(value, decimal.Decimal):
+        return int(value) if value.as_tuple().exponent >= 0 else float(value)
+    if isinstance(value, datetime.timedelta):
+        return value.total_seconds()
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    if isinstance(value, bytes):
+        return value.decode()
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json")
+    raise TypeError(f"Tipo no serializable: {type(value).__name__}")
+
+
+def dumps(content):
+    if orjson is not None:
+        return orjson.dumps(
+            content, default=_default,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY,
+        )
+    return json.dumps(
+        content, default=_default, ensure_ascii=False, separators=(",", ":")
+    ).encode()
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    Respuesta JSON que codifica datetime y Decimal directamente con orjson.
+
+    FastAPI solo evita pasar por ``jsonable_encoder`` cuando el endpoint
+    devuelve la respuesta ya construida, así que los endpoints con listas
+    grandes devuelven ``FastJSONResponse(filas)`` explícitamente.
+    """
+
+    def render(self, content):
+        return dumps(content)
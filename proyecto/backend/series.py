@@ -0,0 +1,184 @@
+# series.py
+import datetime
+from collections import defaultdict
+
+import numpy as np
+
+# Métrica de la API (columna en signos_vitales) -> prefijo en las tablas de rollup
+METRICS = {
+    "frecuencia_cardiaca": "fc",
+    "presion_sistolica": "sistolica",
+    "presion_diastolica": "diastolica",
+    "temperatura": "temperatura",
+    "saturacion_oxigeno": "saturacion",
+}
+
+# Granularidad -> (tabla de rollup, función que trunca la fecha al bucket)
+ROLLUPS = {
+    "minuto": ("signos_vitales_1m", lambda d: d.replace(second=0, microsecond=0)),
+    "hora": ("signos_vitales_1h", lambda d: d.replace(minute=0, second=0, microsecond=0)),
+    "dia": ("signos_vitales_1d", lambda d: d.replace(hour=0, minute=0, second=0, microsecond=0)),
+}
+
+# Posición de cada métrica en las filas de ingest.VITALS_COLUMNS
+_ROW_INDEX = {
+    "presion_sistolica": 2,
+    "presion_diastolica": 3,
+    "frecuencia_cardiaca": 4,
+    "temperatura": 5,
+    "saturacion_oxigeno": 6,
+}
+
+
+def _rollup_upsert_sql(table):
+    columns, updates = [], []
+    for prefix in METRICS.values():
+        columns += [f"{prefix}_n", f"{prefix}_suma", f"{prefix}_min", f"{prefix}_max"]
+        updates += [
+            f"{prefix}_n = {prefix}_n + VALUES({prefix}_n)",
+            f"{prefix}_suma = {prefix}_suma + VALUES({prefix}_suma)",
+            f"{prefix}_min = LEAST(COALESCE({prefix}_min, VALUES({prefix}_min)), "
+            f"COALESCE(VALUES({prefix}_min), {prefix}_min))",
+            f"{prefix}_max = GREATEST(COALESCE({prefix}_max, VALUES({prefix}_max)), "
+            f"COALESCE(VALUES({prefix}_max), {prefix}_max))",
+        ]
+    placeholders = ", ".join(["%s"] * (len(columns) + 2))
+    return (
+        f"INSERT INTO {table} (paciente_id, bucket, {', '.join(columns)}) "
+        f"VALUES ({placeholders}) ON DUPLICATE KEY UPDATE {', '.join(updates)}"
+    )
+
+
+ROLLUP_UPSERT_SQL = {name: _rollup_upsert_sql(table) for name, (table, _) in ROLLUPS.items()}
+
+
+async def update_rollups(session, rows):
+    """
+    Acumula las filas recién insertadas (en el formato de
+    ``ingest.VITALS_COLUMNS``) en las tablas de rollup. Debe llamarse en la
+    misma transacción que el ``INSERT`` para que ambos queden consistentes.
+    """
+    for name, (_, truncate) in ROLLUPS.items():
+        buckets = defaultdict(lambda: {m: [0, 0.0, None, None] for m in METRICS})
+        for row in rows:
+            acc = buckets[(row[0], truncate(row[1]))]
+            for metric, index in _ROW_INDEX.items():
+                value = row[index]
+                if value is None:
+                    continue
+                agg = acc[metric]
+                agg[0] += 1
+                agg[1] += float(value)
+                agg[2] = value if agg[2] is None else min(agg[2], value)
+                agg[3] = value if agg[3] is None else max(agg[3], value)
+
+        # Orden fijo por (paciente_id, bucket): dos cargas concurrentes
+        # bloquean las filas de rollup en el mismo orden y no se trancan
+        params = [
+            (paciente_id, bucket, *[v for metric in METRICS for v in acc[metric]])
+            for (paciente_id, bucket), acc in sorted(buckets.items())
+        ]
+        if params:
+            await session.executemany(ROLLUP_UPSERT_SQL[name], params)
+
+
+async def fetch_series(session, paciente_id, metric, desde, hasta, source="signos_vitales"):
+    """
+    Lee una métrica en un rango de fechas y la devuelve en columnas
+    (``timestamps`` en segundos epoch y ``values``) como arreglos NumPy.
+    ``source`` permite incluir el archivo (ver ``archive.history_source``).
+    """
+    _, rows = await session.fetchall_tuples(f"""
+        SELECT fecha_registro, {metric} AS valor
+        FROM {source}
+        WHERE paciente_id = %s AND fecha_registro >= %s AND fecha_registro < %s
+          AND {metric} IS NOT NULL
+        ORDER BY fecha_registro
+    """, (paciente_id, desde, hasta))
+    timestamps = np.fromiter(
+        (row[0].timestamp() for row in rows), dtype=np.float64, count=len(rows)
+    )
+    values = np.fromiter(
+        (float(row[1]) for row in rows), dtype=np.float64, count=len(rows)
+    )
+    return timestamps, values
+
+
+def downsample_buckets(timestamps, values, bucket_seconds):
+    """Mínimo, máximo y promedio por bucket de ``bucket_seconds`` segundos."""
+    if len(timestamps) == 0:
+        return []
+    keys = (timestamps // bucket_seconds).astype(np.int64)
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    counts = np.diff(np.r_[starts, len(keys)])
+    sums = np.add.reduceat(values, starts)
+    mins = np.minimum.reduceat(values, starts)
+    maxs = np.maximum.reduceat(values, starts)
+    return [
+        {
+            "bucket": datetime.datetime.fromtimestamp(int(key) * bucket_seconds),
+            "n": int(n),
+            "min": float(lo),
+            "max": float(hi),
+            "avg": round(float(total / n), 2),
+        }
+        for key, n, total, lo, hi in zip(keys[starts], counts, sums, mins, maxs)
+    ]
+
+
+def lttb(timestamps, values, threshold):
+    """
+    Largest-Triangle-Three-Buckets: reduce la serie a ``threshold`` puntos
+    conservando su forma visual, para graficar estancias completas.
+    """
+    n = len(timestamps)
+    if threshold >= n or threshold < 3:
+        return timestamps, values
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+
+    previous = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = timestamps[end:next_end].mean() if next_end > end else timestamps[-1]
+        avg_y = values[end:next_end].mean() if next_end > end else values[-1]
+
+        ax, ay = timestamps[previous], values[previous]
+        areas = np.abs(
+            (ax - avg_x) * (values[start:end] - ay)
+            - (ax - timestamps[start:end]) * (avg_y - ay)
+        )
+        previous = start + int(np.argmax(areas))
+        selected[i + 1] = previous
+
+    return timestamps[selected], values[selected]
+
+
+async def fetch_rollup(session, paciente_id, granularidad, desde, hasta):
+    """Lee las tablas de rollup y devuelve min/max/promedio por bucket."""
+    table, _ = ROLLUPS[granularidad]
+    columns = ["bucket"] + [
+        f"{prefix}_{agg}" for prefix in METRICS.values() for agg in ("n", "suma", "min", "max")
+    ]
+    _, rows = await session.fetchall_tuples(f"""
+        SELECT {', '.join(columns)} FROM {table}
+        WHERE paciente_id = %s AND bucket >= %s AND bucket < %s
+        ORDER BY bucket
+    """, (paciente_id, desde, hasta))
+
+    result = []
+    for row in rows:
+        point = {"bucket": row[0]}
+        for i, metric in enumerate(METRICS):
+            n, suma, lo, hi = row[1 + 4 * i:5 + 4 * i]
+            point[metric] = {
+                "n": n,
+                "min": lo,
+                "max": hi,
+                "avg": round(float(suma) / n, 2) if n else None,
+            }
+        result.append(point)
+    return result
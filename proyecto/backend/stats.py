@@ -0,0 +1,118 @@
+# stats.py
+import asyncio
+import datetime
+
+ACTIVE_STATES = ("Pre-operatorio", "En_proceso")
+CRITICAL_WINDOW = datetime.timedelta(hours=24)
+
+
+class DashboardStats:
+    """
+    Contadores del dashboard mantenidos en memoria.
+
+    Se calculan una vez desde SQL, se actualizan de forma incremental desde
+    los endpoints de escritura y se reconcilian periódicamente contra la
+    base de datos para corregir cualquier desviación (por ejemplo, cambios
+    hechos desde phpMyAdmin o Metabase).
+    """
+
+    def __init__(self):
+        self.loaded = False
+        self.total_pacientes = 0
+        self.cirugias_hoy = 0
+        self.cirugias_activas = 0
+        self.today = None
+        # paciente_id -> fecha de su última evolución 'Crítico' en la ventana
+        self._critical = {}
+        self.last_reconcile = None
+
+    async def reconcile(self, session):
+        """Recalcula todos los contadores desde SQL."""
+        row = await session.fetchone("SELECT COUNT(*) AS total FROM pacientes WHERE activo = TRUE")
+        total_pacientes = row["total"]
+
+        # Rango sobre fecha_programada para aprovechar idx_cirugias_fecha
+        row = await session.fetchone("""
+            SELECT CURDATE() AS hoy, COUNT(*) AS total FROM cirugias
+            WHERE fecha_programada >= CURDATE()
+              AND fecha_programada < CURDATE() + INTERVAL 1 DAY
+        """)
+        today, cirugias_hoy = row["hoy"], row["total"]
+
+        row = await session.fetchone("""
+            SELECT COUNT(*) AS total FROM cirugias
+            WHERE estado IN ('Pre-operatorio', 'En_proceso')
+        """)
+        cirugias_activas = row["total"]
+
+        rows = await session.fetchall("""
+            SELECT paciente_id, MAX(fecha_registro) AS ultima
+            FROM evoluciones_clinicas
+            WHERE estado_general = 'Crítico'
+              AND fecha_registro > DATE_SUB(NOW(), INTERVAL 24 HOUR)
+            GROUP BY paciente_id
+        """)
+
+        self.total_pacientes = total_pacientes
+        self.today = today
+        self.cirugias_hoy = cirugias_hoy
+        self.cirugias_activas = cirugias_activas
+        self._critical = {r["paciente_id"]: r["ultima"] for r in rows}
+        self.last_reconcile = datetime.datetime.now()
+        self.loaded = True
+
+    async def roll_windows(self, session, now=None):
+        """Avanza las ventanas de "hoy" y "últimas 24 h"."""
+        now = now or datetime.datetime.now()
+        cutoff = now - CRITICAL_WINDOW
+        self._critical = {
+            paciente_id: fecha
+            for paciente_id, fecha in self._critical.items()
+            if fecha > cutoff
+        }
+
+        if self.today != now.date():
+            row = await session.fetchone("""
+                SELECT COUNT(*) AS total FROM cirugias
+                WHERE fecha_programada >= %s
+                  AND fecha_programada < %s + INTERVAL 1 DAY
+            """, (now.date(), now.date()))
+            self.today = now.date()
+            self.cirugias_hoy = row["total"]
+
+    def on_surgery_state_change(self, old_state, new_state):
+        if old_state == new_state:
+            return
+        if old_state in ACTIVE_STATES:
+            self.cirugias_activas -= 1
+        if new_state in ACTIVE_STATES:
+            self.cirugias_activas += 1
+
+    def on_evolution(self, paciente_id, estado_general, fecha=None):
+        if estado_general == "Crítico":
+            self._critical[paciente_id] = fecha or datetime.datetime.now()
+
+    def snapshot(self):
+        return {
+            "total_pacientes": self.total_pacientes,
+            "cirugias_hoy": self.cirugias_hoy,
+            "cirugias_activas": self.cirugias_activas,
+            "pacientes_criticos": len(self._critical),
+        }
+
+
+async def run_stats_maintenance(db, stats, roll_interval=60, reconcile_interval=300):
+    """Tarea de fondo: avanza las ventanas y reconcilia contra SQL."""
+    elapsed = 0
+    while True:
+        await asyncio.sleep(roll_interval)
+        elapsed += roll_interval
+        try:
+            async with db.session(read=True) as session:
+                if elapsed >= reconcile_interval:
+                    await stats.reconcile(session)
+                    elapsed = 0
+                else:
+                    await stats.roll_windows(session)
+        except Exception as e:
+            print(f"❌ Error al actualizar estadísticas del dashboard: {e}")
@@ -0,0 +1,13 @@
+# tests/conftest.py
+"""
+Pruebas unitarias de la lógica que no necesita MySQL:
+
+    cd backend && python -m pytest -q tests
+
+Los módulos del backend se importan como en producción (planos, desde
+``backend/``).
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
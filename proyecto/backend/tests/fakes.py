@@ -0,0 +1,67 @@
+# tests/fakes.py
+"""Sesión y base falsas con la interfaz de ``database.Session``, sin MySQL."""
+import contextlib
+
+
+class RowError(Exception):
+    """Error de MySQL atribuible a una fila (como los de ``ROW_ERRNOS``)."""
+
+    def __init__(self, errno, msg):
+        super().__init__(msg)
+        self.errno = errno
+
+
+class FakeSession:
+    """
+    Guarda lo insertado en ``signos_vitales``. ``fail`` recibe cada fila de
+    un ``INSERT`` y devuelve la excepción a lanzar (o None); las filas de
+    un statement que falla no quedan escritas.
+    """
+
+    def __init__(self, patients, fail=None):
+        self.patients = set(patients)
+        self.fail = fail or (lambda row: None)
+        self.rows = []
+        self.rollups = 0
+        self.commits = 0
+        self.rollbacks = 0
+        self._uncommitted = []
+
+    async def fetchall(self, sql, params=()):
+        if "FROM pacientes" in sql:
+            return [{"id": pid} for pid in params if pid in self.patients]
+        raise AssertionError(f"Consulta inesperada: {sql}")
+
+    async def execute(self, sql, params=()):
+        assert sql.startswith("INSERT INTO signos_vitales"), sql
+        width = len(params) // sql.count("(%s")
+        rows = [tuple(params[i:i + width]) for i in range(0, len(params), width)]
+        for row in rows:
+            error = self.fail(row)
+            if error:
+                raise error
+        self._uncommitted += rows
+        return len(rows)
+
+    async def executemany(self, sql, seq_params):
+        self.rollups += 1
+
+    async def commit(self):
+        self.rows += self._uncommitted
+        self._uncommitted = []
+        self.commits += 1
+
+    async def rollback(self):
+        self._uncommitted = []
+        self.rollbacks += 1
+
+
+class FakeDB:
+    """``db.session()`` que siempre entrega la misma ``FakeSession``."""
+
+    def __init__(self, session):
+        self._session = session
+
+    @contextlib.asynccontextmanager
+    async def session(self, **kwargs):
+        yield self._session
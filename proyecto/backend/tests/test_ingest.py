@@ -0,0 +1,79 @@
+import asyncio
+import datetime
+
+import pytest
+
+from fakes import FakeSession, RowError
+from ingest import LecturaSignosVitales, VitalsBulkIngestor, check_vitals_row
+
+NOW = datetime.datetime(2026, 10, 1, 8, 30)
+
+
+def lectura(paciente_id, **metricas):
+    return {"paciente_id": paciente_id, "fecha_registro": NOW.isoformat(), **metricas}
+
+
+def test_check_vitals_row_conserva_metricas_no_medidas():
+    row = [1, NOW, 120, None, 80, None, None, 3]
+    assert check_vitals_row(row) == (1, NOW, 120, None, 80, None, None, 3)
+
+
+@pytest.mark.parametrize("index, value, column", [
+    (5, 100.0, "temperatura"),
+    (7, 11, "dolor_escala"),
+    (2, -1, "presion_sistolica"),
+])
+def test_check_vitals_row_rechaza_fuera_de_rango(index, value, column):
+    row = [1, NOW, None, None, None, None, None, None]
+    row[index] = value
+    with pytest.raises(ValueError, match=column):
+        check_vitals_row(row)
+
+
+def test_lectura_sin_fecha_usa_la_actual():
+    row = LecturaSignosVitales(paciente_id=1, frecuencia_cardiaca=70).as_row()
+    assert isinstance(row[1], datetime.datetime)
+    assert row[2:] == (None, None, 70, None, None, None)
+
+
+def test_ingestor_reporta_errores_por_indice():
+    session = FakeSession(patients={1})
+    ingestor = VitalsBulkIngestor(session, chunk_size=10)
+
+    async def load():
+        await ingestor.add(0, lectura(1, frecuencia_cardiaca=70))
+        await ingestor.add(1, lectura(1, dolor_escala=15))
+        await ingestor.add(2, lectura(99, frecuencia_cardiaca=70))
+        return await ingestor.finish()
+
+    result = asyncio.run(load())
+    assert result["received"] == 3
+    assert result["inserted"] == 1
+    assert [error["index"] for error in result["errors"]] == [1, 2]
+    assert result["errors"][1]["error"] == "Paciente no encontrado"
+    assert len(session.rows) == 1
+
+
+def test_ingestor_aisla_la_fila_que_falla_en_el_bloque():
+    # La fila con presión 999 falla en MySQL: el bloque se reintenta fila
+    # por fila y solo esa queda como error
+    session = FakeSession(
+        patients={1, 2},
+        fail=lambda row: RowError(3819, "Check constraint violated") if row[2] == 999 else None,
+    )
+    inserted = []
+    ingestor = VitalsBulkIngestor(session, chunk_size=3, on_insert=inserted.extend)
+
+    async def load():
+        await ingestor.add(0, lectura(1, presion_sistolica=120))
+        await ingestor.add(1, lectura(2, presion_sistolica=999))
+        await ingestor.add(2, lectura(2, presion_sistolica=110))
+        return await ingestor.finish()
+
+    result = asyncio.run(load())
+    assert result["inserted"] == 2
+    assert result["errors"] == [{"index": 1, "error": "Check constraint violated"}]
+    assert [row[2] for row in session.rows] == [120, 110]
+    assert [row[2] for row in inserted] == [120, 110]
+    assert session.rollbacks == 2
+    assert ingestor.latest[2].presion_sistolica == 110
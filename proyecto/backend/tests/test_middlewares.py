@@ -0,0 +1,152 @@
+"""
+Middlewares ASGI de etag.py y compression.py sobre una app Starlette
+mínima. Se usa httpx.AsyncClient con ASGITransport: el TestClient de
+starlette 0.27 no es compatible con httpx 0.28.
+"""
+import asyncio
+
+import httpx
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+
+import compression
+from compression import CompressionMiddleware, choose_encoding
+from etag import ConditionalGetMiddleware, ResourceVersions
+
+BIG = "x" * 5000
+
+
+def request(app, method, path, headers=None):
+    async def send():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.request(method, path, headers=headers)
+
+    return asyncio.run(send())
+
+
+# -- GET condicional -----------------------------------------------------
+
+def etag_app():
+    calls = []
+
+    def cirugias(request):
+        calls.append(request.url.path)
+        return PlainTextResponse("cirugias")
+
+    app = Starlette(routes=[
+        Route("/cirugias/{paciente_id}", cirugias, methods=["GET", "POST"]),
+        Route("/libre", lambda request: PlainTextResponse("libre")),
+    ])
+    versions = ResourceVersions()
+    wrapped = ConditionalGetMiddleware(
+        app, versions=versions,
+        routes=[(r"^/cirugias/(\d+)$", lambda m: (versions.get("cirugias", int(m[1])),))],
+    )
+    return wrapped, versions, calls
+
+
+def test_etag_responde_304_sin_llegar_al_endpoint():
+    app, _, calls = etag_app()
+    first = request(app, "GET", "/cirugias/1")
+    etag = first.headers["etag"]
+    assert first.status_code == 200
+    assert first.headers["cache-control"] == "private, no-cache"
+
+    second = request(app, "GET", "/cirugias/1", {"If-None-Match": etag})
+    assert second.status_code == 304
+    assert second.headers["etag"] == etag
+    assert calls == ["/cirugias/1"]
+
+
+def test_etag_cambia_al_incrementar_la_version():
+    app, versions, _ = etag_app()
+    etag = request(app, "GET", "/cirugias/1").headers["etag"]
+    other = request(app, "GET", "/cirugias/2").headers["etag"]
+    assert etag != other
+
+    versions.bump("cirugias", 1)
+    response = request(app, "GET", "/cirugias/1", {"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert request(app, "GET", "/cirugias/2", {"If-None-Match": other}).status_code == 304
+
+
+def test_etag_ignora_otras_rutas_y_metodos():
+    app, _, calls = etag_app()
+    assert "etag" not in request(app, "GET", "/libre").headers
+    response = request(app, "POST", "/cirugias/1", {"If-None-Match": "*"})
+    assert response.status_code == 200
+    assert "etag" not in response.headers
+    assert calls == ["/cirugias/1"]
+
+
+# -- compresión ----------------------------------------------------------
+
+def compression_app():
+    async def chunks():
+        for _ in range(3):
+            yield BIG
+
+    async def events():
+        yield "data: 1\n\n"
+
+    app = Starlette(routes=[
+        Route("/big", lambda request: PlainTextResponse(BIG, headers={"Vary": "Origin"})),
+        Route("/small", lambda request: PlainTextResponse("ok")),
+        Route("/export", lambda request: StreamingResponse(chunks(), media_type="application/x-ndjson")),
+        Route("/events", lambda request: StreamingResponse(events(), media_type="text/event-stream")),
+    ])
+    return CompressionMiddleware(app, minimum_size=1024)
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip, deflate, br", "br"),
+    ("gzip, br;q=0", "gzip"),
+    ("br;q=0, gzip;q=0", None),
+    ("identity", None),
+    ("", None),
+])
+def test_choose_encoding(header, expected):
+    assert choose_encoding(header) == expected
+
+
+def test_comprime_con_gzip_y_agrega_vary():
+    response = request(compression_app(), "GET", "/big", {"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Origin, Accept-Encoding"
+    assert int(response.headers["content-length"]) < len(BIG)
+    assert response.text == BIG
+
+
+@pytest.mark.skipif(compression.brotli is None, reason="brotli no está instalado")
+def test_comprime_con_brotli():
+    response = request(compression_app(), "GET", "/big", {"Accept-Encoding": "br"})
+    assert response.headers["content-encoding"] == "br"
+    assert response.text == BIG
+
+
+def test_respuestas_sin_comprimir_tambien_llevan_vary():
+    app = compression_app()
+    small = request(app, "GET", "/small", {"Accept-Encoding": "gzip"})
+    identity = request(app, "GET", "/big", {"Accept-Encoding": "identity"})
+    assert "content-encoding" not in small.headers
+    assert "content-encoding" not in identity.headers
+    assert small.headers["vary"] == "Accept-Encoding"
+    assert identity.headers["vary"] == "Origin, Accept-Encoding"
+
+
+def test_streaming_se_comprime_por_bloques():
+    response = request(compression_app(), "GET", "/export", {"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert response.text == BIG * 3
+
+
+def test_event_stream_no_se_toca():
+    response = request(compression_app(), "GET", "/events", {"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+    assert "vary" not in response.headers
+    assert response.text == "data: 1\n\n"
@@ -0,0 +1,42 @@
+import datetime
+
+import numpy as np
+
+from series import downsample_buckets, lttb
+
+
+def test_downsample_buckets_vacio():
+    assert downsample_buckets(np.array([]), np.array([]), 60) == []
+
+
+def test_downsample_buckets_agrupa_por_bucket():
+    timestamps = np.array([0.0, 10.0, 59.0, 60.0, 130.0])
+    values = np.array([70.0, 80.0, 75.0, 90.0, 60.0])
+    buckets = downsample_buckets(timestamps, values, 60)
+
+    assert [b["bucket"] for b in buckets] == [
+        datetime.datetime.fromtimestamp(0),
+        datetime.datetime.fromtimestamp(60),
+        datetime.datetime.fromtimestamp(120),
+    ]
+    assert buckets[0] == {**buckets[0], "n": 3, "min": 70.0, "max": 80.0, "avg": 75.0}
+    assert [(b["n"], b["avg"]) for b in buckets[1:]] == [(1, 90.0), (1, 60.0)]
+
+
+def test_lttb_no_reduce_series_cortas():
+    timestamps = np.arange(5, dtype=np.float64)
+    values = np.arange(5, dtype=np.float64)
+    assert lttb(timestamps, values, 10) == (timestamps, values)
+    assert lttb(timestamps, values, 2) == (timestamps, values)
+
+
+def test_lttb_conserva_extremos_y_picos():
+    timestamps = np.arange(1000, dtype=np.float64)
+    values = np.full(1000, 70.0)
+    values[400] = 180.0
+    out_t, out_v = lttb(timestamps, values, 50)
+
+    assert len(out_t) == len(out_v) == 50
+    assert out_t[0] == 0 and out_t[-1] == 999
+    assert np.all(np.diff(out_t) > 0)
+    assert 180.0 in out_v
@@ -0,0 +1,140 @@
+import asyncio
+import datetime
+import json
+
+import pytest
+
+from fakes import FakeDB, FakeSession, RowError
+from writebehind import VitalsWriteBehind
+
+NOW = datetime.datetime(2026, 10, 1, 8, 30)
+
+
+def fila(paciente_id, frecuencia_cardiaca=70, temperatura=None):
+    return (paciente_id, NOW, None, None, frecuencia_cardiaca, temperatura, None, None)
+
+
+def dead_letters(spill_dir):
+    path = spill_dir / "rechazadas.ndjson"
+    if not path.exists():
+        return []
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def segments(spill_dir):
+    return sorted(path.name for path in spill_dir.glob("signos-*.ndjson"))
+
+
+def writer(session, spill_dir):
+    # flush_ms alto: los flush los dispara la prueba, no el flusher de fondo
+    return VitalsWriteBehind(FakeDB(session), str(spill_dir), flush_ms=60000)
+
+
+def test_replay_reencola_segmentos_y_descarta_filas_invalidas(tmp_path):
+    segment = tmp_path / "signos-000000000007.ndjson"
+    segment.write_text("\n".join([
+        json.dumps(fila(1), default=str),
+        json.dumps(fila(1, temperatura=150.0), default=str),
+        "",
+    ]))
+    session = FakeSession(patients={1})
+    wb = writer(session, tmp_path)
+
+    async def run():
+        await wb.start()
+        assert wb.stats()["queue_depth"] == 1
+        await wb.stop()
+
+    asyncio.run(run())
+    assert session.rows == [fila(1)]
+    assert wb.replayed_rows == 2
+    assert [letter["row"][5] for letter in dead_letters(tmp_path)] == [150.0]
+    # El segmento reprocesado se borra; el nuevo continúa la numeración
+    assert segments(tmp_path) == ["signos-000000000009.ndjson"]
+
+
+def test_fila_rechazada_por_mysql_va_a_rechazadas(tmp_path):
+    session = FakeSession(
+        patients={1, 2},
+        fail=lambda row: RowError(1264, "Out of range value") if row[0] == 2 else None,
+    )
+    flushed = []
+    wb = writer(session, tmp_path)
+    wb.on_flush = flushed.extend
+
+    async def run():
+        await wb.start()
+        await wb.submit(fila(1))
+        await wb.submit(fila(2))
+        await wb.submit(fila(1, frecuencia_cardiaca=80))
+        await wb.flush()
+        stats = wb.stats()
+        await wb.stop()
+        return stats
+
+    stats = asyncio.run(run())
+    assert [row[4] for row in session.rows] == [70, 80]
+    assert [row[4] for row in flushed] == [70, 80]
+    assert stats["queue_depth"] == 0
+    assert stats["flushed_rows"] == 2
+    assert stats["dead_letter_rows"] == 1
+    assert dead_letters(tmp_path)[0]["error"] == "Out of range value"
+    assert len(segments(tmp_path)) == 1
+
+
+def test_paciente_inexistente_se_descarta(tmp_path):
+    session = FakeSession(patients={1})
+    wb = writer(session, tmp_path)
+
+    async def run():
+        await wb.start()
+        await wb.submit(fila(1))
+        await wb.submit(fila(99))
+        await wb.stop()
+
+    asyncio.run(run())
+    assert session.rows == [fila(1)]
+    assert wb.discarded_rows == 1
+    assert dead_letters(tmp_path) == []
+
+
+def test_error_del_servidor_conserva_lote_y_segmento(tmp_path):
+    down = {"value": True}
+    session = FakeSession(
+        patients={1},
+        fail=lambda row: Exception("Lost connection to MySQL server") if down["value"] else None,
+    )
+    wb = writer(session, tmp_path)
+
+    async def run():
+        await wb.start()
+        await wb.submit(fila(1))
+        with pytest.raises(Exception, match="Lost connection"):
+            await wb.flush()
+        stats = wb.stats()
+        kept = segments(tmp_path)
+        down["value"] = False
+        await wb.flush()
+        await wb.stop()
+        return stats, kept
+
+    stats, kept = asyncio.run(run())
+    assert stats["queue_depth"] == 1
+    assert stats["failed_flushes"] == 1
+    assert len(kept) == 2
+    assert session.rows == [fila(1)]
+    assert dead_letters(tmp_path) == []
+    assert len(segments(tmp_path)) == 1
+
+
+def test_submit_valida_rangos(tmp_path):
+    wb = writer(FakeSession(patients={1}), tmp_path)
+
+    async def run():
+        await wb.start()
+        with pytest.raises(ValueError, match="temperatura"):
+            await wb.submit(fila(1, temperatura=120.0))
+        await wb.stop()
+
+    asyncio.run(run())
+    assert wb.accepted == 0
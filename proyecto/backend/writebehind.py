@@ -0,0 +1,280 @@
+# writebehind.py
+import asyncio
+import datetime
+import glob
+import json
+import os
+import time
+
+from ingest import VITALS_COLUMNS, check_vitals_row, multirow_insert_sql
+from series import update_rollups
+
+# Errores de MySQL que dependen de la fila y no del servidor: NULL en
+# columna NOT NULL, fuera de rango, valor inválido, dato muy largo, clave
+# foránea, fecha sin partición y CHECK
+ROW_ERRNOS = {1048, 1264, 1292, 1364, 1366, 1406, 1452, 1526, 3819}
+
+
+def _is_row_error(error):
+    errno = getattr(error, "errno", None)
+    if errno is None and error.args and isinstance(error.args[0], int):
+        errno = error.args[0]  # aiomysql (pymysql)
+    return errno in ROW_ERRNOS
+
+
+class WriteBehindFull(Exception):
+    """La cola de escritura diferida está llena."""
+
+
+class VitalsWriteBehind:
+    """
+    Escritura diferida de signos vitales con commit agrupado.
+
+    Cada lectura aceptada se anota en un journal local (NDJSON) antes de
+    confirmarse al cliente y se encola en memoria. Un flusher de fondo
+    vacía la cola cada ``flush_ms`` milisegundos o al llegar a
+    ``max_rows`` filas, insertando todo en una sola transacción.
+
+    El journal se rota en cada flush y el segmento se borra solo cuando
+    su contenido quedó confirmado en MySQL; al reiniciar se reprocesan los
+    segmentos pendientes (entrega al-menos-una-vez).
+
+    Si el insert del lote falla se reintenta fila por fila; las filas que
+    MySQL rechaza por su contenido van a ``rechazadas.ndjson`` en vez de
+    bloquear la cola.
+    """
+
+    def __init__(self, db, spill_dir, max_queue=10000, max_rows=500,
+                 flush_ms=200, put_timeout=1.0, fsync=False, on_flush=None):
+        self.db = db
+        self.spill_dir = spill_dir
+        self.max_queue = max_queue
+        self.max_rows = max_rows
+        self.flush_ms = flush_ms
+        self.put_timeout = put_timeout
+        self.fsync = fsync
+        self.on_flush = on_flush
+
+        self._pending = []
+        self._wake = asyncio.Event()
+        self._not_full = asyncio.Event()
+        self._journal = None
+        self._segment = 0
+        self._unconfirmed = []
+        self._task = None
+        self._stopping = False
+
+        # Métricas
+        self.accepted = 0
+        self.rejected = 0
+        self.flushed_rows = 0
+        self.flushes = 0
+        self.failed_flushes = 0
+        self.replayed_rows = 0
+        self.discarded_rows = 0
+        self.dead_letter_rows = 0
+        self.max_depth = 0
+        self.last_flush_ms = 0.0
+        self._flush_time_total = 0.0
+
+    # -- journal ---------------------------------------------------------
+
+    def _segment_path(self, segment):
+        return os.path.join(self.spill_dir, f"signos-{segment:012d}.ndjson")
+
+    def _open_segment(self):
+        self._segment += 1
+        self._journal = open(self._segment_path(self._segment), "a", buffering=1)
+
+    def _rotate(self):
+        closed = self._journal
+        closed.close()
+        self._open_segment()
+        return closed.name
+
+    def _append(self, row):
+        self._journal.write(json.dumps(row, default=str) + "\n")
+        if self.fsync:
+            os.fsync(self._journal.fileno())
+
+    def _dead_letter(self, row, error):
+        with open(os.path.join(self.spill_dir, "rechazadas.ndjson"), "a") as f:
+            f.write(json.dumps({"row": row, "error": str(error)}, default=str) + "\n")
+        self.dead_letter_rows += 1
+        print(f"❌ Lectura de signos vitales rechazada por MySQL: {error}")
+
+    @staticmethod
+    def _decode(row):
+        row = list(row)
+        row[1] = datetime.datetime.fromisoformat(row[1])
+        return row
+
+    # -- ciclo de vida ---------------------------------------------------
+
+    async def start(self):
+        os.makedirs(self.spill_dir, exist_ok=True)
+        segments = sorted(glob.glob(os.path.join(self.spill_dir, "signos-*.ndjson")))
+        if segments:
+            self._segment = int(os.path.basename(segments[-1])[7:19])
+        self._open_segment()
+
+        # Lo que quedó sin confirmar de una ejecución anterior se vuelve a
+        # encolar; sus segmentos se borran con el primer flush exitoso
+        for path in segments:
+            with open(path) as f:
+                rows = [self._decode(json.loads(line)) for line in f if line.strip()]
+            for row in rows:
+                try:
+                    self._pending.append(check_vitals_row(row))
+                except ValueError as e:
+                    self._dead_letter(row, e)
+            self._unconfirmed.append(path)
+            self.replayed_rows += len(rows)
+
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        # Sin cancelar: el flush en curso termina (o devuelve su lote a la
+        # cola) antes del flush final
+        self._stopping = True
+        self._wake.set()
+        if self._task:
+            await self._task
+        try:
+            await self.flush()
+        except Exception as e:
+            print(f"❌ Signos vitales sin escribir al detener; quedan en {self.spill_dir}: {e}")
+        self._journal.close()
+
+    # -- escritura -------------------------------------------------------
+
+    async def submit(self, row):
+        """
+        Acepta una fila; espera hasta ``put_timeout`` si la cola está llena.
+        ``ValueError`` si alguna métrica no cabe en la tabla.
+        """
+        row = check_vitals_row(row)
+        deadline = time.monotonic() + self.put_timeout
+        while len(self._pending) >= self.max_queue:
+            self._not_full.clear()
+            remaining = deadline - time.monotonic()
+            try:
+                await asyncio.wait_for(self._not_full.wait(), max(remaining, 0))
+            except asyncio.TimeoutError:
+                self.rejected += 1
+                raise WriteBehindFull(
+                    f"Cola de signos vitales llena ({self.max_queue} lecturas)"
+                )
+
+        self._append(row)
+        self._pending.append(row)
+        self.accepted += 1
+        self.max_depth = max(self.max_depth, len(self._pending))
+        if len(self._pending) >= self.max_rows:
+            self._wake.set()
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.flush_ms / 1000)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"❌ Error al escribir signos vitales diferidos: {e}")
+                if not self._stopping:
+                    await asyncio.sleep(self.flush_ms / 1000)
+
+    async def flush(self):
+        if not self._pending:
+            return
+        # Lo pendiente coincide exactamente con el segmento que se cierra
+        batch, self._pending = self._pending, []
+        self._unconfirmed.append(self._rotate())
+        self._not_full.set()
+
+        try:
+            await self._write(batch)
+        except BaseException:
+            # Lo no confirmado (``_write`` saca del lote lo que ya escribió)
+            # vuelve a la cola; los segmentos se conservan para el replay
+            self.failed_flushes += 1
+            self._pending[:0] = batch
+            raise
+        for segment in self._unconfirmed:
+            os.remove(segment)
+        self._unconfirmed = []
+
+    async def _write(self, rows):
+        """Escribe ``rows``; las filas confirmadas o descartadas se sacan de la lista."""
+        start = time.monotonic()
+        async with self.db.session() as session:
+            # Una lectura de un paciente inexistente haría fallar el lote
+            # completo en cada reintento; se descarta antes de insertar
+            patient_ids = sorted({row[0] for row in rows})
+            found = await session.fetchall(
+                f"SELECT id FROM pacientes WHERE id IN ({', '.join(['%s'] * len(patient_ids))})",
+                tuple(patient_ids),
+            )
+            existing = {r["id"] for r in found}
+            valid = [row for row in rows if row[0] in existing]
+            self.discarded_rows += len(rows) - len(valid)
+            rows[:] = valid
+
+            written = list(rows)
+            try:
+                for i in range(0, len(rows), self.max_rows):
+                    await self._insert(session, rows[i:i + self.max_rows])
+                await update_rollups(session, rows)
+                await session.commit()
+                rows.clear()
+            except Exception as e:
+                if not _is_row_error(e):
+                    raise
+                await session.rollback()
+                # Se aísla la fila problemática; el resto se escribe
+                written = []
+                while rows:
+                    try:
+                        await self._insert(session, rows[:1])
+                        await update_rollups(session, rows[:1])
+                        await session.commit()
+                        self.flushed_rows += 1
+                        if self.on_flush:
+                            self.on_flush(rows[:1])
+                    except Exception as row_error:
+                        if not _is_row_error(row_error):
+                            raise
+                        await session.rollback()
+                        self._dead_letter(rows[0], row_error)
+                    del rows[0]
+
+        elapsed = time.monotonic() - start
+        self.flushes += 1
+        self.flushed_rows += len(written)
+        self.last_flush_ms = round(elapsed * 1000, 2)
+        self._flush_time_total += elapsed
+        if self.on_flush and written:
+            self.on_flush(written)
+
+    async def _insert(self, session, chunk):
+        params = [value for row in chunk for value in row]
+        await session.execute(multirow_insert_sql("signos_vitales", VITALS_COLUMNS, len(chunk)), params)
+
+    def stats(self):
+        return {
+            "queue_depth": len(self._pending),
+            "max_depth": self.max_depth,
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "flushes": self.flushes,
+            "failed_flushes": self.failed_flushes,
+            "flushed_rows": self.flushed_rows,
+            "replayed_rows": self.replayed_rows,
+            "discarded_rows": self.discarded_rows,
+            "dead_letter_rows": self.dead_letter_rows,
+            "last_flush_ms": self.last_flush_ms,
+            "avg_flush_ms": round(self._flush_time_total * 1000 / self.flushes, 2) if self.flushes else 0.0,
+        }
@@ -0,0 +1,247 @@
+# benchmarks/loadtest.py
+"""
+Carga mixta contra la API de SIACOM con latencias por endpoint.
+
+Cada escenario corre con su propio número de usuarios virtuales durante
+--duration segundos:
+
+  family     familiares que inician sesión y consultan su snapshot
+  ingest     monitores que registran signos vitales sueltos y en lote
+  dashboard  personal que refresca dashboard, pacientes, cirugías,
+             evoluciones y series de signos vitales (con If-None-Match
+             en las rutas con ETag, como el navegador)
+  login      ráfagas de inicio de sesión del personal y de familiares
+
+    python benchmarks/loadtest.py --url http://localhost:8001 --duration 60 \\
+        --family 100 --ingest 10 --dashboard 20 --login 5 --json resultado.json
+
+Con --baseline se compara contra un resultado anterior y el proceso
+termina con código 1 si el p95 de algún endpoint empeora más de
+--max-regression (0.25 = 25 %).
+
+Si algún endpoint tuvo errores (respuestas >= 400, fallas de conexión o
+lecturas rechazadas en una carga masiva) el proceso termina con código 1:
+sus latencias no miden el camino exitoso. --allow-errors lo desactiva.
+
+Requiere httpx (pip install httpx).
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+
+import httpx
+
+from metrics import LatencyRecorder, print_summary
+
+
+class LoadTest:
+    def __init__(self, args):
+        self.args = args
+        self.recorder = LatencyRecorder()
+        self.deadline = None
+        self.staff_token = None
+
+    async def request(self, client, endpoint, method, path, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, path, **kwargs)
+        except httpx.HTTPError as e:
+            self.recorder.failure(endpoint, e)
+            return None
+        self.recorder.record(endpoint, time.perf_counter() - start, response.status_code)
+        return response
+
+    def running(self):
+        return time.monotonic() < self.deadline
+
+    async def think(self):
+        if self.args.think:
+            await asyncio.sleep(random.uniform(0, 2 * self.args.think))
+
+    def patient_id(self):
+        return random.randint(1, self.args.patients)
+
+    async def staff_login(self, client):
+        response = await self.request(client, "POST /login", "POST", "/login", json={
+            "username": self.args.username, "password": self.args.password,
+        })
+        if response is not None and response.status_code == 200:
+            return response.json()["access_token"]
+        return None
+
+    async def family_login(self, client):
+        code = random.randint(1, self.args.family_codes)
+        response = await self.request(client, "POST /family/login", "POST", "/family/login", json={
+            "patient_code": f"PAC-{code:06d}", "family_code": f"FAM-{code:06d}",
+        })
+        if response is not None and response.status_code == 200:
+            return response.json()
+        return None
+
+    # -- escenarios ------------------------------------------------------
+
+    async def family(self, client):
+        session = await self.family_login(client)
+        if session is None:
+            return
+        headers = {"Authorization": f"Bearer {session['access_token']}"}
+        path = f"/family/patient/{session['patient_id']}"
+        while self.running():
+            await self.request(client, "GET /family/patient/{id}", "GET", path, headers=headers)
+            await self.think()
+
+    def reading(self, paciente_id=None):
+        reading = {
+            "presion_sistolica": random.randint(100, 150),
+            "presion_diastolica": random.randint(60, 95),
+            "frecuencia_cardiaca": random.randint(55, 110),
+            "temperatura": round(random.uniform(36.0, 37.8), 1),
+            "saturacion_oxigeno": random.randint(92, 100),
+            "dolor_escala": random.randint(0, 6),
+        }
+        if paciente_id is not None:
+            reading["paciente_id"] = paciente_id
+        return reading
+
+    async def ingest(self, client):
+        headers = {"Authorization": f"Bearer {self.staff_token}"}
+        iteration = 0
+        while self.running():
+            iteration += 1
+            if iteration % 20 == 0:
+                batch = [self.reading(self.patient_id()) for _ in range(self.args.bulk_size)]
+                response = await self.request(
+                    client, "POST /signos-vitales/bulk", "POST", "/signos-vitales/bulk",
+                    json=batch, headers=headers,
+                )
+                # La carga masiva responde 200 aunque rechace lecturas
+                if response is not None and response.status_code == 200 and response.json()["errors"]:
+                    self.recorder.rejected("POST /signos-vitales/bulk", len(response.json()["errors"]))
+            else:
+                await self.request(
+                    client, "POST /signos-vitales/{id}", "POST",
+                    f"/signos-vitales/{self.patient_id()}", json=self.reading(), headers=headers,
+                )
+            await self.think()
+
+    async def conditional_get(self, client, endpoint, path, headers, etags):
+        """GET con el último ETag recibido para ``path``, como el navegador."""
+        request_headers = dict(headers)
+        if path in etags:
+            request_headers["If-None-Match"] = etags[path]
+        response = await self.request(client, endpoint, "GET", path, headers=request_headers)
+        if response is not None and response.headers.get("etag"):
+            etags[path] = response.headers["etag"]
+
+    async def dashboard(self, client):
+        headers = {"Authorization": f"Bearer {self.staff_token}"}
+        etags = {}
+        while self.running():
+            pid = self.patient_id()
+            await self.request(client, "GET /dashboard/stats", "GET", "/dashboard/stats", headers=headers)
+            await self.conditional_get(client, "GET /pacientes", "/pacientes?limit=50", headers, etags)
+            await self.conditional_get(client, "GET /cirugias/{id}", f"/cirugias/{pid}", headers, etags)
+            await self.conditional_get(client, "GET /evoluciones/{id}", f"/evoluciones/{pid}", headers, etags)
+            await self.conditional_get(client, "GET /signos-vitales/{id}", f"/signos-vitales/{pid}", headers, etags)
+            await self.conditional_get(
+                client, "GET /signos-vitales/{id}/serie",
+                f"/signos-vitales/{pid}/serie?metodo=lttb&puntos=300", headers, etags,
+            )
+            await self.think()
+
+    async def login(self, client):
+        while self.running():
+            if random.random() < 0.5:
+                await self.staff_login(client)
+            else:
+                await self.family_login(client)
+            await self.think()
+
+    # -- ejecución -------------------------------------------------------
+
+    async def run(self):
+        args = self.args
+        limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+        async with httpx.AsyncClient(
+            base_url=args.url, limits=limits, timeout=args.timeout,
+            headers={"Accept-Encoding": "gzip, br"},
+        ) as client:
+            if args.ingest or args.dashboard:
+                self.staff_token = await self.staff_login(client)
+                if self.staff_token is None:
+                    sys.exit("No se pudo iniciar sesión con el usuario de benchmark")
+                # El login inicial no forma parte de la medición
+                self.recorder = LatencyRecorder()
+
+            users = (
+                [self.family] * args.family + [self.ingest] * args.ingest
+                + [self.dashboard] * args.dashboard + [self.login] * args.login
+            )
+            random.shuffle(users)
+            self.deadline = time.monotonic() + args.duration
+            started = time.perf_counter()
+            await asyncio.gather(*(scenario(client) for scenario in users))
+            elapsed = time.perf_counter() - started
+
+        summary = self.recorder.summary(elapsed)
+        print_summary(summary)
+        return summary
+
+
+def compare(summary, baseline, max_regression):
+    regressions = []
+    for endpoint, current in summary.items():
+        previous = baseline.get(endpoint)
+        if not previous or not previous["p95_ms"]:
+            continue
+        change = current["p95_ms"] / previous["p95_ms"] - 1
+        if change > max_regression:
+            regressions.append(
+                f"{endpoint}: p95 {previous['p95_ms']:.1f}ms -> {current['p95_ms']:.1f}ms (+{change:.0%})"
+            )
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", default="http://localhost:8001")
+    parser.add_argument("--duration", type=float, default=60)
+    parser.add_argument("--family", type=int, default=50, help="usuarios del escenario family")
+    parser.add_argument("--ingest", type=int, default=5, help="usuarios del escenario ingest")
+    parser.add_argument("--dashboard", type=int, default=10, help="usuarios del escenario dashboard")
+    parser.add_argument("--login", type=int, default=2, help="usuarios del escenario login")
+    parser.add_argument("--think", type=float, default=0.0, help="pausa media entre requests (s)")
+    parser.add_argument("--patients", type=int, default=2000, help="id máximo de paciente")
+    parser.add_argument("--family-codes", type=int, default=2500, help="id máximo de código familiar")
+    parser.add_argument("--bulk-size", type=int, default=100)
+    parser.add_argument("--username", default="superadmin")
+    parser.add_argument("--password", default="password123")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--json", help="guardar el resultado en este archivo")
+    parser.add_argument("--baseline", help="resultado anterior para comparar")
+    parser.add_argument("--max-regression", type=float, default=0.25)
+    parser.add_argument("--allow-errors", action="store_true", help="no fallar si hubo errores")
+    args = parser.parse_args()
+
+    summary = asyncio.run(LoadTest(args).run())
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": vars(args), "endpoints": summary}, f, indent=2)
+    failing = [f"{endpoint}: {s['errors']} errores {s['status']}" for endpoint, s in summary.items() if s["errors"]]
+    if failing and not args.allow_errors:
+        print("\nEndpoints con errores (las latencias no son comparables):")
+        for line in failing:
+            print(f"  {line}")
+        sys.exit(1)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(summary, json.load(f)["endpoints"], args.max_regression)
+        if regressions:
+            print("\nRegresiones:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("\nSin regresiones respecto a la línea base")
@@ -0,0 +1,82 @@
+# benchmarks/login.py
+"""
+Mide el throughput de /login contra una API en ejecución.
+
+    python benchmarks/login.py --url http://localhost:8000 --requests 500 --concurrency 50
+
+Cada login verifica bcrypt en el pool de hilos del backend, así que el
+resultado depende sobre todo de BCRYPT_WORKERS y BCRYPT_ROUNDS. Con
+--probe se mide además la latencia de /test-db durante la carga, para
+comprobar que el event loop sigue atendiendo otros requests.
+
+Requiere httpx (pip install httpx).
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from collections import Counter
+
+import httpx
+
+from metrics import percentile
+
+
+def report(name, latencies, elapsed):
+    ms = [t * 1000 for t in latencies]
+    print(f"{name}: {len(ms)} requests en {elapsed:.2f}s ({len(ms) / elapsed:.1f} req/s)")
+    if ms:
+        print(f"  p50={percentile(ms, 50):.1f}ms p95={percentile(ms, 95):.1f}ms "
+              f"p99={percentile(ms, 99):.1f}ms media={statistics.mean(ms):.1f}ms")
+
+
+async def run(args):
+    limits = httpx.Limits(max_connections=args.concurrency + 1)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=30) as client:
+        queue = asyncio.Queue()
+        for _ in range(args.requests):
+            queue.put_nowait(None)
+        latencies, statuses = [], Counter()
+        body = {"username": args.username, "password": args.password}
+
+        async def worker():
+            while not queue.empty():
+                queue.get_nowait()
+                start = time.perf_counter()
+                response = await client.post("/login", json=body)
+                latencies.append(time.perf_counter() - start)
+                statuses[response.status_code] += 1
+
+        probe_latencies = []
+        done = asyncio.Event()
+
+        async def probe():
+            while not done.is_set():
+                start = time.perf_counter()
+                await client.get("/test-db")
+                probe_latencies.append(time.perf_counter() - start)
+                await asyncio.sleep(0.05)
+
+        probe_task = asyncio.create_task(probe()) if args.probe else None
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - start
+        done.set()
+        if probe_task:
+            await probe_task
+
+    report("/login", latencies, elapsed)
+    print(f"  códigos HTTP: {dict(statuses)}")
+    if args.probe:
+        report("/test-db (durante la carga)", probe_latencies, elapsed)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--username", default="superadmin")
+    parser.add_argument("--password", default="password123")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--probe", action="store_true")
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,58 @@
+# benchmarks/metrics.py
+"""Registro de latencias y reporte por endpoint, compartido por los benchmarks."""
+import statistics
+from collections import Counter, defaultdict
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+class LatencyRecorder:
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+        self.errors = Counter()
+
+    def record(self, endpoint, seconds, status):
+        self.samples[endpoint].append(seconds * 1000)
+        self.statuses[endpoint][status] += 1
+        if status >= 400:
+            self.errors[endpoint] += 1
+
+    def rejected(self, endpoint, rows):
+        """Respuesta exitosa que informa filas rechazadas (cargas masivas)."""
+        self.statuses[endpoint]["filas_rechazadas"] += rows
+        self.errors[endpoint] += 1
+
+    def failure(self, endpoint, exc):
+        self.statuses[endpoint][type(exc).__name__] += 1
+        self.errors[endpoint] += 1
+
+    def summary(self, elapsed):
+        result = {}
+        for endpoint in sorted(set(self.samples) | set(self.errors)):
+            ms = self.samples.get(endpoint, [])
+            result[endpoint] = {
+                "count": len(ms),
+                "rps": round(len(ms) / elapsed, 2) if elapsed else 0.0,
+                "p50_ms": round(percentile(ms, 50), 2),
+                "p95_ms": round(percentile(ms, 95), 2),
+                "p99_ms": round(percentile(ms, 99), 2),
+                "mean_ms": round(statistics.mean(ms), 2) if ms else 0.0,
+                "errors": self.errors.get(endpoint, 0),
+                "status": {str(k): v for k, v in self.statuses[endpoint].items()},
+            }
+        return result
+
+
+def print_summary(summary):
+    header = f"{'endpoint':<42}{'n':>8}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'err':>6}"
+    print(header)
+    print("-" * len(header))
+    for endpoint, s in summary.items():
+        print(f"{endpoint:<42}{s['count']:>8}{s['rps']:>9.1f}{s['p50_ms']:>9.1f}"
+              f"{s['p95_ms']:>9.1f}{s['p99_ms']:>9.1f}{s['errors']:>6}")
@@ -0,0 +1,231 @@
+# benchmarks/seed.py
+"""
+Escala la base de benchmark a un volumen configurable.
+
+Parte de la base que crea db.sql (el mismo script que monta
+docker-compose) y agrega pacientes, un contacto con código familiar por
+paciente, cirugías y lecturas de signos vitales hasta llegar a los totales
+pedidos. Al final reconstruye las tablas de rollup.
+
+    docker compose -f benchmarks/docker-compose.yml up -d db
+    python benchmarks/seed.py --port 3307 --patients 20000 --vitals 2000000
+
+Los códigos familiares siguen el formato de db.sql: PAC-<id contacto> y
+FAM-<id contacto>, así loadtest.py puede generarlos sin leer la base.
+"""
+import argparse
+import datetime
+import os
+import random
+import sys
+import time
+
+import mysql.connector
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from ingest import multirow_insert_sql  # noqa: E402
+from series import METRICS, ROLLUPS  # noqa: E402
+
+NOMBRES = ["Juan", "María", "Carlos", "Ana", "Luis", "Carmen", "José", "Elena", "Miguel", "Laura"]
+APELLIDOS = ["González", "Rodríguez", "García", "Martínez", "López", "Pérez", "Sánchez", "Torres"]
+ESTADOS = ["Programada", "Pre-operatorio", "En_proceso", "Post-operatorio", "Finalizada"]
+
+VITALS_COLUMNS = (
+    "paciente_id", "fecha_registro", "presion_sistolica", "presion_diastolica",
+    "frecuencia_cardiaca", "temperatura", "saturacion_oxigeno", "dolor_escala",
+    "registrado_por_medico_id",
+)
+
+ROLLUP_FORMATS = {"minuto": "%Y-%m-%d %H:%i:00", "hora": "%Y-%m-%d %H:00:00", "dia": "%Y-%m-%d 00:00:00"}
+
+
+def insert_batches(conn, table, columns, rows, batch):
+    cursor = conn.cursor()
+    for i in range(0, len(rows), batch):
+        chunk = rows[i:i + batch]
+        cursor.execute(
+            multirow_insert_sql(table, columns, len(chunk)),
+            [value for row in chunk for value in row],
+        )
+    conn.commit()
+    cursor.close()
+
+
+def scalar(conn, sql):
+    cursor = conn.cursor()
+    cursor.execute(sql)
+    value = cursor.fetchone()[0]
+    cursor.close()
+    return value or 0
+
+
+def seed_patients(conn, target, batch):
+    existing = scalar(conn, "SELECT COUNT(*) FROM pacientes")
+    missing = max(0, target - existing)
+    if not missing:
+        return
+    start = scalar(conn, "SELECT MAX(id) FROM pacientes") + 1
+    rows = [
+        (
+            random.choice(NOMBRES), random.choice(APELLIDOS), f"9{i:09d}",
+            datetime.date(1950, 1, 1) + datetime.timedelta(days=random.randint(0, 25000)),
+            random.choice("MF"),
+        )
+        for i in range(start, start + missing)
+    ]
+    insert_batches(conn, "pacientes", ("nombre", "apellido", "cedula", "fecha_nacimiento", "sexo"), rows, batch)
+    print(f"  pacientes: +{missing}")
+
+
+def seed_contacts(conn, batch):
+    """Un contacto y un código familiar por cada paciente que no tenga."""
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT p.id FROM pacientes p
+        LEFT JOIN contactos c ON c.paciente_id = p.id
+        WHERE c.id IS NULL
+    """)
+    patient_ids = [row[0] for row in cursor.fetchall()]
+    cursor.close()
+    if not patient_ids:
+        return
+    rows = [
+        (pid, random.choice(NOMBRES), random.choice(APELLIDOS), "Hijo/a")
+        for pid in patient_ids
+    ]
+    insert_batches(conn, "contactos", ("paciente_id", "nombre", "apellido", "relacion"), rows, batch)
+
+    # Los ids se leen de la base: con auto_increment_increment > 1, huecos
+    # o escrituras concurrentes no son MAX(id)+1 consecutivos. Estos
+    # pacientes no tenían contacto, así que cada uno tiene solo el nuevo
+    contact_ids = []
+    cursor = conn.cursor()
+    for i in range(0, len(patient_ids), batch):
+        chunk = patient_ids[i:i + batch]
+        cursor.execute(
+            f"SELECT id, paciente_id FROM contactos WHERE paciente_id IN ({', '.join(['%s'] * len(chunk))})",
+            chunk,
+        )
+        contact_ids += cursor.fetchall()
+    cursor.close()
+
+    expiracion = datetime.datetime.now() + datetime.timedelta(days=90)
+    codes = [
+        (pid, f"PAC-{cid:06d}", f"FAM-{cid:06d}", cid, expiracion)
+        for cid, pid in contact_ids
+    ]
+    insert_batches(conn, "codigos_familiares", (
+        "paciente_id", "codigo_paciente", "codigo_familiar", "contacto_id", "fecha_expiracion",
+    ), codes, batch)
+    print(f"  contactos y códigos familiares: +{len(patient_ids)}")
+
+
+def seed_surgeries(conn, per_patient, batch):
+    total = scalar(conn, "SELECT COUNT(*) FROM pacientes")
+    missing = max(0, total * per_patient - scalar(conn, "SELECT COUNT(*) FROM cirugias"))
+    if not missing:
+        return
+    max_patient = scalar(conn, "SELECT MAX(id) FROM pacientes")
+    max_medico = scalar(conn, "SELECT MAX(id) FROM medicos")
+    max_tipo = scalar(conn, "SELECT MAX(id) FROM tipos_cirugia")
+    today = datetime.datetime.now().replace(minute=0, second=0, microsecond=0)
+    rows = []
+    for _ in range(missing):
+        fecha = today + datetime.timedelta(hours=random.randint(-30 * 24, 30 * 24))
+        estado = random.choice(ESTADOS)
+        inicio = fecha + datetime.timedelta(hours=2) if estado in ESTADOS[2:] else None
+        fin = fecha + datetime.timedelta(hours=4) if estado == "Finalizada" else None
+        rows.append((
+            random.randint(1, max_patient), random.randint(1, max_medico),
+            random.randint(1, max_tipo), fecha, inicio, fin, estado,
+        ))
+    insert_batches(conn, "cirugias", (
+        "paciente_id", "medico_principal_id", "tipo_cirugia_id",
+        "fecha_programada", "fecha_inicio", "fecha_fin", "estado",
+    ), rows, batch)
+    print(f"  cirugías: +{missing}")
+
+
+def seed_vitals(conn, target, days, batch):
+    missing = max(0, target - scalar(conn, "SELECT COUNT(*) FROM signos_vitales"))
+    if not missing:
+        return
+    max_patient = scalar(conn, "SELECT MAX(id) FROM pacientes")
+    max_medico = scalar(conn, "SELECT MAX(id) FROM medicos")
+    now = datetime.datetime.now().replace(microsecond=0)
+    span = days * 24 * 3600
+    started = time.monotonic()
+    done = 0
+    # Se genera por bloques para no tener millones de filas en memoria
+    while done < missing:
+        rows = []
+        for _ in range(min(batch * 20, missing - done)):
+            rows.append((
+                random.randint(1, max_patient),
+                now - datetime.timedelta(seconds=random.randint(0, span)),
+                random.randint(95, 160), random.randint(55, 100), random.randint(50, 125),
+                round(random.uniform(35.8, 38.6), 1), random.randint(89, 100),
+                random.randint(0, 10), random.randint(1, max_medico),
+            ))
+        insert_batches(conn, "signos_vitales", VITALS_COLUMNS, rows, batch)
+        done += len(rows)
+        rate = done / (time.monotonic() - started)
+        print(f"  signos vitales: {done}/{missing} ({rate:.0f} filas/s)", end="\r")
+    print()
+
+
+def rebuild_rollups(conn):
+    """Recalcula las tablas de rollup igual que la migración 001."""
+    cursor = conn.cursor()
+    for name, (table, _) in ROLLUPS.items():
+        columns, selects = [], []
+        for metric, prefix in METRICS.items():
+            columns += [f"{prefix}_n", f"{prefix}_suma", f"{prefix}_min", f"{prefix}_max"]
+            selects += [f"COUNT({metric})", f"COALESCE(SUM({metric}), 0)", f"MIN({metric})", f"MAX({metric})"]
+        bucket = f"DATE_FORMAT(fecha_registro, '{ROLLUP_FORMATS[name]}')"
+        cursor.execute(f"TRUNCATE TABLE {table}")
+        cursor.execute(f"""
+            INSERT INTO {table} (paciente_id, bucket, {', '.join(columns)})
+            SELECT paciente_id, {bucket}, {', '.join(selects)}
+            FROM signos_vitales
+            GROUP BY paciente_id, {bucket}
+        """)
+        conn.commit()
+        print(f"  {table}: {cursor.rowcount} buckets")
+    cursor.close()
+
+
+def main(args):
+    conn = mysql.connector.connect(
+        host=args.host, port=args.port, user=args.user,
+        password=args.password, database=args.database,
+    )
+    random.seed(args.seed)
+    started = time.monotonic()
+    print(f"Sembrando {args.database} en {args.host}:{args.port}")
+    seed_patients(conn, args.patients, args.batch)
+    seed_contacts(conn, args.batch)
+    seed_surgeries(conn, args.surgeries, args.batch)
+    seed_vitals(conn, args.vitals, args.days, args.batch)
+    if not args.skip_rollups:
+        rebuild_rollups(conn)
+    conn.close()
+    print(f"Listo en {time.monotonic() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default=os.getenv("DB_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("DB_PORT", 3307)))
+    parser.add_argument("--user", default=os.getenv("DB_USER", "root"))
+    parser.add_argument("--password", default=os.getenv("DB_PASSWORD", "bench"))
+    parser.add_argument("--database", default=os.getenv("DB_NAME", "siacom_db"))
+    parser.add_argument("--patients", type=int, default=10000, help="total de pacientes")
+    parser.add_argument("--surgeries", type=int, default=2, help="cirugías por paciente")
+    parser.add_argument("--vitals", type=int, default=1000000, help="total de lecturas")
+    parser.add_argument("--days", type=int, default=30, help="días que cubren las lecturas")
+    parser.add_argument("--batch", type=int, default=1000, help="filas por INSERT")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--skip-rollups", action="store_true")
+    main(parser.parse_args())
@@ -0,0 +1,79 @@
+# benchmarks/serialization.py
+"""
+Compara el serializador anterior (jsonable_encoder + json) con
+FastJSONResponse sobre filas realistas de signos_vitales, y mide el
+tamaño y el costo de comprimir la respuesta con gzip y brotli.
+
+    python benchmarks/serialization.py --rows 20 1000 10000
+
+No necesita base de datos.
+"""
+import argparse
+import datetime
+import decimal
+import os
+import random
+import sys
+import time
+import zlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+
+from compression import brotli  # noqa: E402
+from serialization import FastJSONResponse, orjson  # noqa: E402
+
+
+def vitals_rows(n):
+    start = datetime.datetime(2024, 1, 1, 8, 0)
+    return [
+        {
+            "id": i + 1,
+            "paciente_id": random.randint(1, 500),
+            "fecha_registro": start + datetime.timedelta(minutes=i),
+            "presion_sistolica": random.randint(100, 150),
+            "presion_diastolica": random.randint(60, 95),
+            "frecuencia_cardiaca": random.randint(55, 110),
+            "temperatura": decimal.Decimal(f"{random.uniform(35.8, 38.4):.1f}"),
+            "saturacion_oxigeno": random.randint(90, 100),
+            "dolor_escala": random.randint(0, 10),
+            "observaciones": None,
+        }
+        for i in range(n)
+    ]
+
+
+def timeit(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def run(args):
+    print(f"orjson: {'sí' if orjson else 'no (json estándar)'}  brotli: {'sí' if brotli else 'no'}")
+    for n in args.rows:
+        rows = vitals_rows(n)
+        repeat = max(3, min(200, 20000 // n))
+        old, old_body = timeit(lambda: JSONResponse(jsonable_encoder(rows)).body, repeat)
+        new, new_body = timeit(lambda: FastJSONResponse(rows).body, repeat)
+        print(f"\n{n} filas ({len(new_body) / 1024:.1f} KiB)")
+        print(f"  jsonable_encoder + json: {old * 1000:8.2f} ms")
+        print(f"  FastJSONResponse:        {new * 1000:8.2f} ms  ({old / new:.1f}x)")
+        assert len(old_body) >= len(new_body)
+
+        gz, gz_body = timeit(lambda: zlib.compress(new_body, 6), repeat)
+        print(f"  gzip-6:    {gz * 1000:8.2f} ms  {len(gz_body) / 1024:7.1f} KiB")
+        if brotli:
+            br, br_body = timeit(lambda: brotli.compress(new_body, quality=4), repeat)
+            print(f"  brotli-4:  {br * 1000:8.2f} ms  {len(br_body) / 1024:7.1f} KiB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, nargs="+", default=[20, 1000, 10000])
+    run(parser.parse_args())
@@ -100,6 +100,14 @@ CREATE TABLE codigos_familiares (
     FOREIGN KEY (contacto_id) REFERENCES contactos(id) ON DELETE CASCADE
 );
 
+-- Revocación de accesos familiares: los tokens de familiares emitidos
+-- antes de revocado_en (segundos UNIX) dejan de valer
+CREATE TABLE revocaciones_familiares (
+    paciente_id INT PRIMARY KEY,
+    revocado_en BIGINT NOT NULL,
+    FOREIGN KEY (paciente_id) REFERENCES pacientes(id) ON DELETE CASCADE
+);
+
 -- Tabla de Tipos de Cirugía
 CREATE TABLE tipos_cirugia (
     id INT PRIMARY KEY AUTO_INCREMENT,
@@ -134,22 +142,31 @@ CREATE TABLE cirugias (
 
 -- Tabla de Signos Vitales
 CREATE TABLE signos_vitales (
-    id INT PRIMARY KEY AUTO_INCREMENT,
+    id INT AUTO_INCREMENT,
     paciente_id INT NOT NULL,
     cirugia_id INT DEFAULT NULL,
     fecha_registro DATETIME NOT NULL,
-    presion_sistolica INT NOT NULL DEFAULT 120,
-    presion_diastolica INT NOT NULL DEFAULT 80,
-    frecuencia_cardiaca INT NOT NULL DEFAULT 75,
-    temperatura DECIMAL(4,2) NOT NULL DEFAULT 36.5,
-    saturacion_oxigeno INT NOT NULL DEFAULT 98,
-    frecuencia_respiratoria INT NOT NULL DEFAULT 16,
-    dolor_escala INT NOT NULL DEFAULT 0 CHECK (dolor_escala >= 0 AND dolor_escala <= 10),
+    -- NULL: métrica no medida en esa lectura (nunca un valor inventado)
+    presion_sistolica INT DEFAULT NULL,
+    presion_diastolica INT DEFAULT NULL,
+    frecuencia_cardiaca INT DEFAULT NULL,
+    temperatura DECIMAL(4,2) DEFAULT NULL,
+    saturacion_oxigeno INT DEFAULT NULL,
+    frecuencia_respiratoria INT DEFAULT NULL,
+    dolor_escala INT DEFAULT NULL CHECK (dolor_escala >= 0 AND dolor_escala <= 10),
     observaciones VARCHAR(500) NOT NULL DEFAULT 'Sin observaciones',
-    registrado_por_medico_id INT NOT NULL,
-    FOREIGN KEY (paciente_id) REFERENCES pacientes(id) ON DELETE CASCADE,
-    FOREIGN KEY (cirugia_id) REFERENCES cirugias(id) ON DELETE CASCADE,
-    FOREIGN KEY (registrado_por_medico_id) REFERENCES medicos(id)
+    -- NULL: lecturas de monitores (la API no registra quién las tomó)
+    registrado_por_medico_id INT DEFAULT NULL,
+    PRIMARY KEY (id, fecha_registro)
+)
+-- Particionada por mes (sin claves foráneas: MySQL no las admite en
+-- tablas particionadas). archive.py agrega los meses siguientes.
+PARTITION BY RANGE COLUMNS (fecha_registro) (
+    PARTITION p_antiguo VALUES LESS THAN ('2026-10-01'),
+    PARTITION p202610 VALUES LESS THAN ('2026-11-01'),
+    PARTITION p202611 VALUES LESS THAN ('2026-12-01'),
+    PARTITION p202612 VALUES LESS THAN ('2027-01-01'),
+    PARTITION p_futuro VALUES LESS THAN (MAXVALUE)
 );
 
 -- Tabla de Evolución Clínica
@@ -173,7 +190,7 @@ CREATE TABLE evoluciones_clinicas (
 
 -- Tabla de Notificaciones
 CREATE TABLE notificaciones (
-    id INT PRIMARY KEY AUTO_INCREMENT,
+    id INT AUTO_INCREMENT,
     contacto_id INT NOT NULL,
     paciente_id INT NOT NULL,
     cirugia_id INT DEFAULT NULL,
@@ -182,14 +199,43 @@ CREATE TABLE notificaciones (
     mensaje VARCHAR(1000) NOT NULL,
     leida BOOLEAN DEFAULT FALSE NOT NULL,
     fecha_envio TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL,
-    FOREIGN KEY (contacto_id) REFERENCES contactos(id) ON DELETE CASCADE,
+    evento_id BIGINT DEFAULT NULL,
+    PRIMARY KEY (id, fecha_envio),
+    UNIQUE KEY uq_notificaciones_evento (evento_id, contacto_id, fecha_envio)
+)
+PARTITION BY RANGE (UNIX_TIMESTAMP(fecha_envio)) (
+    PARTITION p_antiguo VALUES LESS THAN (UNIX_TIMESTAMP('2026-10-01 00:00:00')),
+    PARTITION p202610 VALUES LESS THAN (UNIX_TIMESTAMP('2026-11-01 00:00:00')),
+    PARTITION p202611 VALUES LESS THAN (UNIX_TIMESTAMP('2026-12-01 00:00:00')),
+    PARTITION p202612 VALUES LESS THAN (UNIX_TIMESTAMP('2027-01-01 00:00:00')),
+    PARTITION p_futuro VALUES LESS THAN (MAXVALUE)
+);
+
+-- Outbox de Notificaciones (un evento por cambio; se expande a cada contacto)
+CREATE TABLE notificaciones_outbox (
+    id BIGINT PRIMARY KEY AUTO_INCREMENT,
+    idempotency_key VARCHAR(64) NOT NULL,
+    paciente_id INT NOT NULL,
+    cirugia_id INT DEFAULT NULL,
+    tipo ENUM('info_general', 'cambio_estado', 'complicacion', 'alta_medica') NOT NULL,
+    titulo VARCHAR(200) NOT NULL,
+    mensaje VARCHAR(1000) NOT NULL,
+    estado ENUM('pendiente', 'procesado', 'error') DEFAULT 'pendiente' NOT NULL,
+    intentos INT NOT NULL DEFAULT 0,
+    ultimo_error VARCHAR(500) DEFAULT NULL,
+    proximo_intento DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL,
+    fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL,
+    fecha_proceso DATETIME DEFAULT NULL,
+    -- La Idempotency-Key la elige el cliente: solo identifica un reintento
+    -- dentro de la misma cirugía
+    UNIQUE KEY uq_outbox_idempotencia (cirugia_id, idempotency_key),
     FOREIGN KEY (paciente_id) REFERENCES pacientes(id) ON DELETE CASCADE,
     FOREIGN KEY (cirugia_id) REFERENCES cirugias(id) ON DELETE CASCADE
 );
 
 -- Tabla de Auditoría
 CREATE TABLE auditoria (
-    id INT PRIMARY KEY AUTO_INCREMENT,
+    id INT AUTO_INCREMENT,
     tabla_afectada VARCHAR(50) NOT NULL,
     id_registro INT NOT NULL,
     accion ENUM('INSERT', 'UPDATE', 'DELETE') NOT NULL,
@@ -197,7 +243,99 @@ CREATE TABLE auditoria (
     fecha_accion TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL,
     datos_anteriores JSON DEFAULT NULL,
     datos_nuevos JSON DEFAULT NULL,
-    FOREIGN KEY (usuario_id) REFERENCES usuarios(id)
+    PRIMARY KEY (id, fecha_accion)
+)
+PARTITION BY RANGE (UNIX_TIMESTAMP(fecha_accion)) (
+    PARTITION p_antiguo VALUES LESS THAN (UNIX_TIMESTAMP('2026-10-01 00:00:00')),
+    PARTITION p202610 VALUES LESS THAN (UNIX_TIMESTAMP('2026-11-01 00:00:00')),
+    PARTITION p202611 VALUES LESS THAN (UNIX_TIMESTAMP('2026-12-01 00:00:00')),
+    PARTITION p202612 VALUES LESS THAN (UNIX_TIMESTAMP('2027-01-01 00:00:00')),
+    PARTITION p_futuro VALUES LESS THAN (MAXVALUE)
+);
+
+-- Agregados de signos vitales por minuto, hora y día (n, suma, mín., máx.)
+-- Rollup por minuto
+CREATE TABLE IF NOT EXISTS signos_vitales_1m (
+    paciente_id INT NOT NULL,
+    bucket DATETIME NOT NULL,
+    fc_n INT NOT NULL DEFAULT 0,
+    fc_suma DECIMAL(14,2) NOT NULL DEFAULT 0,
+    fc_min INT DEFAULT NULL,
+    fc_max INT DEFAULT NULL,
+    sistolica_n INT NOT NULL DEFAULT 0,
+    sistolica_suma DECIMAL(14,2) NOT NULL DEFAULT 0,
+    sistolica_min INT DEFAULT NULL,
+    sistolica_max INT DEFAULT NULL,
+    diastolica_n INT NOT NULL DEFAULT 0,
+    diastolica_suma DECIMAL(14,2) NOT NULL DEFAULT 0,
+    diastolica_min INT DEFAULT NULL,
+    diastolica_max INT DEFAULT NULL,
+    temperatura_n INT NOT NULL DEFAULT 0,
+    temperatura_suma DECIMAL(14,2) NOT NULL DEFAULT 0,
+    temperatura_min DECIMAL(4,2) DEFAULT NULL,
+    temperatura_max DECIMAL(4,2) DEFAULT NULL,
+    saturacion_n INT NOT NULL DEFAULT 0,
+    saturacion_suma DECIMAL(14,2) NOT NULL DEFAULT 0,
+    saturacion_min INT DEFAULT NULL,
+    saturacion_max INT DEFAULT NULL,
+    PRIMARY KEY (paciente_id, bucket),
+    FOREIGN KEY (paciente_id) REFERENCES pacientes(id) ON DELETE CASCADE
+);
+
+-- Rollup por hora
+CREATE TABLE IF NOT EXISTS signos_vitales_1h (
+    paciente_id INT NOT NULL,
+    bucket DATETIME NOT NULL,
+    fc_n INT NOT NULL DEFAULT 0,
+    fc_suma DECIMAL(14,2) NOT NULL DEFAULT 0,
+    fc_min INT DEFAULT NULL,
+    fc_max INT DEFAULT NULL,
+    sistolica_n INT NOT NULL DEFAULT 0,
+    sistolica_suma DECIMAL(14,2) NOT NULL DEFAULT 0,
+    sistolica_min INT DEFAULT NULL,
+    sistolica_max INT DEFAULT NULL,
+    diastolica_n INT NOT NULL DEFAULT 0,
+    diastolica_suma DECIMAL(14,2) NOT NULL DEFAULT 0,
+    diastolica_min INT DEFAULT NULL,
+    diastolica_max INT DEFAULT NULL,
+    temperatura_n INT NOT NULL DEFAULT 0,
+    temperatura_suma DECIMAL(14,2) NOT NULL DEFAULT 0,
+    temperatura_min DECIMAL(4,2) DEFAULT NULL,
+    temperatura_max DECIMAL(4,2) DEFAULT NULL,
+    saturacion_n INT NOT NULL DEFAULT 0,
+    saturacion_suma DECIMAL(14,2) NOT NULL DEFAULT 0,
+    saturacion_min INT DEFAULT NULL,
+    saturacion_max INT DEFAULT NULL,
+    PRIMARY KEY (paciente_id, bucket),
+    FOREIGN KEY (paciente_id) REFERENCES pacientes(id) ON DELETE CASCADE
+);
+
+-- Rollup por día
+CREATE TABLE IF NOT EXISTS signos_vitales_1d (
+    paciente_id INT NOT NULL,
+    bucket DATETIME NOT NULL,
+    fc_n INT NOT NULL DEFAULT 0,
+    fc_suma DECIMAL(14,2) NOT NULL DEFAULT 0,
+    fc_min INT DEFAULT NULL,
+    fc_max INT DEFAULT NULL,
+    sistolica_n INT NOT NULL DEFAULT 0,
+    sistolica_suma DECIMAL(14,2) NOT NULL DEFAULT 0,
+    sistolica_min INT DEFAULT NULL,
+    sistolica_max INT DEFAULT NULL,
+    diastolica_n INT NOT NULL DEFAULT 0,
+    diastolica_suma DECIMAL(14,2) NOT NULL DEFAULT 0,
+    diastolica_min INT DEFAULT NULL,
+    diastolica_max INT DEFAULT NULL,
+    temperatura_n INT NOT NULL DEFAULT 0,
+    temperatura_suma DECIMAL(14,2) NOT NULL DEFAULT 0,
+    temperatura_min DECIMAL(4,2) DEFAULT NULL,
+    temperatura_max DECIMAL(4,2) DEFAULT NULL,
+    saturacion_n INT NOT NULL DEFAULT 0,
+    saturacion_suma DECIMAL(14,2) NOT NULL DEFAULT 0,
+    saturacion_min INT DEFAULT NULL,
+    saturacion_max INT DEFAULT NULL,
+    PRIMARY KEY (paciente_id, bucket),
+    FOREIGN KEY (paciente_id) REFERENCES pacientes(id) ON DELETE CASCADE
 );
 
 -- ========================================
@@ -207,12 +345,29 @@ CREATE INDEX idx_pacientes_cedula ON pacientes(cedula);
 CREATE INDEX idx_cirugias_fecha ON cirugias(fecha_programada);
 CREATE INDEX idx_cirugias_estado ON cirugias(estado);
 CREATE INDEX idx_signos_vitales_fecha ON signos_vitales(fecha_registro);
+CREATE INDEX idx_signos_vitales_paciente_fecha ON signos_vitales(paciente_id, fecha_registro);
 CREATE INDEX idx_evoluciones_fecha ON evoluciones_clinicas(fecha_registro);
-CREATE INDEX idx_notificaciones_contacto ON notificaciones(contacto_id);
-CREATE INDEX idx_codigos_paciente ON codigos_familiares(codigo_paciente);
-CREATE INDEX idx_codigos_familiar ON codigos_familiares(codigo_familiar);
+CREATE INDEX idx_notificaciones_contacto_fecha ON notificaciones(contacto_id, fecha_envio);
+CREATE INDEX idx_auditoria_registro ON auditoria(tabla_afectada, id_registro);
+CREATE INDEX idx_outbox_pendientes ON notificaciones_outbox(estado, proximo_intento);
+CREATE INDEX idx_codigos_login ON codigos_familiares(codigo_paciente, codigo_familiar, activo, fecha_expiracion);
 CREATE INDEX idx_codigos_activo ON codigos_familiares(activo);
 
+-- Archivo de los meses antiguos de las tablas particionadas: mismas
+-- columnas e índices (por eso se crean después de los índices), sin
+-- particiones y comprimido
+CREATE TABLE signos_vitales_archivo LIKE signos_vitales;
+ALTER TABLE signos_vitales_archivo REMOVE PARTITIONING;
+ALTER TABLE signos_vitales_archivo ROW_FORMAT=COMPRESSED KEY_BLOCK_SIZE=8;
+
+CREATE TABLE notificaciones_archivo LIKE notificaciones;
+ALTER TABLE notificaciones_archivo REMOVE PARTITIONING;
+ALTER TABLE notificaciones_archivo ROW_FORMAT=COMPRESSED KEY_BLOCK_SIZE=8;
+
+CREATE TABLE auditoria_archivo LIKE auditoria;
+ALTER TABLE auditoria_archivo REMOVE PARTITIONING;
+ALTER TABLE auditoria_archivo ROW_FORMAT=COMPRESSED KEY_BLOCK_SIZE=8;
+
 -- ========================================
 -- DATOS INICIALES
 -- ========================================
@@ -504,6 +659,37 @@ DELIMITER ;
 CALL GenerarSignosVitales();
 DROP PROCEDURE GenerarSignosVitales;
 
+-- Carga inicial de los agregados de signos vitales
+INSERT INTO signos_vitales_1m (paciente_id, bucket, fc_n, fc_suma, fc_min, fc_max, sistolica_n, sistolica_suma, sistolica_min, sistolica_max, diastolica_n, diastolica_suma, diastolica_min, diastolica_max, temperatura_n, temperatura_suma, temperatura_min, temperatura_max, saturacion_n, saturacion_suma, saturacion_min, saturacion_max)
+SELECT paciente_id, DATE_FORMAT(fecha_registro, '%Y-%m-%d %H:%i:00'),
+       COUNT(frecuencia_cardiaca), COALESCE(SUM(frecuencia_cardiaca), 0), MIN(frecuencia_cardiaca), MAX(frecuencia_cardiaca),
+       COUNT(presion_sistolica), COALESCE(SUM(presion_sistolica), 0), MIN(presion_sistolica), MAX(presion_sistolica),
+       COUNT(presion_diastolica), COALESCE(SUM(presion_diastolica), 0), MIN(presion_diastolica), MAX(presion_diastolica),
+       COUNT(temperatura), COALESCE(SUM(temperatura), 0), MIN(temperatura), MAX(temperatura),
+       COUNT(saturacion_oxigeno), COALESCE(SUM(saturacion_oxigeno), 0), MIN(saturacion_oxigeno), MAX(saturacion_oxigeno)
+FROM signos_vitales
+GROUP BY paciente_id, DATE_FORMAT(fecha_registro, '%Y-%m-%d %H:%i:00');
+
+INSERT INTO signos_vitales_1h (paciente_id, bucket, fc_n, fc_suma, fc_min, fc_max, sistolica_n, sistolica_suma, sistolica_min, sistolica_max, diastolica_n, diastolica_suma, diastolica_min, diastolica_max, temperatura_n, temperatura_suma, temperatura_min, temperatura_max, saturacion_n, saturacion_suma, saturacion_min, saturacion_max)
+SELECT paciente_id, DATE_FORMAT(fecha_registro, '%Y-%m-%d %H:00:00'),
+       COUNT(frecuencia_cardiaca), COALESCE(SUM(frecuencia_cardiaca), 0), MIN(frecuencia_cardiaca), MAX(frecuencia_cardiaca),
+       COUNT(presion_sistolica), COALESCE(SUM(presion_sistolica), 0), MIN(presion_sistolica), MAX(presion_sistolica),
+       COUNT(presion_diastolica), COALESCE(SUM(presion_diastolica), 0), MIN(presion_diastolica), MAX(presion_diastolica),
+       COUNT(temperatura), COALESCE(SUM(temperatura), 0), MIN(temperatura), MAX(temperatura),
+       COUNT(saturacion_oxigeno), COALESCE(SUM(saturacion_oxigeno), 0), MIN(saturacion_oxigeno), MAX(saturacion_oxigeno)
+FROM signos_vitales
+GROUP BY paciente_id, DATE_FORMAT(fecha_registro, '%Y-%m-%d %H:00:00');
+
+INSERT INTO signos_vitales_1d (paciente_id, bucket, fc_n, fc_suma, fc_min, fc_max, sistolica_n, sistolica_suma, sistolica_min, sistolica_max, diastolica_n, diastolica_suma, diastolica_min, diastolica_max, temperatura_n, temperatura_suma, temperatura_min, temperatura_max, saturacion_n, saturacion_suma, saturacion_min, saturacion_max)
+SELECT paciente_id, DATE_FORMAT(fecha_registro, '%Y-%m-%d 00:00:00'),
+       COUNT(frecuencia_cardiaca), COALESCE(SUM(frecuencia_cardiaca), 0), MIN(frecuencia_cardiaca), MAX(frecuencia_cardiaca),
+       COUNT(presion_sistolica), COALESCE(SUM(presion_sistolica), 0), MIN(presion_sistolica), MAX(presion_sistolica),
+       COUNT(presion_diastolica), COALESCE(SUM(presion_diastolica), 0), MIN(presion_diastolica), MAX(presion_diastolica),
+       COUNT(temperatura), COALESCE(SUM(temperatura), 0), MIN(temperatura), MAX(temperatura),
+       COUNT(saturacion_oxigeno), COALESCE(SUM(saturacion_oxigeno), 0), MIN(saturacion_oxigeno), MAX(saturacion_oxigeno)
+FROM signos_vitales
+GROUP BY paciente_id, DATE_FORMAT(fecha_registro, '%Y-%m-%d 00:00:00');
+
 -- Generar 2500+ Evoluciones Clínicas
 DELIMITER //
 CREATE PROCEDURE GenerarEvolucionesClinicas()
@@ -23,15 +23,79 @@ export default function FamilyDashboard() {
       }
     };
 
-    fetchPatientData();
-    
-    // Actualizar cada 30 segundos
-    const interval = setInterval(() => {
+    // Actualizaciones en vivo: el backend envía el snapshot al conectar
+    // y luego solo los cambios de cirugía y signos vitales
+    const patientId = localStorage.getItem("patient_id");
+    const familyToken = encodeURIComponent(localStorage.getItem("family_token") || "");
+    const wsUrl = `${FamilyAPI.defaults.baseURL.replace(/^http/, "ws")}/family/patient/${patientId}/ws?token=${familyToken}`;
+    let socket = null;
+    let interval = null;
+    let retryTimer = null;
+    let retries = 0;
+    let closed = false;
+
+    // Respaldo: actualizar cada 30 segundos solo mientras no hay WebSocket
+    const startPolling = () => {
+      if (interval) return;
       fetchPatientData();
-      setLastUpdate(new Date());
-    }, 30000);
+      interval = setInterval(() => {
+        fetchPatientData();
+        setLastUpdate(new Date());
+      }, 30000);
+    };
+
+    const stopPolling = () => {
+      if (interval) clearInterval(interval);
+      interval = null;
+    };
 
-    return () => clearInterval(interval);
+    const connect = () => {
+      socket = new WebSocket(wsUrl);
+      socket.onopen = () => {
+        // Al (re)conectar el backend envía el snapshot completo
+        retries = 0;
+        stopPolling();
+      };
+      socket.onmessage = (event) => {
+        const message = JSON.parse(event.data);
+        if (message.type === "snapshot") {
+          setPatientData(message.data.patient);
+          setSurgeryStatus(message.data.surgery_status);
+          setIsLoading(false);
+        } else if (message.type === "surgery_status") {
+          setSurgeryStatus((prev) => ({ ...prev, ...message.data }));
+        } else if (message.type === "notification") {
+          setSurgeryStatus((prev) => ({
+            ...prev,
+            notifications: [message.data, ...(prev?.notifications || [])].slice(0, 5),
+          }));
+        }
+        setLastUpdate(new Date());
+      };
+      socket.onclose = (event) => {
+        if (closed) return;
+        if (event.code === 4401) {
+          // Token vencido o acceso revocado: hay que volver a ingresar
+          logout();
+          return;
+        }
+        startPolling();
+        if (event.code === 4404) return;
+        // Reintento con espera exponencial (1 s, 2 s, 4 s... hasta 60 s)
+        const delay = Math.min(1000 * 2 ** retries, 60000);
+        retries += 1;
+        retryTimer = setTimeout(connect, delay);
+      };
+    };
+
+    connect();
+
+    return () => {
+      closed = true;
+      if (socket) socket.close();
+      if (retryTimer) clearTimeout(retryTimer);
+      stopPolling();
+    };
   }, []);
 
   const logout = () => {
@@ -0,0 +1,125 @@
+-- ========================================
+-- MIGRACIÓN 001: Series de tiempo de signos vitales
+-- Aplicar sobre una base existente:
+--   mysql -u root -p siacom_db < migrations/001_signos_vitales_series.sql
+-- ========================================
+
+-- Índice compuesto para consultas por paciente y rango de fechas
+CREATE INDEX idx_signos_vitales_paciente_fecha ON signos_vitales(paciente_id, fecha_registro);
+
+-- Tablas de agregados: n, suma, mínimo y máximo por métrica y bucket.
+-- La API las mantiene de forma incremental en cada inserción.
+-- Rollup por minuto
+CREATE TABLE IF NOT EXISTS signos_vitales_1m (
+    paciente_id INT NOT NULL,
+    bucket DATETIME NOT NULL,
+    fc_n INT NOT NULL DEFAULT 0,
+    fc_suma DECIMAL(14,2) NOT NULL DEFAULT 0,
+    fc_min INT DEFAULT NULL,
+    fc_max INT DEFAULT NULL,
+    sistolica_n INT NOT NULL DEFAULT 0,
+    sistolica_suma DECIMAL(14,2) NOT NULL DEFAULT 0,
+    sistolica_min INT DEFAULT NULL,
+    sistolica_max INT DEFAULT NULL,
+    diastolica_n INT NOT NULL DEFAULT 0,
+    diastolica_suma DECIMAL(14,2) NOT NULL DEFAULT 0,
+    diastolica_min INT DEFAULT NULL,
+    diastolica_max INT DEFAULT NULL,
+    temperatura_n INT NOT NULL DEFAULT 0,
+    temperatura_suma DECIMAL(14,2) NOT NULL DEFAULT 0,
+    temperatura_min DECIMAL(4,2) DEFAULT NULL,
+    temperatura_max DECIMAL(4,2) DEFAULT NULL,
+    saturacion_n INT NOT NULL DEFAULT 0,
+    saturacion_suma DECIMAL(14,2) NOT NULL DEFAULT 0,
+    saturacion_min INT DEFAULT NULL,
+    saturacion_max INT DEFAULT NULL,
+    PRIMARY KEY (paciente_id, bucket),
+    FOREIGN KEY (paciente_id) REFERENCES pacientes(id) ON DELETE CASCADE
+);
+
+-- Rollup por hora
+CREATE TABLE IF NOT EXISTS signos_vitales_1h (
+    paciente_id INT NOT NULL,
+    bucket DATETIME NOT NULL,
+    fc_n INT NOT NULL DEFAULT 0,
+    fc_suma DECIMAL(14,2) NOT NULL DEFAULT 0,
+    fc_min INT DEFAULT NULL,
+    fc_max INT DEFAULT NULL,
+    sistolica_n INT NOT NULL DEFAULT 0,
+    sistolica_suma DECIMAL(14,2) NOT NULL DEFAULT 0,
+    sistolica_min INT DEFAULT NULL,
+    sistolica_max INT DEFAULT NULL,
+    diastolica_n INT NOT NULL DEFAULT 0,
+    diastolica_suma DECIMAL(14,2) NOT NULL DEFAULT 0,
+    diastolica_min INT DEFAULT NULL,
+    diastolica_max INT DEFAULT NULL,
+    temperatura_n INT NOT NULL DEFAULT 0,
+    temperatura_suma DECIMAL(14,2) NOT NULL DEFAULT 0,
+    temperatura_min DECIMAL(4,2) DEFAULT NULL,
+    temperatura_max DECIMAL(4,2) DEFAULT NULL,
+    saturacion_n INT NOT NULL DEFAULT 0,
+    saturacion_suma DECIMAL(14,2) NOT NULL DEFAULT 0,
+    saturacion_min INT DEFAULT NULL,
+    saturacion_max INT DEFAULT NULL,
+    PRIMARY KEY (paciente_id, bucket),
+    FOREIGN KEY (paciente_id) REFERENCES pacientes(id) ON DELETE CASCADE
+);
+
+-- Rollup por día
+CREATE TABLE IF NOT EXISTS signos_vitales_1d (
+    paciente_id INT NOT NULL,
+    bucket DATETIME NOT NULL,
+    fc_n INT NOT NULL DEFAULT 0,
+    fc_suma DECIMAL(14,2) NOT NULL DEFAULT 0,
+    fc_min INT DEFAULT NULL,
+    fc_max INT DEFAULT NULL,
+    sistolica_n INT NOT NULL DEFAULT 0,
+    sistolica_suma DECIMAL(14,2) NOT NULL DEFAULT 0,
+    sistolica_min INT DEFAULT NULL,
+    sistolica_max INT DEFAULT NULL,
+    diastolica_n INT NOT NULL DEFAULT 0,
+    diastolica_suma DECIMAL(14,2) NOT NULL DEFAULT 0,
+    diastolica_min INT DEFAULT NULL,
+    diastolica_max INT DEFAULT NULL,
+    temperatura_n INT NOT NULL DEFAULT 0,
+    temperatura_suma DECIMAL(14,2) NOT NULL DEFAULT 0,
+    temperatura_min DECIMAL(4,2) DEFAULT NULL,
+    temperatura_max DECIMAL(4,2) DEFAULT NULL,
+    saturacion_n INT NOT NULL DEFAULT 0,
+    saturacion_suma DECIMAL(14,2) NOT NULL DEFAULT 0,
+    saturacion_min INT DEFAULT NULL,
+    saturacion_max INT DEFAULT NULL,
+    PRIMARY KEY (paciente_id, bucket),
+    FOREIGN KEY (paciente_id) REFERENCES pacientes(id) ON DELETE CASCADE
+);
+
+-- Carga inicial desde los registros existentes
+INSERT INTO signos_vitales_1m (paciente_id, bucket, fc_n, fc_suma, fc_min, fc_max, sistolica_n, sistolica_suma, sistolica_min, sistolica_max, diastolica_n, diastolica_suma, diastolica_min, diastolica_max, temperatura_n, temperatura_suma, temperatura_min, temperatura_max, saturacion_n, saturacion_suma, saturacion_min, saturacion_max)
+SELECT paciente_id, DATE_FORMAT(fecha_registro, '%Y-%m-%d %H:%i:00'),
+       COUNT(frecuencia_cardiaca), COALESCE(SUM(frecuencia_cardiaca), 0), MIN(frecuencia_cardiaca), MAX(frecuencia_cardiaca),
+       COUNT(presion_sistolica), COALESCE(SUM(presion_sistolica), 0), MIN(presion_sistolica), MAX(presion_sistolica),
+       COUNT(presion_diastolica), COALESCE(SUM(presion_diastolica), 0), MIN(presion_diastolica), MAX(presion_diastolica),
+       COUNT(temperatura), COALESCE(SUM(temperatura), 0), MIN(temperatura), MAX(temperatura),
+       COUNT(saturacion_oxigeno), COALESCE(SUM(saturacion_oxigeno), 0), MIN(saturacion_oxigeno), MAX(saturacion_oxigeno)
+FROM signos_vitales
+GROUP BY paciente_id, DATE_FORMAT(fecha_registro, '%Y-%m-%d %H:%i:00');
+
+INSERT INTO signos_vitales_1h (paciente_id, bucket, fc_n, fc_suma, fc_min, fc_max, sistolica_n, sistolica_suma, sistolica_min, sistolica_max, diastolica_n, diastolica_suma, diastolica_min, diastolica_max, temperatura_n, temperatura_suma, temperatura_min, temperatura_max, saturacion_n, saturacion_suma, saturacion_min, saturacion_max)
+SELECT paciente_id, DATE_FORMAT(fecha_registro, '%Y-%m-%d %H:00:00'),
+       COUNT(frecuencia_cardiaca), COALESCE(SUM(frecuencia_cardiaca), 0), MIN(frecuencia_cardiaca), MAX(frecuencia_cardiaca),
+       COUNT(presion_sistolica), COALESCE(SUM(presion_sistolica), 0), MIN(presion_sistolica), MAX(presion_sistolica),
+       COUNT(presion_diastolica), COALESCE(SUM(presion_diastolica), 0), MIN(presion_diastolica), MAX(presion_diastolica),
+       COUNT(temperatura), COALESCE(SUM(temperatura), 0), MIN(temperatura), MAX(temperatura),
+       COUNT(saturacion_oxigeno), COALESCE(SUM(saturacion_oxigeno), 0), MIN(saturacion_oxigeno), MAX(saturacion_oxigeno)
+FROM signos_vitales
+GROUP BY paciente_id, DATE_FORMAT(fecha_registro, '%Y-%m-%d %H:00:00');
+
+INSERT INTO signos_vitales_1d (paciente_id, bucket, fc_n, fc_suma, fc_min, fc_max, sistolica_n, sistolica_suma, sistolica_min, sistolica_max, diastolica_n, diastolica_suma, diastolica_min, diastolica_max, temperatura_n, temperatura_suma, temperatura_min, temperatura_max, saturacion_n, saturacion_suma, saturacion_min, saturacion_max)
+SELECT paciente_id, DATE_FORMAT(fecha_registro, '%Y-%m-%d 00:00:00'),
+       COUNT(frecuencia_cardiaca), COALESCE(SUM(frecuencia_cardiaca), 0), MIN(frecuencia_cardiaca), MAX(frecuencia_cardiaca),
+       COUNT(presion_sistolica), COALESCE(SUM(presion_sistolica), 0), MIN(presion_sistolica), MAX(presion_sistolica),
+       COUNT(presion_diastolica), COALESCE(SUM(presion_diastolica), 0), MIN(presion_diastolica), MAX(presion_diastolica),
+       COUNT(temperatura), COALESCE(SUM(temperatura), 0), MIN(temperatura), MAX(temperatura),
+       COUNT(saturacion_oxigeno), COALESCE(SUM(saturacion_oxigeno), 0), MIN(saturacion_oxigeno), MAX(saturacion_oxigeno)
+FROM signos_vitales
+GROUP BY paciente_id, DATE_FORMAT(fecha_registro, '%Y-%m-%d 00:00:00');
@@ -0,0 +1,32 @@
+-- ========================================
+-- MIGRACIÓN 002: Outbox de notificaciones
+-- Aplicar sobre una base existente:
+--   mysql -u root -p siacom_db < migrations/002_notificaciones_outbox.sql
+-- ========================================
+
+-- Un evento por cambio de estado o alerta; el despachador de la API lo
+-- expande a una notificación por contacto en segundo plano
+CREATE TABLE IF NOT EXISTS notificaciones_outbox (
+    id BIGINT PRIMARY KEY AUTO_INCREMENT,
+    idempotency_key VARCHAR(64) UNIQUE NOT NULL,
+    paciente_id INT NOT NULL,
+    cirugia_id INT DEFAULT NULL,
+    tipo ENUM('info_general', 'cambio_estado', 'complicacion', 'alta_medica') NOT NULL,
+    titulo VARCHAR(200) NOT NULL,
+    mensaje VARCHAR(1000) NOT NULL,
+    estado ENUM('pendiente', 'procesado', 'error') DEFAULT 'pendiente' NOT NULL,
+    intentos INT NOT NULL DEFAULT 0,
+    ultimo_error VARCHAR(500) DEFAULT NULL,
+    proximo_intento DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL,
+    fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL,
+    fecha_proceso DATETIME DEFAULT NULL,
+    FOREIGN KEY (paciente_id) REFERENCES pacientes(id) ON DELETE CASCADE,
+    FOREIGN KEY (cirugia_id) REFERENCES cirugias(id) ON DELETE CASCADE
+);
+
+CREATE INDEX idx_outbox_pendientes ON notificaciones_outbox(estado, proximo_intento);
+
+-- Cada notificación recuerda el evento que la originó; la clave única
+-- hace que reprocesar un evento no duplique notificaciones
+ALTER TABLE notificaciones ADD COLUMN evento_id BIGINT DEFAULT NULL;
+ALTER TABLE notificaciones ADD UNIQUE KEY uq_notificaciones_evento (evento_id, contacto_id);
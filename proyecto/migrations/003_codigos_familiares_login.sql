@@ -0,0 +1,15 @@
+-- ========================================
+-- MIGRACIÓN 003: Índice compuesto para el login familiar
+-- Aplicar sobre una base existente:
+--   mysql -u root -p siacom_db < migrations/003_codigos_familiares_login.sql
+-- ========================================
+
+-- El login filtra por el par de códigos, activo y fecha_expiracion; con
+-- este índice los fallos de la caché de autenticación se resuelven sin
+-- leer la fila completa de codigos_familiares
+CREATE INDEX idx_codigos_login
+    ON codigos_familiares(codigo_paciente, codigo_familiar, activo, fecha_expiracion);
+
+-- Duplicaban los índices que ya crean las restricciones UNIQUE
+DROP INDEX idx_codigos_paciente ON codigos_familiares;
+DROP INDEX idx_codigos_familiar ON codigos_familiares;
@@ -0,0 +1,81 @@
+-- ========================================
+-- MIGRACIÓN 004: Particionado mensual y tablas de archivo
+-- Aplicar sobre una base existente (reescribe las tres tablas):
+--   mysql -u root -p siacom_db < migrations/004_particionado_archivo.sql
+-- ========================================
+
+-- MySQL no admite claves foráneas en tablas particionadas y exige que la
+-- columna de partición forme parte de toda clave única. La integridad
+-- con pacientes, cirugías, contactos y usuarios queda a cargo de la API
+-- (los pacientes se desactivan, no se borran).
+-- Las particiones de meses siguientes y el paso al archivo los hace la
+-- tarea de archivado de la API (archive.py).
+
+-- Signos vitales: RANGE COLUMNS sobre fecha_registro (DATETIME)
+ALTER TABLE signos_vitales
+    DROP FOREIGN KEY signos_vitales_ibfk_1,
+    DROP FOREIGN KEY signos_vitales_ibfk_2,
+    DROP FOREIGN KEY signos_vitales_ibfk_3;
+ALTER TABLE signos_vitales
+    DROP PRIMARY KEY,
+    ADD PRIMARY KEY (id, fecha_registro);
+ALTER TABLE signos_vitales
+PARTITION BY RANGE COLUMNS (fecha_registro) (
+    PARTITION p_antiguo VALUES LESS THAN ('2026-10-01'),
+    PARTITION p202610 VALUES LESS THAN ('2026-11-01'),
+    PARTITION p202611 VALUES LESS THAN ('2026-12-01'),
+    PARTITION p202612 VALUES LESS THAN ('2027-01-01'),
+    PARTITION p_futuro VALUES LESS THAN (MAXVALUE)
+);
+
+-- Notificaciones: fecha_envio es TIMESTAMP, se particiona por UNIX_TIMESTAMP
+ALTER TABLE notificaciones
+    DROP FOREIGN KEY notificaciones_ibfk_1,
+    DROP FOREIGN KEY notificaciones_ibfk_2,
+    DROP FOREIGN KEY notificaciones_ibfk_3;
+ALTER TABLE notificaciones
+    DROP PRIMARY KEY,
+    ADD PRIMARY KEY (id, fecha_envio),
+    DROP INDEX uq_notificaciones_evento,
+    ADD UNIQUE KEY uq_notificaciones_evento (evento_id, contacto_id, fecha_envio);
+-- El portal familiar lee las últimas notificaciones de cada contacto
+DROP INDEX idx_notificaciones_contacto ON notificaciones;
+CREATE INDEX idx_notificaciones_contacto_fecha ON notificaciones(contacto_id, fecha_envio);
+ALTER TABLE notificaciones
+PARTITION BY RANGE (UNIX_TIMESTAMP(fecha_envio)) (
+    PARTITION p_antiguo VALUES LESS THAN (UNIX_TIMESTAMP('2026-10-01 00:00:00')),
+    PARTITION p202610 VALUES LESS THAN (UNIX_TIMESTAMP('2026-11-01 00:00:00')),
+    PARTITION p202611 VALUES LESS THAN (UNIX_TIMESTAMP('2026-12-01 00:00:00')),
+    PARTITION p202612 VALUES LESS THAN (UNIX_TIMESTAMP('2027-01-01 00:00:00')),
+    PARTITION p_futuro VALUES LESS THAN (MAXVALUE)
+);
+
+-- Auditoría: fecha_accion es TIMESTAMP
+ALTER TABLE auditoria
+    DROP FOREIGN KEY auditoria_ibfk_1;
+ALTER TABLE auditoria
+    DROP PRIMARY KEY,
+    ADD PRIMARY KEY (id, fecha_accion);
+CREATE INDEX idx_auditoria_registro ON auditoria(tabla_afectada, id_registro);
+ALTER TABLE auditoria
+PARTITION BY RANGE (UNIX_TIMESTAMP(fecha_accion)) (
+    PARTITION p_antiguo VALUES LESS THAN (UNIX_TIMESTAMP('2026-10-01 00:00:00')),
+    PARTITION p202610 VALUES LESS THAN (UNIX_TIMESTAMP('2026-11-01 00:00:00')),
+    PARTITION p202611 VALUES LESS THAN (UNIX_TIMESTAMP('2026-12-01 00:00:00')),
+    PARTITION p202612 VALUES LESS THAN (UNIX_TIMESTAMP('2027-01-01 00:00:00')),
+    PARTITION p_futuro VALUES LESS THAN (MAXVALUE)
+);
+
+-- Tablas de archivo: mismas columnas e índices, sin particiones y
+-- comprimidas; las filas conservan su id original
+CREATE TABLE IF NOT EXISTS signos_vitales_archivo LIKE signos_vitales;
+ALTER TABLE signos_vitales_archivo REMOVE PARTITIONING;
+ALTER TABLE signos_vitales_archivo ROW_FORMAT=COMPRESSED KEY_BLOCK_SIZE=8;
+
+CREATE TABLE IF NOT EXISTS notificaciones_archivo LIKE notificaciones;
+ALTER TABLE notificaciones_archivo REMOVE PARTITIONING;
+ALTER TABLE notificaciones_archivo ROW_FORMAT=COMPRESSED KEY_BLOCK_SIZE=8;
+
+CREATE TABLE IF NOT EXISTS auditoria_archivo LIKE auditoria;
+ALTER TABLE auditoria_archivo REMOVE PARTITIONING;
+ALTER TABLE auditoria_archivo ROW_FORMAT=COMPRESSED KEY_BLOCK_SIZE=8;
@@ -0,0 +1,13 @@
+-- ========================================
+-- MIGRACIÓN 005: médico opcional en signos vitales
+-- Aplicar después de la 004:
+--   mysql -u root -p siacom_db < migrations/005_signos_vitales_medico_opcional.sql
+-- ========================================
+
+-- Las lecturas que llegan por la API (monitores, carga masiva, escritura
+-- diferida) no informan qué médico las registró; con NOT NULL sin
+-- default MySQL las rechazaba en modo estricto.
+-- La tabla de archivo se cambia igual para que el INSERT IGNORE del
+-- archivado no convierta esos NULL en 0.
+ALTER TABLE signos_vitales MODIFY registrado_por_medico_id INT DEFAULT NULL;
+ALTER TABLE signos_vitales_archivo MODIFY registrado_por_medico_id INT DEFAULT NULL;
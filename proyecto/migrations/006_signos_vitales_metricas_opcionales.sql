@@ -0,0 +1,28 @@
+-- ========================================
+-- MIGRACIÓN 006: métricas opcionales en signos vitales
+-- Aplicar después de la 005:
+--   mysql -u root -p siacom_db < migrations/006_signos_vitales_metricas_opcionales.sql
+-- ========================================
+
+-- Un monitor puede informar solo algunas métricas. Con NOT NULL y
+-- defaults "normales" (120/80, 75 lpm, 36.5 °C, 98 %) la API tenía que
+-- inventar valores que terminaban en las series, los rollups y las
+-- alertas como si se hubieran medido. La métrica ausente queda en NULL;
+-- series.py y los rollups ya la ignoran. El CHECK de dolor_escala se
+-- conserva (NULL lo cumple).
+ALTER TABLE signos_vitales
+    MODIFY presion_sistolica INT DEFAULT NULL,
+    MODIFY presion_diastolica INT DEFAULT NULL,
+    MODIFY frecuencia_cardiaca INT DEFAULT NULL,
+    MODIFY temperatura DECIMAL(4,2) DEFAULT NULL,
+    MODIFY saturacion_oxigeno INT DEFAULT NULL,
+    MODIFY frecuencia_respiratoria INT DEFAULT NULL,
+    MODIFY dolor_escala INT DEFAULT NULL;
+ALTER TABLE signos_vitales_archivo
+    MODIFY presion_sistolica INT DEFAULT NULL,
+    MODIFY presion_diastolica INT DEFAULT NULL,
+    MODIFY frecuencia_cardiaca INT DEFAULT NULL,
+    MODIFY temperatura DECIMAL(4,2) DEFAULT NULL,
+    MODIFY saturacion_oxigeno INT DEFAULT NULL,
+    MODIFY frecuencia_respiratoria INT DEFAULT NULL,
+    MODIFY dolor_escala INT DEFAULT NULL;
@@ -0,0 +1,15 @@
+-- ========================================
+-- MIGRACIÓN 007: revocación de tokens de familiares
+-- Aplicar sobre una base existente:
+--   mysql -u root -p siacom_db < migrations/007_revocaciones_familiares.sql
+-- ========================================
+
+-- Los tokens de familiares se validan sin ir a la base y duran
+-- FAMILY_TOKEN_MINUTES. POST /family/auth/invalidate/{paciente_id}
+-- registra aquí el instante de la revocación; los tokens emitidos antes
+-- se rechazan en todos los procesos de la API.
+CREATE TABLE IF NOT EXISTS revocaciones_familiares (
+    paciente_id INT PRIMARY KEY,
+    revocado_en BIGINT NOT NULL,
+    FOREIGN KEY (paciente_id) REFERENCES pacientes(id) ON DELETE CASCADE
+);
@@ -0,0 +1,12 @@
+-- ========================================
+-- MIGRACIÓN 008: Idempotency-Key por cirugía
+-- Aplicar sobre una base existente:
+--   mysql -u root -p siacom_db < migrations/008_outbox_idempotencia_por_cirugia.sql
+-- ========================================
+
+-- La Idempotency-Key la elige el cliente, así que dos cirugías distintas
+-- pueden traer la misma clave. Era única en toda la tabla y el segundo
+-- evento se descartaba en silencio; ahora es única por cirugía.
+ALTER TABLE notificaciones_outbox
+    DROP INDEX idempotency_key,
+    ADD UNIQUE KEY uq_outbox_idempotencia (cirugia_id, idempotency_key);
@@ -0,0 +1,3 @@
+-- Usuario con el que la réplica lee el binlog del primario
+CREATE USER IF NOT EXISTS 'replicador'@'%' IDENTIFIED WITH mysql_native_password BY 'replicador';
+GRANT REPLICATION SLAVE ON *.* TO 'replicador'@'%';
@@ -0,0 +1,10 @@
+-- Se conecta al primario y aplica todo su binlog desde el inicio (GTID),
+-- incluido db.sql. La replicación arranca sola en cada reinicio.
+CHANGE REPLICATION SOURCE TO
+    SOURCE_HOST = 'db',
+    SOURCE_PORT = 3306,
+    SOURCE_USER = 'replicador',
+    SOURCE_PASSWORD = 'replicador',
+    SOURCE_AUTO_POSITION = 1,
+    SOURCE_CONNECT_RETRY = 5;
+START REPLICA;
@@ -0,0 +1,63 @@
+# replication/verify.py
+"""
+Comprueba el enrutamiento primario/réplica contra la API de replication/.
+
+1. Un usuario registra una evolución y la lee de inmediato: debe verla
+   aunque la réplica vaya atrasada (lectura de sus propias escrituras).
+2. Un cliente anónimo lee en bucle: esas lecturas deben ir a la réplica.
+3. Muestra los contadores de /db/pool (lecturas por réplica y desvíos
+   al primario).
+
+    python replication/verify.py --url http://localhost:8002
+
+Con SOURCE_DELAY en la réplica (ver docker-compose.yml) el paso 1 debe
+seguir funcionando y aumentar "sticky_reads".
+
+Requiere httpx (pip install httpx).
+"""
+import argparse
+import sys
+import uuid
+
+import httpx
+
+
+def main(args):
+    with httpx.Client(base_url=args.url, timeout=30) as client:
+        response = client.post("/login", json={"username": args.username, "password": args.password})
+        response.raise_for_status()
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        marker = f"verificación {uuid.uuid4().hex[:8]}"
+        failures = 0
+        for _ in range(args.writes):
+            client.post(f"/evoluciones/{args.patient}", headers=headers, json={
+                "estado_general": "Estable", "descripcion": marker, "medico_id": 1,
+            }).raise_for_status()
+            rows = client.get(f"/evoluciones/{args.patient}", headers=headers).json()
+            if not any(row["descripcion"] == marker for row in rows):
+                failures += 1
+        print(f"Lecturas de escrituras propias: {args.writes - failures}/{args.writes} correctas")
+
+        for _ in range(args.reads):
+            client.get("/pacientes?limit=10").raise_for_status()
+
+        stats = client.get("/db/pool").json()
+        for replica in stats.get("replicas", []):
+            print(f"Réplica {replica['name']}: retraso {replica['lag_seconds']}s, "
+                  f"{replica['reads']} lecturas, error: {replica['error']}")
+        print(f"Enrutamiento: {stats.get('routing')}")
+
+    if failures or not stats.get("replicas"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", default="http://localhost:8002")
+    parser.add_argument("--username", default="superadmin")
+    parser.add_argument("--password", default="password123")
+    parser.add_argument("--patient", type=int, default=1)
+    parser.add_argument("--writes", type=int, default=20)
+    parser.add_argument("--reads", type=int, default=200)
+    main(parser.parse_args())